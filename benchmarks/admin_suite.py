@@ -0,0 +1,322 @@
+# benchmarks/admin_suite.py
+#
+# Latency and query counts of the generated admin of the example app on
+# SQLite: changelists, search, filters, export, function/badge column
+# rendering and register_all_admins(). Each table size runs in its own
+# process on its own database file (built once, reused by later runs).
+# Results are saved as JSON and compared against a stored baseline.
+#
+#   python benchmarks/admin_suite.py [--sizes 10000 100000 1000000] [--repeat 5]
+#   python benchmarks/admin_suite.py --save-baseline       # store benchmarks/baseline.json
+#   python benchmarks/admin_suite.py --tolerance 0.25      # exit 1 on regressions
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(BASE_DIR, "benchmarks")
+sys.path.insert(0, BASE_DIR)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_DATA_DIR = os.path.join(BENCHMARKS_DIR, ".data")
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+FIXTURE_BATCH_SIZE = 10_000
+# Slowdowns below this are timer noise, whatever the relative change
+NOISE_MS = 1.0
+# Instances rendered per function/badge column measurement
+RENDER_ROWS = 10_000
+
+
+# -------------------------------------------------------
+# Django setup of one worker process
+# -------------------------------------------------------
+def setup_django(database_path):
+    import django
+    from django.conf import settings
+    from example_project import settings as project_settings
+
+    options = {name: getattr(project_settings, name) for name in dir(project_settings) if name.isupper()}
+    options.update(
+        DEBUG=False,
+        ALLOWED_HOSTS=["testserver"],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": database_path}},
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    )
+    settings.configure(**options)
+    django.setup()
+
+
+# -------------------------------------------------------
+# Fixtures: Product, Customer and Order rows
+# -------------------------------------------------------
+FIRST_NAMES = ["Anna", "Boris", "Clara", "Denis", "Elena", "Felix", "Galina", "Hugo", "Irina", "Jonas"]
+LAST_NAMES = ["Ivanova", "Smith", "Petrov", "Müller", "Garcia", "Novak", "Rossi", "Kowalski", "Sato", "Silva"]
+ORIGINS = ["status_a", "status_b", "status_c"]
+
+
+def insert_in_batches(model, size, build):
+    # _base_manager: plain bulk_create, no change history entries
+    manager = model._base_manager
+    for start in range(0, size, FIXTURE_BATCH_SIZE):
+        manager.bulk_create([build(i) for i in range(start, min(start + FIXTURE_BATCH_SIZE, size))])
+
+
+def build_fixtures(size):
+    from decimal import Decimal
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+    from example_app.models import Customer, Order, Product
+
+    call_command("migrate", verbosity=0)
+    if Product._base_manager.count() == size:
+        return
+
+    with transaction.atomic():
+        for model in (Order, Product, Customer):
+            model._base_manager.all().delete()
+        insert_in_batches(Product, size, lambda i: Product(
+            name=f"Product {i}", price=Decimal(i % 100_000) / 100, available=i % 3 != 0,
+        ))
+        insert_in_batches(Customer, size, lambda i: Customer(
+            first_name=f"{FIRST_NAMES[i % 10]}{i}",
+            last_name=LAST_NAMES[i // 10 % 10],
+            origin=ORIGINS[i % 3],
+            email=f"customer{i}@example.com",
+            active=i % 4 != 0,
+        ))
+        first_customer = Customer._base_manager.order_by("pk").values_list("pk", flat=True).first()
+        insert_in_batches(Order, size, lambda i: Order(
+            customer_id=first_customer + (i * 7919) % size,
+            total=Decimal(i % 50_000) / 100,
+            config="configs/benchmark.json",
+        ))
+        if not User.objects.filter(username="benchmark").exists():
+            User.objects.create_superuser("benchmark", "benchmark@example.com", "benchmark")
+
+    with transaction.get_connection().cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+# -------------------------------------------------------
+# Measurements
+# -------------------------------------------------------
+def measure(run, repeat):
+    # Median/min wall time over 'repeat' runs after one warm-up run, and the
+    # query count of the last run
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    run()
+    samples = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "queries": len(context.captured_queries),
+    }
+
+
+def get_page(client, url):
+
+    def _run():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        if response.streaming:
+            for _chunk in response.streaming_content:
+                pass
+        else:
+            response.content
+
+    return _run
+
+
+PAGES = {
+    "changelist.product": "/admin/example_app/product/",
+    "changelist.customer": "/admin/example_app/customer/",
+    "changelist.order": "/admin/example_app/order/",
+    "changelist.order.last_page": "/admin/example_app/order/?p={last_page}",
+    "search.product": "/admin/example_app/product/?q=Product+4242",
+    "search.customer": "/admin/example_app/customer/?q=Clara",
+    "search.order.related": "/admin/example_app/order/?q=Smith",
+    "filter.customer.choice": "/admin/example_app/customer/?origin__exact=status_b&active__exact=1",
+    "filter.order.range": "/admin/example_app/order/?total__range__gte=100&total__range__lte=120",
+    "filter.order.customer": "/admin/example_app/order/?customer__id__exact={customer_id}",
+    "export.customer.csv": "/admin/example_app/customer/export/?_format=csv&origin__exact=status_a",
+}
+
+
+def measure_pages(size, repeat):
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from example_app.models import Customer
+
+    client = Client()
+    client.force_login(User.objects.get(username="benchmark"))
+    params = {
+        "last_page": max(size // 100, 1),
+        "customer_id": Customer._base_manager.order_by("pk").values_list("pk", flat=True).first(),
+    }
+    return {name: measure(get_page(client, url.format(**params)), repeat) for name, url in PAGES.items()}
+
+
+def measure_columns(repeat):
+    # Rows/sec of each function and badge column over already loaded rows
+    from django.contrib import admin
+    from example_app.models import Customer, Product
+
+    results = {}
+    for model in (Product, Customer):
+        model_admin = admin.site.get_model_admin(model)
+        rows = list(model._default_manager.annotate(**model_admin.list_annotations).order_by("pk")[:RENDER_ROWS])
+        for column in model.get_admin_spec().get_function_columns():
+            render = getattr(model_admin, column)
+            result = measure(lambda: [render(row) for row in rows], repeat)
+            result["rows_per_sec"] = round(len(rows) / (result["ms"] / 1000)) if result["ms"] else 0
+            results[f"render.{model._meta.model_name}.{column}"] = result
+    return results
+
+
+def measure_startup(repeat):
+    # Building specs and ModelAdmin classes of every AutoAdminModel
+    from django.contrib import admin
+    from drofji_automatically_django_admin import spec
+    from drofji_automatically_django_admin.models import AutoAdminModel
+
+    models = [model for model in admin.site._registry if issubclass(model, AutoAdminModel)]
+
+    def _run():
+        for model in models:
+            admin.site.unregister(model)
+        spec.invalidate_admin_spec()
+        AutoAdminModel.register_all_admins(lazy=False)
+
+    return {"startup.register_all_admins": measure(_run, repeat)}
+
+
+def run_worker(size, repeat, data_dir, rebuild):
+    os.makedirs(data_dir, exist_ok=True)
+    database_path = os.path.join(data_dir, f"example_{size}.sqlite3")
+    if rebuild and os.path.exists(database_path):
+        os.remove(database_path)
+    setup_django(database_path)
+
+    started = time.perf_counter()
+    build_fixtures(size)
+    fixture_seconds = time.perf_counter() - started
+
+    # Materialize lazy registrations before measuring pages
+    from django.contrib import admin
+    admin.site.get_urls()
+
+    results = {}
+    results.update(measure_pages(size, repeat))
+    results.update(measure_columns(repeat))
+    results.update(measure_startup(repeat))
+    return {"fixture_seconds": round(fixture_seconds, 3), "results": results}
+
+
+# -------------------------------------------------------
+# Baseline comparison
+# -------------------------------------------------------
+def compare(current, baseline, tolerance):
+    # [(size, metric, message), ...]: slower beyond the tolerance, or more queries
+    regressions = []
+    for size, size_results in current["sizes"].items():
+        baseline_results = baseline.get("sizes", {}).get(size, {}).get("results", {})
+        for name, result in size_results["results"].items():
+            previous = baseline_results.get(name)
+            if previous is None:
+                continue
+            if result["queries"] > previous["queries"]:
+                regressions.append((size, name, f"queries {previous['queries']} -> {result['queries']}"))
+            if result["ms"] > previous["ms"] * (1 + tolerance) and result["ms"] - previous["ms"] > NOISE_MS:
+                regressions.append((size, name, f"median {previous['ms']:.1f} ms -> {result['ms']:.1f} ms"))
+    return regressions
+
+
+def print_results(current, baseline):
+    for size, size_results in current["sizes"].items():
+        print(f"\nrows={size} (fixtures {size_results['fixture_seconds']:.1f} s)")
+        baseline_results = baseline.get("sizes", {}).get(size, {}).get("results", {}) if baseline else {}
+        for name, result in size_results["results"].items():
+            line = f"  {name:<56} {result['ms']:>10.1f} ms {result['queries']:>4} queries"
+            if "rows_per_sec" in result:
+                line += f" {result['rows_per_sec']:>12,} rows/sec"
+            previous = baseline_results.get(name)
+            if previous:
+                line += f"   ({result['ms'] / previous['ms'] - 1:+.0%} vs baseline)" if previous["ms"] else ""
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the fixture databases")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_worker(args.worker, args.repeat, args.data_dir, args.rebuild), sys.stdout)
+        return
+
+    import django
+    current = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "sizes": {},
+    }
+    for size in args.sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+                   "--repeat", str(args.repeat), "--data-dir", args.data_dir]
+        if args.rebuild:
+            command.append("--rebuild")
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, cwd=BASE_DIR).stdout
+        current["sizes"][str(size)] = json.loads(output)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_results(current, baseline)
+    with open(args.baseline if args.save_baseline else args.output, "w") as f:
+        json.dump(current, f, indent=2)
+
+    if baseline:
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for size, name, message in regressions:
+                print(f"  rows={size} {name}: {message}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
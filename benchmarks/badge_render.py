@@ -0,0 +1,107 @@
+# benchmarks/badge_render.py
+#
+# Rows/sec of AutoAdminStatusBadgeField rendering: the previous linear scan
+# with per-row style building vs. the precompiled status lookup.
+#
+#   python benchmarks/badge_render.py [--rows 200000] [--choices 10]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(USE_I18N=False)
+    django.setup()
+
+from django.utils.html import format_html
+from drofji_automatically_django_admin import fields as drofji_fields
+
+
+# -------------------------------------------------------
+# Previous implementation, kept for comparison
+# -------------------------------------------------------
+def legacy_choice_html(choice, field_display, style_arguments):
+    styles = {
+        'color': choice.text_html_color,
+        'padding': '3px',
+        'padding-left': '10px',
+        'padding-right': '10px',
+        'white-space': 'nowrap',
+        'border-radius': '25px',
+        'background-color': choice.background_html_color,
+        'border': f'2px solid {choice.border_html_color}',
+    }
+    styles.update(style_arguments)
+    style_string = "; ".join([f"{k}: {v}" for k, v in styles.items()])
+    return format_html('<a style="{}">{}</a>', style_string, field_display)
+
+
+def legacy_get_html_choice(field, obj):
+    field_value = getattr(obj, field.field_name, "")
+    display_method = getattr(obj, f"get_{field.field_name}_display", None)
+    field_display = display_method() if display_method else field_value
+
+    for choice in field.choices:
+        if choice.status_string == field_value:
+            return legacy_choice_html(choice, field_display, field.style_arguments)
+
+    return field_display
+
+
+# -------------------------------------------------------
+# Fixtures
+# -------------------------------------------------------
+class Row:
+    def __init__(self, status):
+        self.status = status
+
+    def get_status_display(self):
+        return f"Status <{self.status}>"
+
+
+def build_field(choices_count):
+    return drofji_fields.AutoAdminStatusBadgeField(
+        field_name="status",
+        choices=[
+            drofji_fields.AutoAdminStatusBadgeFieldChoice(f"status_{i}")
+            for i in range(choices_count)
+        ],
+    )
+
+
+def measure(render, field, rows):
+    started = time.perf_counter()
+    for row in rows:
+        render(field, row)
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--choices", type=int, default=10)
+    args = parser.parse_args()
+
+    field = build_field(args.choices)
+    rows = [Row(f"status_{i % args.choices}") for i in range(args.rows)]
+
+    # Both paths must produce identical markup
+    for row in rows[:args.choices]:
+        assert str(legacy_get_html_choice(field, row)) == str(field.get_html_choice(row))
+
+    before = measure(legacy_get_html_choice, field, rows)
+    after = measure(lambda f, row: f.get_html_choice(row), field, rows)
+
+    print(f"rows={args.rows} choices={args.choices}")
+    print(f"before: {before:,.0f} rows/sec")
+    print(f"after:  {after:,.0f} rows/sec")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.utils import model_ngettext
+from django.utils.text import format_lazy
+from django.utils.translation import gettext_lazy as _, ngettext
+
+from drofji_automatically_django_admin.cache import render_cache
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_ACTIONS = {
+#     "CHUNK_SIZE": 10000,  # rows per UPDATE of generated set-field actions
+# }
+DEFAULT_ACTION_SETTINGS = {
+    "CHUNK_SIZE": 10000,
+}
+
+
+def get_action_settings():
+    options = dict(DEFAULT_ACTION_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_ACTIONS", {}))
+    return options
+
+
+# -------------------------------------------------------
+# Chunked UPDATE of a selection
+# -------------------------------------------------------
+def update_in_chunks(queryset, values, chunk_size):
+    # Walks the selection in pk order, chunk_size rows per UPDATE, so huge
+    # selections never hold one long lock; returns the number of rows updated
+    queryset = queryset.order_by("pk")
+    updated = 0
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        upper_pk = chunk.values_list("pk", flat=True)[chunk_size - 1:chunk_size].first()
+        if upper_pk is None:
+            return updated + chunk.update(**values)
+        updated += chunk.filter(pk__lte=upper_pk).update(**values)
+        last_pk = upper_pk
+
+
+def get_auto_now_values(model):
+    # QuerySet.update() skips pre_save(): stamp auto_now fields like save() does
+    instance = model()
+    return {
+        model_field.name: model_field.pre_save(instance, add=False)
+        for model_field in model._meta.concrete_fields
+        if getattr(model_field, "auto_now", False)
+    }
+
+
+def set_field(queryset, field_name, value, chunk_size=None):
+    model = queryset.model
+    if chunk_size is None:
+        chunk_size = get_action_settings()["CHUNK_SIZE"]
+
+    # Rows already holding the value are not written
+    values = {**get_auto_now_values(model), field_name: value}
+    updated = update_in_chunks(queryset.exclude(**{field_name: value}), values, chunk_size)
+
+    # update() sends no signals: invalidate admin caches
+    if updated:
+        render_cache.bump_model_version(model)
+    return updated
+
+
+# -------------------------------------------------------
+# "Set <field> to <value>" actions of flagged fields
+# -------------------------------------------------------
+def get_field_values(model_field):
+    # ((value, label), ...) offered by the generated actions
+    if model_field.choices:
+        values = [(value, label) for value, label in model_field.flatchoices if value not in ("", None)]
+    else:
+        values = [(True, _("Yes")), (False, _("No"))]
+    if model_field.null:
+        values.append((None, _("Unknown")))
+    return values
+
+
+def make_set_field_action(model_field, value, label):
+
+    @admin.action(
+        description=format_lazy(_("Set {field} to {value}"), field=model_field.verbose_name, value=label),
+        permissions=["change"],
+    )
+    def _action(self, request, queryset):
+        started = time.perf_counter()
+        updated = set_field(queryset, model_field.name, value)
+        self.message_user(request, ngettext(
+            "%(field)s set to %(value)s on %(count)d %(name)s in %(seconds).2f s.",
+            "%(field)s set to %(value)s on %(count)d %(name)s in %(seconds).2f s.",
+            updated,
+        ) % {
+            "field": model_field.verbose_name,
+            "value": label,
+            "count": updated,
+            "name": model_ngettext(self.opts, updated),
+            "seconds": time.perf_counter() - started,
+        }, messages.SUCCESS)
+
+    return _action
+
+
+def get_set_field_actions(model_field):
+    # ((action_name, action_function), ...)
+    return tuple(
+        (f"set_{model_field.name}_{i}", make_set_field_action(model_field, value, label))
+        for i, (value, label) in enumerate(get_field_values(model_field))
+    )
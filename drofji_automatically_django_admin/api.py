@@ -0,0 +1,341 @@
+import datetime
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import flatten_fieldsets
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views import View
+
+from drofji_automatically_django_admin import registry
+from drofji_automatically_django_admin.cache import KEY_PREFIX, get_render_cache_settings, render_cache
+from drofji_automatically_django_admin.changelist import decode_cursor, encode_cursor
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_API = {
+#     "PAGE_SIZE": 50,       # rows per list page
+#     "MAX_PAGE_SIZE": 500,  # upper bound of ?page_size=
+# }
+DEFAULT_API_SETTINGS = {
+    "PAGE_SIZE": 50,
+    "MAX_PAGE_SIZE": 500,
+}
+
+# Query string parameters that are not filters
+CURSOR_VAR = "cursor"
+FIELDS_VAR = "fields"
+PAGE_SIZE_VAR = "page_size"
+SEARCH_VAR = "q"
+RESERVED_VARS = {CURSOR_VAR, FIELDS_VAR, PAGE_SIZE_VAR, SEARCH_VAR}
+
+
+def get_api_settings():
+    options = dict(DEFAULT_API_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_API", {}))
+    return options
+
+
+class ApiError(Exception):
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+# -------------------------------------------------------
+# Fields and filters of the registered ModelAdmin
+# -------------------------------------------------------
+# The ModelAdmin is the compiled admin spec with admin_overrides applied:
+# the API exposes what the admin shows and filters what the admin filters
+def get_api_fields(model, model_admin, request, detail=False):
+    # {key: values() lookup}: list columns (form fields for detail) and
+    # SQL-backed function fields; Python function fields are not exposed
+    function_fields = model.get_admin_function_fields()
+    if detail:
+        names = flatten_fieldsets(model_admin.get_fieldsets(request))
+    else:
+        names = model_admin.get_list_display(request)
+
+    api_fields = {model._meta.pk.name: model._meta.pk.name}
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        function_field = function_fields.get(name)
+        if function_field is not None:
+            if function_field.annotation_name:
+                api_fields[function_field.name] = function_field.annotation_name
+            continue
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.many_to_many:
+            api_fields[name] = name
+
+    if detail:
+        # Detail includes what the list shows
+        list_fields = get_api_fields(model, model_admin, request)
+        api_fields.update({k: v for k, v in list_fields.items() if k not in api_fields})
+    return api_fields
+
+
+def get_api_filters(model, model_admin, request):
+    # {parameter: (field_name, lookup, value_field)} mirroring the admin's
+    # list_filter, including the filters of SQL-backed function fields
+    from drofji_automatically_django_admin.filters import AutoAdminAnnotationFilter
+
+    api_filters = {}
+    for list_filter in model_admin.get_list_filter(request):
+        if isinstance(list_filter, (list, tuple)):
+            field_name = list_filter[0]
+            value_field = model._meta.get_field(field_name)
+        elif isinstance(list_filter, type) and issubclass(list_filter, AutoAdminAnnotationFilter):
+            field_name = list_filter.parameter_name
+            value_field = list_filter.output_field
+        else:
+            field_name = getattr(list_filter, "field_name", None)
+            if not field_name:
+                continue
+            value_field = model._meta.get_field(field_name)
+        if isinstance(value_field, (models.DateField, models.TimeField, models.IntegerField,
+                                    models.FloatField, models.DecimalField)):
+            lookups = ("gte", "lte")
+        else:
+            lookups = ("exact", "in", "isnull")
+        for lookup in lookups:
+            parameter = field_name if lookup == "exact" else f"{field_name}__{lookup}"
+            api_filters[parameter] = (field_name, lookup, value_field)
+    return api_filters
+
+
+def to_filter_value(model_field, value):
+    if model_field is None:
+        # An annotation of unknown type
+        return value
+    if isinstance(model_field, models.BooleanField) and value.lower() in ("true", "false"):
+        value = value.capitalize()
+    if model_field.is_relation:
+        model_field = model_field.target_field
+    value = model_field.to_python(value)
+    if isinstance(value, datetime.datetime) and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+# -------------------------------------------------------
+# List/detail endpoints of every AutoAdminModel
+# -------------------------------------------------------
+class AutoAdminApiView(View):
+    http_method_names = ["get", "head", "options"]
+    admin_site = admin.site
+
+    def get(self, request, app_label=None, model_name=None, pk=None):
+        try:
+            if app_label is None:
+                return self.index(request)
+            model, model_admin = self.get_model_admin(request, app_label, model_name)
+            return self.serve(request, model, model_admin, pk)
+        except ApiError as e:
+            return JsonResponse({"detail": e.detail}, status=e.status)
+
+    # ---------------------------------------------------
+    # Access
+    # ---------------------------------------------------
+    def get_model_admin(self, request, app_label, model_name):
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            raise ApiError("Not found.", 404)
+        registry.materialize(self.admin_site)
+        if not getattr(model, "admin_api_enabled", False) or not self.admin_site.is_registered(model):
+            raise ApiError("Not found.", 404)
+        if not request.user.is_authenticated:
+            raise ApiError("Authentication credentials were not provided.", 401)
+
+        model_admin = self.admin_site.get_model_admin(model)
+        if not model_admin.has_view_or_change_permission(request):
+            raise ApiError("You do not have permission to view these objects.", 403)
+        return model, model_admin
+
+    def index(self, request):
+        # Endpoints, fields and filters of the models the user may view
+        if not request.user.is_authenticated:
+            raise ApiError("Authentication credentials were not provided.", 401)
+        endpoints = {}
+        registry.materialize(self.admin_site)
+        for model, model_admin in self.admin_site._registry.items():
+            if not getattr(model, "admin_api_enabled", False):
+                continue
+            if not model_admin.has_view_or_change_permission(request):
+                continue
+            opts = model._meta
+            endpoints[opts.label_lower] = {
+                "url": request.build_absolute_uri(reverse(
+                    "drofji_auto_admin_api:list", args=[opts.app_label, opts.model_name]
+                )),
+                "fields": list(get_api_fields(model, model_admin, request)),
+                "detail_fields": list(get_api_fields(model, model_admin, request, detail=True)),
+                "filters": list(get_api_filters(model, model_admin, request)),
+                "search": bool(model_admin.get_search_fields(request)),
+            }
+        return JsonResponse({"models": endpoints})
+
+    # ---------------------------------------------------
+    # Conditional responses
+    # ---------------------------------------------------
+    @staticmethod
+    def make_etag(state):
+        return quote_etag(hashlib.md5(state.encode()).hexdigest())
+
+    def get_version_etag(self, request, model):
+        # With a shared cache the model version changes on every write, so the
+        # ETag is checked before querying; a per-process cache can miss writes
+        # of other processes (None: the ETag hashes the response body instead)
+        if not get_render_cache_settings()["ALIAS"]:
+            return None
+        return self.make_etag("{}:api:{}:{}:{}:{}".format(
+            KEY_PREFIX,
+            model._meta.label_lower,
+            render_cache.get_model_version(model),
+            getattr(request.user, "pk", None),
+            request.get_full_path(),
+        ))
+
+    def serve(self, request, model, model_admin, pk):
+        etag = self.get_version_etag(request, model)
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+
+        if pk is None:
+            data = self.get_list(request, model, model_admin)
+        else:
+            data = self.get_detail(request, model, model_admin, pk)
+        body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+        if etag is None:
+            etag = self.make_etag(body)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        # Pollers revalidate every time; unchanged data costs a 304
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    # ---------------------------------------------------
+    # Querysets
+    # ---------------------------------------------------
+    def get_requested_fields(self, request, model, model_admin, detail):
+        api_fields = get_api_fields(model, model_admin, request, detail=detail)
+        requested = request.GET.get(FIELDS_VAR)
+        if not requested:
+            return api_fields
+        keys = [key.strip() for key in requested.split(",") if key.strip()]
+        unknown = [key for key in keys if key not in api_fields]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+        return {key: api_fields[key] for key in keys}
+
+    def apply_filters(self, request, model, model_admin, queryset):
+        api_filters = get_api_filters(model, model_admin, request)
+        for parameter, values in request.GET.lists():
+            if parameter in RESERVED_VARS:
+                continue
+            if parameter not in api_filters:
+                raise ApiError(f"Unknown filter '{parameter}'.")
+            field_name, lookup, model_field = api_filters[parameter]
+            value = values[-1]
+            try:
+                if lookup == "isnull":
+                    if value.lower() not in ("true", "false", "1", "0"):
+                        raise ValidationError("Expected true or false.")
+                    filter_value = value.lower() in ("true", "1")
+                elif lookup == "in":
+                    filter_value = [to_filter_value(model_field, v) for v in value.split(",")]
+                else:
+                    filter_value = to_filter_value(model_field, value)
+            except ValidationError as e:
+                raise ApiError(f"Invalid value for '{parameter}': {' '.join(e.messages)}")
+            queryset = queryset.filter(**{f"{field_name}__{lookup}": filter_value})
+        return queryset
+
+    @staticmethod
+    def project(queryset, api_fields, *extra):
+        # The admin queryset (row restrictions, annotations) reduced to the
+        # requested columns; values() also drops the unrequested annotations
+        return queryset.values(*dict.fromkeys([*api_fields.values(), *extra]))
+
+    def get_list(self, request, model, model_admin):
+        options = get_api_settings()
+        try:
+            page_size = min(int(request.GET.get(PAGE_SIZE_VAR, options["PAGE_SIZE"])), options["MAX_PAGE_SIZE"])
+        except ValueError:
+            raise ApiError(f"Invalid '{PAGE_SIZE_VAR}'.")
+        if page_size < 1:
+            raise ApiError(f"Invalid '{PAGE_SIZE_VAR}'.")
+
+        api_fields = self.get_requested_fields(request, model, model_admin, detail=False)
+        pk_name = model._meta.pk.name
+
+        queryset = self.apply_filters(request, model, model_admin, model_admin.get_queryset(request))
+        search_term = request.GET.get(SEARCH_VAR, "")
+        if search_term:
+            queryset, may_have_duplicates = model_admin.get_search_results(request, queryset, search_term)
+            if may_have_duplicates:
+                queryset = queryset.distinct()
+
+        token = request.GET.get(CURSOR_VAR)
+        if token:
+            try:
+                _value, last_pk, _backwards = decode_cursor(token)
+                last_pk = model._meta.pk.to_python(last_pk)
+            except (ValueError, TypeError, ValidationError):
+                raise ApiError(f"Invalid '{CURSOR_VAR}'.")
+            queryset = queryset.filter(pk__gt=last_pk)
+
+        # Cursor pagination on pk: every page costs the same, one extra row
+        # tells whether there is a next page (no COUNT query)
+        rows = list(self.project(queryset.order_by(pk_name), api_fields, pk_name)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        next_url = None
+        if has_next:
+            params = request.GET.copy()
+            params[CURSOR_VAR] = encode_cursor(rows[-1][pk_name], rows[-1][pk_name])
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+        return {
+            "results": [{key: row[lookup] for key, lookup in api_fields.items()} for row in rows],
+            "next": next_url,
+        }
+
+    def get_detail(self, request, model, model_admin, pk):
+        api_fields = self.get_requested_fields(request, model, model_admin, detail=True)
+        try:
+            pk = model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ApiError("Not found.", 404)
+        row = self.project(model_admin.get_queryset(request).filter(pk=pk), api_fields).first()
+        if row is None:
+            raise ApiError("Not found.", 404)
+        return {key: row[lookup] for key, lookup in api_fields.items()}
+
+
+api_view = AutoAdminApiView.as_view()
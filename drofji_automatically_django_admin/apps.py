@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class DrofjiAutomaticallyDjangoAdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drofji_automatically_django_admin'
-    verbose_name = "Drofji Automatically Django Admin"
\ No newline at end of file
+    verbose_name = "Drofji Automatically Django Admin"
+
+    def ready(self):
+        from drofji_automatically_django_admin import signals  # noqa: F401
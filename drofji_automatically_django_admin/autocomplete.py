@@ -0,0 +1,266 @@
+import collections
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.admin.utils import NotRelationField, get_fields_from_path
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.admin.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.db.models import CharField, Q, TextField
+from django.db.models.functions import Cast, Lower
+from django.http import JsonResponse
+from django.urls import NoReverseMatch, reverse
+from django.utils.text import smart_split, unescape_string_literal
+
+from drofji_automatically_django_admin.cache import KEY_PREFIX, render_cache
+from drofji_automatically_django_admin.signals import is_auto_admin_model
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_AUTOCOMPLETE = {
+#     "TIMEOUT": 60,        # TTL of cached result pages, seconds
+#     "MAX_ENTRIES": 1000,  # LRU bound of the in-process cache
+#     "PAGE_SIZE": 20,      # results per page
+# }
+DEFAULT_AUTOCOMPLETE_SETTINGS = {
+    "TIMEOUT": 60,
+    "MAX_ENTRIES": 1000,
+    "PAGE_SIZE": 20,
+}
+
+# Latencies kept per endpoint for percentiles
+METRICS_WINDOW = 1000
+
+
+def get_autocomplete_settings():
+    options = dict(DEFAULT_AUTOCOMPLETE_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_AUTOCOMPLETE", {}))
+    return options
+
+
+# -------------------------------------------------------
+# In-process LRU/TTL cache of result pages
+# -------------------------------------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_autocomplete_cache():
+    # LocMemCache evicts least recently used entries beyond MAX_ENTRIES
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                options = get_autocomplete_settings()
+                _cache = LocMemCache(f"{KEY_PREFIX}:autocomplete", {
+                    "TIMEOUT": options["TIMEOUT"],
+                    "OPTIONS": {"MAX_ENTRIES": options["MAX_ENTRIES"], "CULL_FREQUENCY": 10},
+                })
+    return _cache
+
+
+# -------------------------------------------------------
+# Per-endpoint latency metrics
+# -------------------------------------------------------
+class AutocompleteMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, hit):
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self._endpoints[endpoint] = {
+                    "requests": 0,
+                    "hits": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "latencies": collections.deque(maxlen=METRICS_WINDOW),
+                }
+            metrics["requests"] += 1
+            metrics["hits"] += int(hit)
+            metrics["total"] += seconds
+            metrics["max"] = max(metrics["max"], seconds)
+            metrics["latencies"].append(seconds)
+
+    def stats(self):
+        # {endpoint: {requests, hit_rate, avg_ms, p50_ms, p95_ms, max_ms}}
+        with self._lock:
+            snapshot = {
+                endpoint: dict(metrics, latencies=sorted(metrics["latencies"]))
+                for endpoint, metrics in self._endpoints.items()
+            }
+
+        def percentile(latencies, fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+        return {
+            endpoint: {
+                "requests": metrics["requests"],
+                "hit_rate": metrics["hits"] / metrics["requests"],
+                "avg_ms": metrics["total"] / metrics["requests"] * 1000,
+                "p50_ms": percentile(metrics["latencies"], 0.5),
+                "p95_ms": percentile(metrics["latencies"], 0.95),
+                "max_ms": metrics["max"] * 1000,
+            }
+            for endpoint, metrics in snapshot.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+autocomplete_metrics = AutocompleteMetrics()
+
+
+# -------------------------------------------------------
+# Autocomplete endpoint of generated ModelAdmin classes
+# -------------------------------------------------------
+def get_autocomplete_url(model_admin):
+    # Endpoint mounted on the source model's admin; None keeps Django's view
+    opts = model_admin.opts
+    try:
+        return reverse(
+            f"admin:{opts.app_label}_{opts.model_name}_autocomplete",
+            current_app=model_admin.admin_site.name,
+        )
+    except NoReverseMatch:
+        return None
+
+
+class AutoAdminAutocompleteJsonView(AutocompleteJsonView):
+
+    def get(self, request, *args, **kwargs):
+        started = time.perf_counter()
+
+        self.term, self.model_admin, self.source_field, to_field_name = self.process_request(request)
+        if not self.has_perm(request):
+            raise PermissionDenied
+
+        options = get_autocomplete_settings()
+        page = self.get_page_number(request)
+        remote_model = self.model_admin.model
+        endpoint = f"{self.source_field.model._meta.label_lower}.{self.source_field.name}"
+
+        # Querysets and limit_choices_to may depend on the user
+        key = "{}:{}:{}:{}:{}:{}".format(
+            endpoint,
+            self.get_target_version(remote_model),
+            getattr(request.user, "pk", None),
+            to_field_name,
+            page,
+            " ".join(self.term.lower().split()),
+        )
+        cache = get_autocomplete_cache()
+        data = cache.get(key)
+        hit = data is not None
+
+        if data is None:
+            page_size = options["PAGE_SIZE"]
+            offset = (page - 1) * page_size
+            # One extra row tells whether another page exists (no COUNT query)
+            rows = list(self.get_queryset(to_field_name)[offset:offset + page_size + 1])
+            data = {
+                "results": [self.serialize_result(obj, to_field_name) for obj in rows[:page_size]],
+                "pagination": {"more": len(rows) > page_size},
+            }
+            cache.set(key, data, timeout=options["TIMEOUT"])
+
+        elapsed = time.perf_counter() - started
+        autocomplete_metrics.record(endpoint, elapsed, hit)
+
+        response = JsonResponse(data)
+        response["Server-Timing"] = 'autocomplete;dur={:.2f};desc="{}"'.format(elapsed * 1000, "hit" if hit else "miss")
+        return response
+
+    @staticmethod
+    def get_target_version(remote_model):
+        # Writes to AutoAdmin models bump their version; other targets send
+        # no invalidation, so their pages are keyed by the TTL alone
+        if is_auto_admin_model(remote_model):
+            return render_cache.get_model_version(remote_model)
+        return "ttl"
+
+    @staticmethod
+    def get_page_number(request):
+        try:
+            return max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            return 1
+
+    def get_prefix_expression(self, field):
+        # Case-folded column: LOWER(col) LIKE 'term%' can use an index on
+        # LOWER(col), unlike UPPER(col) LIKE UPPER('term%') of istartswith
+        try:
+            target = get_fields_from_path(self.model_admin.model, field)[-1]
+        except (FieldDoesNotExist, NotRelationField):
+            # An annotation of the admin queryset
+            target = None
+        if target is None or isinstance(target, (CharField, TextField)):
+            return Lower(field)
+        return Lower(Cast(field, output_field=TextField()))
+
+    def get_prefix_aliases(self):
+        # {alias: case-folded search column}
+        return {
+            f"_autocomplete_{i}": self.get_prefix_expression(field.lstrip("^=@"))
+            for i, field in enumerate(self.model_admin.get_search_fields(self.request))
+        }
+
+    def get_prefix_filter(self, aliases):
+        # Every word must start one of the search columns
+        prefix_filter = Q()
+        for bit in smart_split(self.term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            bit_filter = Q()
+            for alias in aliases:
+                bit_filter |= Q(**{f"{alias}__startswith": bit.lower()})
+            prefix_filter &= bit_filter
+        return prefix_filter
+
+    def get_queryset(self, to_field_name=None):
+        get_only_fields = getattr(self.model_admin.model, "get_admin_autocomplete_only", None)
+        if get_only_fields is None:
+            return super().get_queryset()
+
+        qs = self.model_admin.get_queryset(self.request)
+        qs = qs.complex_filter(self.source_field.get_limit_choices_to())
+        if self.term:
+            aliases = self.get_prefix_aliases()
+            qs = qs.alias(**aliases).filter(self.get_prefix_filter(aliases))
+            if any("__" in field for field in self.model_admin.get_search_fields(self.request)):
+                qs = qs.distinct()
+
+        only_fields = get_only_fields()
+        if only_fields is not None:
+            qs = qs.only(*{*only_fields, to_field_name or qs.model._meta.pk.attname})
+
+        if not qs.ordered:
+            qs = qs.order_by(qs.model._meta.pk.name)
+        return qs
+
+
+# -------------------------------------------------------
+# Widgets pointing to the generated endpoint
+# -------------------------------------------------------
+class AutoAdminAutocompleteMixin:
+
+    def get_url(self):
+        model_admin = self.admin_site.get_model_admin(self.field.model)
+        return get_autocomplete_url(model_admin) or super().get_url()
+
+
+class AutoAdminAutocompleteSelect(AutoAdminAutocompleteMixin, AutocompleteSelect):
+    pass
+
+
+class AutoAdminAutocompleteSelectMultiple(AutoAdminAutocompleteMixin, AutocompleteSelectMultiple):
+    pass
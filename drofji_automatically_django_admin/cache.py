@@ -0,0 +1,148 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_RENDER_CACHE = {
+#     "ALIAS": None,         # Django cache alias; None uses a private LocMemCache
+#     "TIMEOUT": 300,        # TTL of rendered cells, seconds
+#     "MAX_ENTRIES": 10000,  # size bound of the private LocMemCache
+# }
+DEFAULT_RENDER_CACHE_SETTINGS = {
+    "ALIAS": None,
+    "TIMEOUT": 300,
+    "MAX_ENTRIES": 10000,
+}
+
+KEY_PREFIX = "drofji_auto_admin"
+
+_MISSING = object()
+
+
+def get_render_cache_settings():
+    options = dict(DEFAULT_RENDER_CACHE_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_RENDER_CACHE", {}))
+    return options
+
+
+# -------------------------------------------------------
+# Render cache for function and badge columns
+# -------------------------------------------------------
+class AutoAdminRenderCache:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            options = get_render_cache_settings()
+            if options["ALIAS"]:
+                self._backend = caches[options["ALIAS"]]
+            else:
+                self._backend = LocMemCache(KEY_PREFIX, {
+                    "TIMEOUT": options["TIMEOUT"],
+                    "OPTIONS": {"MAX_ENTRIES": options["MAX_ENTRIES"]},
+                })
+        return self._backend
+
+    @property
+    def timeout(self):
+        return get_render_cache_settings()["TIMEOUT"]
+
+    # ---------------------------------------------------
+    # Per-model version counters
+    # ---------------------------------------------------
+    # The model version is bumped by every write. Models versioning rows by
+    # 'admin_render_cache_version_field' also keep a bulk version, bumped by
+    # writes that bypass save() (update(), bulk_update(), bulk_create()) and
+    # so may leave the version field untouched
+    @staticmethod
+    def get_version_key(model, kind="version"):
+        return f"{KEY_PREFIX}:{kind}:{model._meta.label_lower}"
+
+    def get_counter(self, key):
+        version = self.backend.get(key)
+        if version is None:
+            # Start from a clock value so a culled counter never reuses old keys
+            self.backend.add(key, time.time_ns(), timeout=None)
+            version = self.backend.get(key)
+        return version
+
+    def bump_counter(self, key):
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.add(key, time.time_ns(), timeout=None)
+
+    def get_model_version(self, model):
+        return self.get_counter(self.get_version_key(model))
+
+    def bump_model_version(self, model, bulk=True):
+        # bulk=False: a save()/delete() of single rows, seen by the version field
+        self.bump_counter(self.get_version_key(model))
+        if bulk and getattr(model, "admin_render_cache_version_field", None):
+            self.bump_counter(self.get_version_key(model, "bulk_version"))
+
+    def get_row_version(self, obj):
+        version_field = getattr(type(obj), "admin_render_cache_version_field", None)
+        if version_field:
+            value = getattr(obj, version_field)
+            value = value.isoformat() if hasattr(value, "isoformat") else value
+            return f"{self.get_counter(self.get_version_key(type(obj), 'bulk_version'))}.{value}"
+        return self.get_model_version(type(obj))
+
+    # ---------------------------------------------------
+    # Rendered cells
+    # ---------------------------------------------------
+    def make_key(self, obj, column, version):
+        return f"{KEY_PREFIX}:cell:{obj._meta.label_lower}:{obj.pk}:{version}:{column}"
+
+    def get_or_render(self, obj, column, render):
+        if obj.pk is None:
+            return render()
+
+        key = self.make_key(obj, column, self.get_row_version(obj))
+        value = self.backend.get(key, _MISSING)
+
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = render()
+        self.backend.set(key, value, timeout=self.timeout)
+        return value
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+
+render_cache = AutoAdminRenderCache()
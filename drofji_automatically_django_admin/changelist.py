@@ -0,0 +1,264 @@
+import base64
+import copy
+import hashlib
+import json
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import build_q_object_from_lookup_parameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.urls import NoReverseMatch, reverse
+
+from drofji_automatically_django_admin.cache import KEY_PREFIX, render_cache
+from drofji_automatically_django_admin.paginators import EstimatedCountPaginator
+
+# Query string parameter holding the keyset cursor
+CURSOR_VAR = "_cursor"
+
+
+# -------------------------------------------------------
+# Keyset cursor encoding
+# -------------------------------------------------------
+def encode_cursor(value, pk, backwards=False):
+    payload = json.dumps([value, pk, backwards], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    value, pk, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return value, pk, bool(backwards)
+
+
+# -------------------------------------------------------
+# ChangeList used by generated ModelAdmin classes
+# -------------------------------------------------------
+class AutoAdminChangeList(ChangeList):
+
+    def apply_select_related(self, qs):
+        qs = super().apply_select_related(qs)
+
+        prefetch_related = getattr(self.model_admin, "list_prefetch_related", ())
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+
+        return qs
+
+    # ---------------------------------------------------
+    # Export links keeping the current filters and search
+    # ---------------------------------------------------
+    def get_export_urls(self):
+        from drofji_automatically_django_admin.export import FORMAT_VAR, FORMATS
+
+        try:
+            url = reverse(
+                f"admin:{self.opts.app_label}_{self.opts.model_name}_export",
+                current_app=self.model_admin.admin_site.name,
+            )
+        except NoReverseMatch:
+            return []
+        return [
+            (export_format.upper(), url + self.get_query_string({FORMAT_VAR: export_format}, [PAGE_VAR]))
+            for export_format in FORMATS
+        ]
+
+    # ---------------------------------------------------
+    # Facet counts of all choice/boolean filters in one query
+    # ---------------------------------------------------
+    def get_filters(self, request):
+        filter_specs, *rest = super().get_filters(request)
+        if getattr(self, "_exclude_shared_facets", False):
+            # Their parameters are consumed, so they filter nothing
+            filter_specs = [spec for spec in filter_specs if not getattr(spec, "shared_facets", False)]
+        return (filter_specs, *rest)
+
+    def get_facet_base_queryset(self, request):
+        # Current queryset without the shared-facet filters; get_queryset()
+        # rebinds the filter state, which the sidebar is still rendering
+        state = self.__dict__.copy()
+        self._exclude_shared_facets = True
+        try:
+            return self.get_queryset(request)
+        finally:
+            self.__dict__.clear()
+            self.__dict__.update(state)
+
+    def get_facet_cache_key(self, request):
+        params = sorted((key, tuple(values)) for key, values in self.get_filters_params().items())
+        state = json.dumps([params, self.query], cls=DjangoJSONEncoder)
+        # Querysets may depend on the user (admin get_queryset overrides)
+        user_pk = getattr(getattr(request, "user", None), "pk", None)
+        return "{}:facets:{}:{}:{}:{}".format(
+            KEY_PREFIX,
+            self.opts.label_lower,
+            render_cache.get_model_version(self.model),
+            user_pk,
+            hashlib.md5(state.encode()).hexdigest(),
+        )
+
+    def get_shared_facet_counts(self, request):
+        # {field_path: {count_key: count}} for every filter with shared_facets
+        facet_counts = getattr(self, "_shared_facet_counts", None)
+        if facet_counts is not None:
+            return facet_counts
+
+        from drofji_automatically_django_admin.filters import get_filter_cache_settings
+
+        key = self.get_facet_cache_key(request)
+        facet_counts = render_cache.backend.get(key)
+        if facet_counts is None:
+            facet_counts = self.compute_shared_facet_counts(request)
+            render_cache.backend.set(key, facet_counts, timeout=get_filter_cache_settings()["FACET_TIMEOUT"])
+
+        self._shared_facet_counts = facet_counts
+        return facet_counts
+
+    def compute_shared_facet_counts(self, request):
+        facet_specs = [spec for spec in self.filter_specs if getattr(spec, "shared_facets", False)]
+        if not facet_specs:
+            return {}
+
+        base_queryset = self.get_facet_base_queryset(request)
+        active_filters = {
+            spec.field_path: build_q_object_from_lookup_parameters(spec.used_parameters)
+            for spec in facet_specs
+        }
+
+        # Each filter counts its options under the selections of the other filters
+        aggregates = {}
+        aliases = {}
+        for spec in facet_specs:
+            other_filters = Q()
+            for field_path, active_filter in active_filters.items():
+                if field_path != spec.field_path:
+                    other_filters &= active_filter
+            for count_key, count in spec.get_facet_counts(self.pk_attname, base_queryset).items():
+                count = copy.copy(count)
+                count.filter = count.filter & other_filters if count.filter is not None else other_filters
+                alias = f"facet{len(aggregates)}"
+                aggregates[alias] = count
+                aliases[alias] = (spec.field_path, count_key)
+
+        results = base_queryset.aggregate(**aggregates)
+
+        facet_counts = {spec.field_path: {} for spec in facet_specs}
+        for alias, (field_path, count_key) in aliases.items():
+            facet_counts[field_path][count_key] = results[alias]
+        return facet_counts
+
+    # ---------------------------------------------------
+    # Keyset pagination
+    # ---------------------------------------------------
+    @property
+    def keyset_ordering(self):
+        return getattr(self.model_admin, "keyset_ordering", None)
+
+    def get_keyset_fields(self):
+        # (field, descending) for the ordering field and the pk tie-breaker
+        descending = self.keyset_ordering.startswith("-")
+        field_name = self.keyset_ordering.lstrip("-")
+        if field_name in ("pk", self.opts.pk.name):
+            return [("pk", descending)]
+        return [(field_name, descending), ("pk", descending)]
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing filters, search or ordering starts again from the first page
+        remove = list(remove or []) + [CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_ordering(self, request, queryset):
+        if not self.keyset_ordering:
+            return super().get_ordering(request, queryset)
+        return [f"-{name}" if descending else name for name, descending in self.get_keyset_fields()]
+
+    def get_keyset_filter(self, values, backwards):
+        # Rows strictly after (or before) 'values' in keyset order
+        keyset_filter = Q()
+        equal_filter = Q()
+        for (name, descending), value in zip(self.get_keyset_fields(), values):
+            lookup = "lt" if descending != backwards else "gt"
+            keyset_filter |= equal_filter & Q(**{f"{name}__{lookup}": value})
+            equal_filter &= Q(**{name: value})
+        return keyset_filter
+
+    def get_row_cursor(self, obj, backwards=False):
+        values = [obj.pk if name == "pk" else getattr(obj, name) for name, _ in self.get_keyset_fields()]
+        return encode_cursor(values[0], obj.pk, backwards)
+
+    def parse_cursor(self, token):
+        try:
+            value, pk, backwards = decode_cursor(token)
+            fields = self.get_keyset_fields()
+            pk = self.opts.pk.to_python(pk)
+            if len(fields) == 1:
+                return [pk], backwards
+            return [self.opts.get_field(fields[0][0]).to_python(value), pk], backwards
+        except (ValueError, TypeError, ValidationError, FieldDoesNotExist) as e:
+            raise IncorrectLookupParameters(e)
+
+    def get_results(self, request):
+        # Only the displayed page skips unused columns; get_queryset() also
+        # feeds actions and exports, which may read any field
+        list_only = getattr(self.model_admin, "list_only", None)
+        if list_only:
+            self.queryset = self.queryset.only(*list_only)
+
+        if not self.keyset_ordering:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        if not isinstance(paginator, EstimatedCountPaginator):
+            # Cursors need no total: an exact COUNT would cost what keyset paging saves
+            paginator = EstimatedCountPaginator(self.queryset, self.list_per_page)
+        result_count = paginator.count
+        full_result_count = None
+
+        queryset = self.queryset
+        token = self.params.get(CURSOR_VAR)
+        backwards = False
+        if token:
+            values, backwards = self.parse_cursor(token)
+            queryset = queryset.filter(self.get_keyset_filter(values, backwards))
+            if backwards:
+                queryset = queryset.reverse()
+
+        # One extra row tells whether another page exists in this direction
+        rows = list(queryset[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if backwards:
+            rows.reverse()
+
+        # Keep a queryset (list_editable formsets need one) without a second query
+        result_list = queryset[:self.list_per_page]
+        result_list._result_cache = rows
+        result_list._prefetch_done = True
+
+        has_next = has_more if not backwards else bool(token)
+        has_previous = bool(token) and (has_more if backwards else True)
+
+        self.first_page_url = self.get_query_string() if token else None
+        self.next_cursor_url = (
+            self.get_query_string({CURSOR_VAR: self.get_row_cursor(rows[-1])})
+            if has_next and rows else None
+        )
+        self.previous_cursor_url = (
+            self.get_query_string({CURSOR_VAR: self.get_row_cursor(rows[0], backwards=True)})
+            if has_previous and rows else None
+        )
+
+        self.result_count = result_count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = has_next or has_previous
+        self.paginator = paginator
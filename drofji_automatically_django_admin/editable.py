@@ -0,0 +1,204 @@
+import json
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.forms import BaseModelFormSet, ModelChoiceField
+from django.utils.translation import gettext_lazy as _
+
+from drofji_automatically_django_admin import history
+from drofji_automatically_django_admin.cache import KEY_PREFIX, render_cache
+
+# POST parameter holding the cell values the changelist was rendered with
+SNAPSHOT_VAR = "_list_snapshot"
+SNAPSHOT_SALT = f"{KEY_PREFIX}:list_editable"
+
+
+# -------------------------------------------------------
+# Cell values of editable columns
+# -------------------------------------------------------
+def get_cell_values(obj, model_fields):
+    # {name: serialized value}; None stays None (value_to_string gives "None")
+    return {
+        model_field.name: (
+            None if getattr(obj, model_field.attname) is None else model_field.value_to_string(obj)
+        )
+        for model_field in model_fields
+    }
+
+
+def to_cell_value(model_field, value):
+    return None if value is None else model_field.to_python(value)
+
+
+# -------------------------------------------------------
+# Changelist formset: changed cells and optimistic concurrency
+# -------------------------------------------------------
+class FormSetObjectChoiceField(ModelChoiceField):
+    # Hidden pk of a formset row, resolved from the rows the formset already
+    # loaded instead of one get() per row
+
+    def __init__(self, formset, *args, **kwargs):
+        self.formset = formset
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            obj = self.formset._existing_object(self.formset.model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        return obj if obj is not None else super().to_python(value)
+
+
+class AutoAdminListEditableFormSet(BaseModelFormSet):
+    snapshot_var = SNAPSHOT_VAR
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_name = self._pk_field.name
+        pk_field = form.fields.get(pk_name)
+        if form.is_bound and type(pk_field) is ModelChoiceField:
+            form.fields[pk_name] = FormSetObjectChoiceField(
+                self, pk_field.queryset, initial=pk_field.initial, required=False, widget=pk_field.widget,
+            )
+
+    @property
+    def editable_fields(self):
+        return [self.model._meta.get_field(name) for name in self.form._meta.fields]
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            queryset = super().get_queryset()
+            if self.is_bound:
+                self.lock_rows(queryset)
+            # Values in the database before the forms assign the POSTed ones
+            self.current_values = {
+                str(obj.pk): get_cell_values(obj, self.editable_fields) for obj in queryset
+            }
+        return self._queryset
+
+    def lock_rows(self, queryset):
+        # Rows stay locked until the bulk update commits (no-op on SQLite)
+        connection = connections[queryset.db]
+        if not (connection.features.has_select_for_update and connection.in_atomic_block):
+            return
+        list(
+            self.model._base_manager.using(queryset.db)
+            .select_for_update()
+            .filter(pk__in=queryset.values("pk"))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def get_snapshot(self):
+        self.get_queryset()
+        return signing.dumps(self.current_values, salt=SNAPSHOT_SALT, compress=True)
+
+    def get_original_values(self):
+        # Cell values the submitting page showed; {} when missing or tampered with
+        try:
+            return signing.loads(self.data.get(SNAPSHOT_VAR, ""), salt=SNAPSHOT_SALT)
+        except signing.BadSignature:
+            return {}
+
+    def clean(self):
+        super().clean()
+        original_values = self.get_original_values()
+
+        for form in self.initial_forms:
+            if form.errors:
+                continue
+            key = str(form.instance.pk)
+            original = original_values.get(key)
+            current = self.current_values.get(key)
+            if original is None or current is None:
+                continue
+
+            changed = []
+            conflicts = []
+            for model_field in self.editable_fields:
+                name = model_field.name
+                submitted_value = getattr(form.instance, model_field.attname)
+                original_value = to_cell_value(model_field, original.get(name))
+                current_value = to_cell_value(model_field, current[name])
+                # Cells left as displayed are not written, even if changed since
+                if submitted_value == original_value or submitted_value == current_value:
+                    continue
+                changed.append(name)
+                if current_value != original_value:
+                    conflicts.append(str(form.fields[name].label))
+
+            if conflicts:
+                form.add_error(None, _(
+                    "This row was changed by someone else after the page was loaded "
+                    "(%(fields)s). Reload the page and enter your changes again."
+                ) % {"fields": ", ".join(conflicts)})
+            else:
+                # Only the edited cells count as changes: saved, logged, messaged
+                form.changed_data = changed
+
+
+# -------------------------------------------------------
+# Changed rows written with one bulk_update per field set
+# -------------------------------------------------------
+class ListEditableBatch:
+
+    def __init__(self, model, using, batch_size=None):
+        self.model = model
+        self.using = using
+        self.batch_size = batch_size
+        # {(field_name, ...): [obj, ...]}
+        self.updates = {}
+        self.log_entries = []
+
+    def add(self, obj, field_names):
+        if field_names:
+            self.updates.setdefault(tuple(sorted(field_names)), []).append(obj)
+
+    def add_log_entry(self, user_id, obj, change_message):
+        from django.contrib.admin.models import CHANGE, LogEntry
+        from django.contrib.contenttypes.models import ContentType
+
+        if isinstance(change_message, list):
+            change_message = json.dumps(change_message)
+        self.log_entries.append(LogEntry(
+            user_id=user_id,
+            content_type_id=ContentType.objects.get_for_model(obj, for_concrete_model=False).id,
+            object_id=obj.pk,
+            object_repr=str(obj)[:200],
+            action_flag=CHANGE,
+            change_message=change_message,
+        ))
+
+    def flush(self):
+        from django.contrib.admin.models import LogEntry
+
+        if not self.updates and not self.log_entries:
+            return
+
+        # bulk_update() skips pre_save(): stamp auto_now fields like save() does
+        auto_now_fields = [
+            model_field for model_field in self.model._meta.concrete_fields
+            if getattr(model_field, "auto_now", False)
+        ]
+        manager = self.model._base_manager.db_manager(self.using)
+
+        with transaction.atomic(using=self.using):
+            for field_names, objs in self.updates.items():
+                for model_field in auto_now_fields:
+                    for obj in objs:
+                        model_field.pre_save(obj, add=False)
+                update_fields = [*field_names, *(f.name for f in auto_now_fields if f.name not in field_names)]
+                manager.bulk_update(objs, update_fields, batch_size=self.batch_size)
+                if history.is_history_enabled(self.model):
+                    history.record_instances(objs, update_fields, self.using)
+            if self.log_entries:
+                LogEntry.objects.bulk_create(self.log_entries)
+
+        self.updates = {}
+        self.log_entries = []
+
+        # bulk_update() sends no signals: invalidate admin caches
+        render_cache.bump_model_version(self.model)
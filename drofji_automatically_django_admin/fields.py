@@ -1,8 +1,9 @@
 import typing
 from random import choice
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
-from django.utils.html import format_html
+from django.utils.html import conditional_escape, format_html, strip_tags
 from django.utils.safestring import mark_safe
 from drofji_automatically_django_admin import validators
 from django import forms
@@ -14,17 +15,25 @@ from django import forms
 
 
 class AutoAdminField:
+    # Admin options of every AutoAdmin model field. Field types change the
+    # defaults below; 'editable' goes to Django's Field as usual
+    default_show_in_list = True
+    default_searchable = True
+    default_filterable = False
+
     def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=True,
-                 filterable=False,
-                 editable=True,
+                 show_in_list=None,
+                 searchable=None,
+                 filterable=None,
+                 editable_in_list=False,
+                 bulk_actions=False,
                  **kwargs):
 
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+        self.show_in_list = self.default_show_in_list if show_in_list is None else show_in_list
+        self.searchable = self.default_searchable if searchable is None else searchable
+        self.filterable = self.default_filterable if filterable is None else filterable
+        self.editable_in_list = editable_in_list
+        self.bulk_actions = bulk_actions
 
         super().__init__(*args, **kwargs)
 
@@ -36,60 +45,34 @@ class AutoAdminNotDatabaseField:
 # -----------------------------
 # Define AutoAdmin field types
 # -----------------------------
-class AutoAdminCharField(models.CharField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=True,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
+class AutoAdminCharField(AutoAdminField, models.CharField):
+    def __init__(self, *args, autocomplete=None, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
-
-        autocomplete = kwargs.get('autocomplete')
-
         if autocomplete is None:
             self.autocomplete = True if kwargs.get('choices') else False
         else:
             self.autocomplete = autocomplete
 
 
-class AutoAdminTextField(models.TextField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminTextField(AutoAdminField, models.TextField):
+    default_searchable = False
 
 
-class AutoAdminFileField(models.FileField, AutoAdminField):
+class AutoAdminFileField(AutoAdminField, models.FileField):
+    default_show_in_list = False
+    default_searchable = False
+
     def __init__(
             self,
-            show_in_list=False,
-            searchable=False,
-            filterable=False,
-            editable=True,
+            *args,
             allowed_extensions: typing.List[typing.Union[validators.FileExtensionEnum, str]] = None,
             allowed_encodings: typing.List[typing.Union[validators.FileEncodingEnum, str]] = None,
             max_size_bytes: int = None,
-            *args, **kwargs
+            **kwargs
     ):
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
-
         self.allowed_extensions = allowed_extensions
+        self.allowed_encodings = allowed_encodings
         self.max_size_bytes = max_size_bytes
 
         self.file_validator = validators.FileValidator(
@@ -98,10 +81,24 @@ class AutoAdminFileField(models.FileField, AutoAdminField):
             max_size_bytes=max_size_bytes
         )
 
-        kwargs.setdefault('validators', []).append(self.file_validator)
+        kwargs['validators'] = [*kwargs.get('validators', []), self.file_validator]
 
         super().__init__(*args, **kwargs)
 
+    def deconstruct(self):
+        # The file validator is rebuilt from the options below; keeping it in
+        # 'validators' would append a second one on every reconstruction
+        name, path, args, kwargs = super().deconstruct()
+        field_validators = [
+            validator for validator in kwargs.pop('validators', []) if validator is not self.file_validator
+        ]
+        if field_validators:
+            kwargs['validators'] = field_validators
+        for option in ('allowed_extensions', 'allowed_encodings', 'max_size_bytes'):
+            if getattr(self, option) is not None:
+                kwargs[option] = getattr(self, option)
+        return name, path, args, kwargs
+
     def formfield(self, **kwargs):
         if self.allowed_extensions:
             accept_value = ",".join([
@@ -114,184 +111,75 @@ class AutoAdminFileField(models.FileField, AutoAdminField):
         return super().formfield(**kwargs)
 
 
-class AutoAdminFilePathField(models.FilePathField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=False,
-                 searchable=False,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminFilePathField(AutoAdminField, models.FilePathField):
+    default_show_in_list = False
+    default_searchable = False
 
 
-class AutoAdminJSONField(models.JSONField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=False,
-                 searchable=False,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminJSONField(AutoAdminField, models.JSONField):
+    default_show_in_list = False
+    default_searchable = False
 
 
-class AutoAdminIntegerField(models.IntegerField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=True,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminIntegerField(AutoAdminField, models.IntegerField):
+    default_searchable = False
+    default_filterable = True
 
 
-class AutoAdminFloatField(models.FloatField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminFloatField(AutoAdminField, models.FloatField):
+    default_searchable = False
 
 
-class AutoAdminDecimalField(models.DecimalField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminDecimalField(AutoAdminField, models.DecimalField):
+    default_searchable = False
 
 
-class AutoAdminBooleanField(models.BooleanField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=True,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminBooleanField(AutoAdminField, models.BooleanField):
+    default_searchable = False
+    default_filterable = True
 
 
-class AutoAdminDateField(models.DateField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=True,
-                 editable=True,
-                 **kwargs):
+# auto_now/auto_now_add make Django's date fields non-editable themselves
+class AutoAdminDateField(AutoAdminField, models.DateField):
+    default_searchable = False
+    default_filterable = True
 
-        auto_now = kwargs.get('auto_now', False)
-        auto_now_add = kwargs.get('auto_now_add', False)
 
-        if not (auto_now or auto_now_add):
-            kwargs['editable'] = editable
+class AutoAdminTimeField(AutoAdminField, models.TimeField):
+    default_searchable = False
+    default_filterable = True
 
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-
-
-class AutoAdminTimeField(models.TimeField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=True,
-                 editable=True,
-                 **kwargs):
-
-        auto_now = kwargs.get('auto_now', False)
-        auto_now_add = kwargs.get('auto_now_add', False)
-
-        if not (auto_now or auto_now_add):
-            kwargs['editable'] = editable
 
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-
-
-class AutoAdminDateTimeField(models.DateTimeField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=False,
-                 filterable=True,
-                 editable=True,
-                 **kwargs):
+class AutoAdminDateTimeField(AutoAdminField, models.DateTimeField):
+    default_searchable = False
+    default_filterable = True
 
-        auto_now = kwargs.get('auto_now', False)
-        auto_now_add = kwargs.get('auto_now_add', False)
 
-        if not (auto_now or auto_now_add):
-            kwargs['editable'] = editable
+class AutoAdminForeignKey(AutoAdminField, models.ForeignKey):
+    default_filterable = True
 
+    def __init__(self, *args, autocomplete=True, **kwargs):
         super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-
-
-class AutoAdminForeignKey(models.ForeignKey):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=True,
-                 filterable=True,
-                 editable=True,
-                 autocomplete=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
         self.autocomplete = autocomplete
 
 
-class AutoAdminEmailField(models.EmailField, AutoAdminField):
-    def __init__(self, *args,
-                 show_in_list=True,
-                 searchable=True,
-                 filterable=False,
-                 editable=True,
-                 **kwargs):
-        super().__init__(*args, **kwargs)
-        self.show_in_list = show_in_list
-        self.searchable = searchable
-        self.filterable = filterable
-        self.editable = editable
+class AutoAdminEmailField(AutoAdminField, models.EmailField):
+    pass
 
 
 class AutoAdminFunctionField(AutoAdminNotDatabaseField):
-    def __init__(self, func, verbose_name=None, show_in_list=True,
-                 show_in_form=True, safe_html=False, *args, **kwargs):
-        if not callable(func):
+    def __init__(self, func=None, verbose_name=None, show_in_list=True,
+                 show_in_form=True, safe_html=False,
+                 select_related: typing.List[str] = None,
+                 prefetch_related: typing.List[str] = None,
+                 expression=None,
+                 searchable=False,
+                 filterable=False,
+                 columns: typing.List[str] = None,
+                 *args, **kwargs):
+        if func is None and expression is None:
+            raise ValueError("AutoAdminFunctionField requires a callable 'func' or an 'expression'.")
+        if func is not None and not callable(func):
             raise ValueError("AutoAdminFunctionField requires a callable 'func'.")
 
         self.func = func
@@ -300,15 +188,66 @@ class AutoAdminFunctionField(AutoAdminNotDatabaseField):
         self.show_in_form = show_in_form
         self.safe_html = safe_html
 
+        # Relations read by 'func', joined/prefetched for the changelist
+        self.select_related = list(select_related or [])
+        self.prefetch_related = list(prefetch_related or [])
+
+        # Model fields read by 'func'; None: unknown, the changelist loads every column
+        self.columns = list(columns) if columns is not None else None
+
+        # Query expression annotated on the admin queryset (sortable, filterable)
+        self.expression = expression
+        self.searchable = searchable if expression is not None else False
+        self.filterable = filterable if expression is not None else False
+        self.name = None
+
         super().__init__()
 
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    @property
+    def annotation_name(self):
+        return self.name if self.expression is not None else None
+
+    def get_columns(self):
+        # Columns the changelist must load; annotated values need none
+        if self.expression is not None or self.func is None:
+            return list(self.columns or [])
+        return self.columns
+
+    def get_value(self, obj):
+        if self.expression is None:
+            return self.func(obj)
+
+        # Rows from the generated admin queryset carry the annotated value
+        if self.name in obj.__dict__:
+            return obj.__dict__[self.name]
+
+        if self.func is not None:
+            return self.func(obj)
+
+        return (
+            type(obj)._default_manager
+            .filter(pk=obj.pk)
+            .annotate(**{self.name: self.expression})
+            .values_list(self.name, flat=True)
+            .first()
+        )
+
     def get_display_value(self, obj):
-        value = self.func(obj)
+        value = self.get_value(obj)
         if self.safe_html:
             from django.utils.safestring import mark_safe
             return mark_safe(value)
         return value
 
+    def get_export_value(self, obj):
+        value = self.get_value(obj)
+        if self.safe_html and isinstance(value, str):
+            return strip_tags(value)
+        return value
+
 
 class AutoAdminStatusBadgeFieldChoice:
     def __init__(
@@ -321,7 +260,7 @@ class AutoAdminStatusBadgeFieldChoice:
         self.background_html_color = background_html_color
         self.border_html_color = border_html_color
 
-    def get_html_choice(self, field_display, style_arguments: dict):
+    def get_style_string(self, style_arguments: dict):
 
         styles = {
             'color': self.text_html_color,
@@ -334,14 +273,16 @@ class AutoAdminStatusBadgeFieldChoice:
             'border': f'2px solid {self.border_html_color}',
         }
         styles.update(style_arguments)
-        style_string = "; ".join([f"{k}: {v}" for k, v in styles.items()])
+        return "; ".join([f"{k}: {v}" for k, v in styles.items()])
 
-        formated_html = format_html(
-            '<a style="{}">{}</a>',
-            style_string,
-            field_display
-        )
-        return formated_html
+    def compile_html(self, style_arguments: dict):
+        # Opening/closing markup rendered once; only the label is escaped per row
+        opening_html = format_html('<a style="{}">', self.get_style_string(style_arguments))
+        return str(opening_html), '</a>'
+
+    def get_html_choice(self, field_display, style_arguments: dict):
+        opening_html, closing_html = self.compile_html(style_arguments)
+        return mark_safe(opening_html + conditional_escape(field_display) + closing_html)
 
 
 class AutoAdminStatusBadgeField(AutoAdminFunctionField):
@@ -356,6 +297,12 @@ class AutoAdminStatusBadgeField(AutoAdminFunctionField):
         self.field_name = field_name
         self.style_arguments = style_arguments or {}
 
+        # status value -> (opening_html, closing_html); first matching choice wins
+        self.compiled_choices = {}
+        for choice in self.choices:
+            if choice.status_string not in self.compiled_choices:
+                self.compiled_choices[choice.status_string] = choice.compile_html(self.style_arguments)
+
         super().__init__(
             func=self.get_html_choice,
             verbose_name=verbose_name,
@@ -363,15 +310,43 @@ class AutoAdminStatusBadgeField(AutoAdminFunctionField):
             *args, **kwargs
         )
 
-    def get_html_choice(self, obj):
-
+    def get_related_lookups(self, model):
+        # The badge reads 'field_name' from the row; join it when it is a relation
+        if not self.field_name:
+            return []
+        try:
+            field = model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            return []
+        if field.many_to_one or field.one_to_one:
+            return [self.field_name]
+        return []
+
+    def get_columns(self):
+        # The badge reads 'field_name' only
+        return [self.field_name, *(self.columns or [])] if self.field_name else list(self.columns or [])
+
+    def get_field_display(self, obj):
         field_value = getattr(obj, self.field_name, "")
         display_method_name = f"get_{self.field_name}_display"
         display_method = getattr(obj, display_method_name, None)
-        field_display = display_method() if display_method else field_value
+        return field_value, display_method() if display_method else field_value
 
-        for choice in self.choices:
-            if choice.status_string == field_value:
-                return choice.get_html_choice(field_display, self.style_arguments)
+    def get_export_value(self, obj):
+        # Plain text of the badge
+        return self.get_field_display(obj)[1]
+
+    def get_html_choice(self, obj):
+
+        field_value, field_display = self.get_field_display(obj)
+
+        try:
+            compiled_html = self.compiled_choices.get(field_value)
+        except TypeError:
+            compiled_html = None
+
+        if compiled_html is None:
+            return field_display
 
-        return field_display
+        opening_html, closing_html = compiled_html
+        return mark_safe(opening_html + conditional_escape(field_display) + closing_html)
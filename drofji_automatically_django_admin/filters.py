@@ -0,0 +1,429 @@
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldError, ValidationError
+from django.db import models
+from django.contrib.admin.filters import (
+    AllValuesFieldListFilter, BooleanFieldListFilter, ChoicesFieldListFilter, SimpleListFilter,
+)
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.db.models import Count, Max, Min, Q
+from django.urls import NoReverseMatch, reverse
+from django.utils import formats, timezone
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+from rangefilter.filters import DateRangeFilter, NumericRangeFilter
+
+from drofji_automatically_django_admin.cache import KEY_PREFIX, render_cache
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_FILTER_CACHE = {
+#     "TIMEOUT": 600,  # TTL of cached filter statistics, seconds
+#     "BUCKETS": 10,   # histogram buckets of range filters
+#     "FACET_TIMEOUT": 30,  # TTL of facet counts per filter state, seconds
+#     "DISTINCT_LIMIT": 50,  # values listed by distinct-value filters
+# }
+DEFAULT_FILTER_CACHE_SETTINGS = {
+    "TIMEOUT": 600,
+    "BUCKETS": 10,
+    "FACET_TIMEOUT": 30,
+    "DISTINCT_LIMIT": 50,
+}
+
+
+def get_filter_cache_settings():
+    options = dict(DEFAULT_FILTER_CACHE_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_FILTER_CACHE", {}))
+    return options
+
+
+# -------------------------------------------------------
+# Bounds and histograms of range-filtered fields
+# -------------------------------------------------------
+RANGE_FIELD_TYPES = (models.DateField, models.IntegerField, models.FloatField, models.DecimalField)
+
+
+def get_range_fields(model):
+    # Range-filtered fields of the generated admin; computed together
+    get_admin_spec = getattr(model, "get_admin_spec", None)
+    if get_admin_spec is None:
+        return ()
+    return tuple(
+        entry[0] for entry in get_admin_spec().list_filter
+        if isinstance(entry, tuple) and issubclass(entry[1], AutoAdminRangeFilterMixin)
+    )
+
+
+def to_number(field, value):
+    if isinstance(field, models.DateTimeField):
+        return value.timestamp()
+    if isinstance(field, models.DateField):
+        return value.toordinal()
+    return float(value)
+
+
+def from_number(field, number):
+    if isinstance(field, models.DateTimeField):
+        return datetime.datetime.fromtimestamp(number, tz=timezone.get_current_timezone() if settings.USE_TZ else None)
+    if isinstance(field, models.DateField):
+        return datetime.date.fromordinal(int(number))
+    if isinstance(field, models.DecimalField):
+        return round(Decimal(number), field.decimal_places)
+    if isinstance(field, models.IntegerField):
+        return round(number)
+    return float(f"{number:.6g}")
+
+
+def get_bucket_edges(field, lower, upper, buckets):
+    if lower is None or upper is None or lower == upper:
+        return []
+
+    start, end = to_number(field, lower), to_number(field, upper)
+    if isinstance(field, (models.IntegerField, models.DateField)) and not isinstance(field, models.DateTimeField):
+        # Whole units (integers, days) never split into more buckets than values
+        buckets = min(buckets, int(end - start) + 1)
+
+    width = (end - start) / buckets
+    edges = [lower] + [from_number(field, start + width * i) for i in range(1, buckets)] + [upper]
+
+    # Rounding to whole units can repeat an edge
+    unique_edges = []
+    for edge in edges:
+        if not unique_edges or edge > unique_edges[-1]:
+            unique_edges.append(edge)
+    return unique_edges
+
+
+def compute_range_stats(model, field_names, buckets):
+    if not field_names:
+        return {}
+
+    # Two queries per model rather than one: the bucket edges are derived
+    # from the bounds, and bucketing in SQL would need per-backend date math
+    manager = model._default_manager
+    fields = {name: model._meta.get_field(name) for name in field_names}
+
+    # Query 1: bounds of every range field
+    bounds = manager.aggregate(**{
+        alias: aggregate
+        for name in field_names
+        for alias, aggregate in ((f"{name}__min", Min(name)), (f"{name}__max", Max(name)))
+    })
+
+    # Query 2: bucket counts of every range field as conditional aggregates
+    edges = {
+        name: get_bucket_edges(fields[name], bounds[f"{name}__min"], bounds[f"{name}__max"], buckets)
+        for name in field_names
+        if not isinstance(fields[name], models.TimeField)
+    }
+    counts = {}
+    for name, field_edges in edges.items():
+        last = len(field_edges) - 2
+        for i, (lower, upper) in enumerate(zip(field_edges, field_edges[1:])):
+            upper_lookup = "lte" if i == last else "lt"
+            condition = Q(**{f"{name}__gte": lower, f"{name}__{upper_lookup}": upper})
+            counts[f"{name}__{i}"] = Count("pk", filter=condition)
+    bucket_counts = manager.aggregate(**counts) if counts else {}
+
+    stats = {}
+    for name in field_names:
+        field_edges = edges.get(name, [])
+        stats[name] = {
+            "min": bounds[f"{name}__min"],
+            "max": bounds[f"{name}__max"],
+            "histogram": [
+                (lower, upper, bucket_counts[f"{name}__{i}"])
+                for i, (lower, upper) in enumerate(zip(field_edges, field_edges[1:]))
+            ],
+        }
+    return stats
+
+
+def get_range_stats(model, field_names=None):
+    # Cached per model version: any save/delete of the model starts a new entry
+    if field_names is None:
+        field_names = get_range_fields(model)
+    field_names = tuple(field_names)
+    if not field_names:
+        return {}
+
+    options = get_filter_cache_settings()
+    version = render_cache.get_model_version(model)
+    key = f"{KEY_PREFIX}:range:{model._meta.label_lower}:{version}:{','.join(field_names)}"
+
+    stats = render_cache.backend.get(key)
+    if stats is None:
+        stats = compute_range_stats(model, field_names, options["BUCKETS"])
+        render_cache.backend.set(key, stats, timeout=options["TIMEOUT"])
+    return stats
+
+
+def format_bound(value):
+    # Date inputs of DateRangeFilter take the date part of datetime bounds
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return formats.localize(value)
+
+
+def render_histogram(histogram):
+    if not histogram:
+        return ""
+    highest = max(count for _lower, _upper, count in histogram) or 1
+    bars = format_html_join(
+        "",
+        '<span class="auto-admin-histogram-bar" style="height: {}%" title="{} – {}: {}"></span>',
+        (
+            (max(round(count * 100 / highest), 2 if count else 0),
+             formats.localize(lower), formats.localize(upper), count)
+            for lower, upper, count in histogram
+        ),
+    )
+    return format_html('<span class="auto-admin-histogram">{}</span>', bars)
+
+
+# -------------------------------------------------------
+# Range filters with data bounds and histogram
+# -------------------------------------------------------
+class AutoAdminRangeFilterMixin:
+
+    def get_range_stats(self):
+        if "__" in self.field_path:
+            return None
+        model = self.field.model
+        field_names = get_range_fields(model) or (self.field_path,)
+        if self.field_path not in field_names:
+            field_names = (self.field_path,)
+        return get_range_stats(model, field_names).get(self.field_path)
+
+    def get_form(self, request):
+        form = super().get_form(request)
+
+        stats = self.get_range_stats()
+        if not stats or stats["min"] is None:
+            return form
+
+        lower_field = form.fields[self.lookup_kwarg_gte]
+        upper_field = form.fields[self.lookup_kwarg_lte]
+        lower_field.widget.attrs["placeholder"] = format_bound(stats["min"])
+        upper_field.widget.attrs["placeholder"] = format_bound(stats["max"])
+
+        # Rendered by form.as_p() below the inputs
+        upper_field.help_text = format_html(
+            "{}{}",
+            render_histogram(stats["histogram"]),
+            _("Range: %(min)s – %(max)s") % {
+                "min": format_bound(stats["min"]),
+                "max": format_bound(stats["max"]),
+            },
+        )
+        return form
+
+
+class AutoAdminNumericRangeFilter(AutoAdminRangeFilterMixin, NumericRangeFilter):
+    pass
+
+
+class AutoAdminDateRangeFilter(AutoAdminRangeFilterMixin, DateRangeFilter):
+    pass
+
+
+# -------------------------------------------------------
+# Choice/boolean filters sharing one facet count query
+# -------------------------------------------------------
+class AutoAdminFacetMixin:
+    # Counted together by AutoAdminChangeList.get_shared_facet_counts()
+    shared_facets = True
+
+    def get_facet_queryset(self, changelist):
+        get_shared_facet_counts = getattr(changelist, "get_shared_facet_counts", None)
+        if get_shared_facet_counts is None:
+            return super().get_facet_queryset(changelist)
+        return get_shared_facet_counts(self.request)[self.field_path]
+
+
+class AutoAdminBooleanFieldListFilter(AutoAdminFacetMixin, BooleanFieldListFilter):
+    pass
+
+
+class AutoAdminChoicesFieldListFilter(AutoAdminFacetMixin, ChoicesFieldListFilter):
+    pass
+
+
+# -------------------------------------------------------
+# Distinct-value filter with a bounded, cached value list
+# -------------------------------------------------------
+def get_distinct_values(queryset, field_path, limit, user_pk=None):
+    # (values, truncated): at most 'limit' values, cached per model version
+    model = queryset.model
+    key = "{}:distinct:{}:{}:{}:{}".format(
+        KEY_PREFIX, model._meta.label_lower, render_cache.get_model_version(model), field_path, user_pk
+    )
+    sample = render_cache.backend.get(key)
+    if sample is None:
+        values = list(queryset[:limit + 1])
+        sample = (values[:limit], len(values) > limit)
+        render_cache.backend.set(key, sample, timeout=get_filter_cache_settings()["TIMEOUT"])
+    return sample
+
+
+class AutoAdminAllValuesFieldListFilter(AutoAdminFacetMixin, AllValuesFieldListFilter):
+    # Fields served by AutoAdminModelAdmin.distinct_values_view()
+    distinct_values = True
+    picker_template = "drofji_automatically_django_admin/distinct_values_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+        user_pk = getattr(getattr(request, "user", None), "pk", None)
+        values, self.is_truncated = get_distinct_values(
+            self.lookup_choices, field_path, get_filter_cache_settings()["DISTINCT_LIMIT"], user_pk
+        )
+
+        # Too many values to list: searchable AJAX picker instead
+        self.picker_url = None
+        if self.is_truncated:
+            opts = model._meta
+            try:
+                self.picker_url = reverse(
+                    f"admin:{opts.app_label}_{opts.model_name}_distinct_values",
+                    args=[field_path],
+                    current_app=model_admin.admin_site.name,
+                )
+            except NoReverseMatch:
+                pass
+
+        if self.picker_url:
+            self.lookup_choices = []
+            self.template = self.picker_template
+        else:
+            self.lookup_choices = values
+
+    def choices(self, changelist):
+        if not self.picker_url:
+            yield from super().choices(changelist)
+            return
+
+        yield {
+            "selected": self.lookup_val is None and self.lookup_val_isnull is None,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            "display": _("All"),
+        }
+        for value in self.lookup_val or []:
+            yield {
+                "selected": True,
+                "query_string": changelist.get_query_string({self.lookup_kwarg: value}, [self.lookup_kwarg_isnull]),
+                "display": value,
+            }
+        if self.lookup_val_isnull:
+            yield {
+                "selected": True,
+                "query_string": changelist.get_query_string({self.lookup_kwarg_isnull: "True"}, [self.lookup_kwarg]),
+                "display": self.empty_value_display,
+            }
+
+
+# -------------------------------------------------------
+# Filters of SQL-backed function fields (annotations)
+# -------------------------------------------------------
+def get_output_field(expression):
+    try:
+        return expression.output_field
+    except (AttributeError, FieldError):
+        # Not resolvable before the query (e.g. a bare F())
+        return None
+
+
+class AutoAdminAnnotationFilter(SimpleListFilter):
+    # Subclassed per field: 'parameter_name' is the annotation name.
+    # Numeric/date values are filtered by buckets between the cached
+    # bounds, other values by their (bounded, cached) distinct values
+    output_field = None
+    separator = "~"
+
+    def __init__(self, request, params, model, model_admin):
+        self.model_admin = model_admin
+        super().__init__(request, params, model, model_admin)
+
+    @property
+    def is_range(self):
+        return isinstance(self.output_field, RANGE_FIELD_TYPES)
+
+    def get_cache_key(self, request, kind):
+        model = self.model_admin.model
+        return "{}:annotation_{}:{}:{}:{}:{}".format(
+            KEY_PREFIX, kind, model._meta.label_lower, render_cache.get_model_version(model),
+            self.parameter_name, getattr(getattr(request, "user", None), "pk", None),
+        )
+
+    def lookups(self, request, model_admin):
+        queryset = model_admin.get_queryset(request)
+        if self.is_range:
+            return self.get_range_lookups(request, queryset)
+        return self.get_value_lookups(request, queryset)
+
+    def get_range_lookups(self, request, queryset):
+        options = get_filter_cache_settings()
+        key = self.get_cache_key(request, "range")
+        edges = render_cache.backend.get(key)
+        if edges is None:
+            bounds = queryset.aggregate(lower=Min(self.parameter_name), upper=Max(self.parameter_name))
+            edges = get_bucket_edges(self.output_field, bounds["lower"], bounds["upper"], options["BUCKETS"])
+            if not edges and bounds["lower"] is not None:
+                edges = [bounds["lower"], bounds["upper"]]
+            render_cache.backend.set(key, edges, timeout=options["TIMEOUT"])
+
+        lookups = []
+        for i, (lower, upper) in enumerate(zip(edges, edges[1:])):
+            # Half-open buckets; the last one is open-ended so it keeps the maximum
+            is_last = i == len(edges) - 2
+            value = f"{lower}{self.separator}" if is_last else f"{lower}{self.separator}{upper}"
+            label = f"≥ {formats.localize(lower)}" if is_last else f"{formats.localize(lower)} – {formats.localize(upper)}"
+            lookups.append((value, label))
+        return lookups
+
+    def get_value_lookups(self, request, queryset):
+        values_queryset = queryset.order_by(self.parameter_name).values_list(self.parameter_name, flat=True).distinct()
+        key = self.get_cache_key(request, "values")
+        sample = render_cache.backend.get(key)
+        if sample is None:
+            values = list(values_queryset[:get_filter_cache_settings()["DISTINCT_LIMIT"]])
+            sample = [value for value in values if value is not None]
+            render_cache.backend.set(key, sample, timeout=get_filter_cache_settings()["TIMEOUT"])
+        return [(str(value), str(value)) for value in sample]
+
+    def to_python(self, value):
+        if self.output_field is None or value == "":
+            return value
+        try:
+            return self.output_field.to_python(value)
+        except ValidationError as e:
+            raise IncorrectLookupParameters(e)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        if not self.is_range:
+            return queryset.filter(**{self.parameter_name: self.to_python(value)})
+
+        lower, separator, upper = value.partition(self.separator)
+        if not separator:
+            raise IncorrectLookupParameters(f"Invalid range '{value}'.")
+        conditions = {f"{self.parameter_name}__gte": self.to_python(lower)}
+        if upper:
+            conditions[f"{self.parameter_name}__lt"] = self.to_python(upper)
+        return queryset.filter(**conditions)
+
+
+def make_annotation_filter(name, title, expression):
+    return type(f"{name.capitalize()}AnnotationFilter", (AutoAdminAnnotationFilter,), {
+        "title": title,
+        "parameter_name": name,
+        "output_field": get_output_field(expression),
+    })
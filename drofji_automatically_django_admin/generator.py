@@ -0,0 +1,427 @@
+import datetime
+import decimal
+import functools
+import multiprocessing
+import random
+import uuid
+from dataclasses import dataclass, field as dataclass_field
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connections, models
+from django.db.models.fields import AutoFieldMixin
+from django.utils.text import capfirst
+
+from drofji_automatically_django_admin import validators
+from drofji_automatically_django_admin.cache import render_cache
+
+FIRST_NAMES = [
+    "Anna", "Boris", "Clara", "Denis", "Elena", "Felix", "Galina", "Hugo", "Irina", "Jonas",
+    "Katya", "Leon", "Maria", "Nikolai", "Olga", "Pavel", "Quinn", "Rosa", "Sergei", "Tanja",
+]
+LAST_NAMES = [
+    "Ivanova", "Smith", "Petrov", "Müller", "Garcia", "Novak", "Rossi", "Kowalski", "Sato", "Silva",
+    "Johnson", "Schmidt", "Dubois", "Larsen", "Costa", "Horvat", "Popescu", "Nagy", "Yilmaz", "Brown",
+]
+WORDS = (
+    "admin list filter order customer product price total status origin report export import "
+    "value field record change history index query table page search result batch update"
+).split()
+
+# Name hints for text columns without choices
+TEXT_HINTS = {
+    "first_name": FIRST_NAMES,
+    "last_name": LAST_NAMES,
+}
+
+# Placeholder content per extension: signatures for binary formats, valid
+# text for text formats (encoded with the field's first allowed encoding)
+PLACEHOLDER_CONTENT = {
+    validators.FileExtensionEnum.PDF.value: b"%PDF-1.4\n% placeholder\n%%EOF\n",
+    validators.FileExtensionEnum.DOCX.value: b"PK\x03\x04placeholder",
+    validators.FileExtensionEnum.JPG.value: b"\xff\xd8\xff\xe0placeholder\xff\xd9",
+    validators.FileExtensionEnum.PNG.value: b"\x89PNG\r\n\x1a\nplaceholder",
+    validators.FileExtensionEnum.JSON.value: '{"placeholder": true}\n',
+    validators.FileExtensionEnum.CSV.value: "id,value\n1,placeholder\n",
+    validators.FileExtensionEnum.TXT.value: "placeholder\n",
+}
+
+
+class GeneratorError(Exception):
+    pass
+
+
+@dataclass
+class GeneratorOptions:
+    seed: int = 0
+    date_from: datetime.date = None
+    date_to: datetime.date = None
+    # Share of None in nullable columns
+    null_ratio: float = 0.1
+    batch_size: int = 5000
+    # {model label: {field name: stored placeholder file name}}
+    files: dict = dataclass_field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.date_to is None:
+            self.date_to = datetime.date.today()
+        if self.date_from is None:
+            self.date_from = self.date_to - datetime.timedelta(days=365)
+
+
+# -------------------------------------------------------
+# Generation order following foreign keys
+# -------------------------------------------------------
+def get_parent_models(model):
+    # Models the (non self-referencing) foreign keys point to
+    return {
+        model_field.related_model for model_field in model._meta.concrete_fields
+        if model_field.many_to_one or model_field.one_to_one
+        if model_field.related_model is not model
+    }
+
+
+def get_generation_order(models_to_generate):
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered:
+            return
+        if model in visiting:
+            raise GeneratorError(f"Foreign keys of {model._meta.label} form a cycle.")
+        visiting.add(model)
+        for parent in get_parent_models(model):
+            if parent in models_to_generate:
+                visit(parent)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in models_to_generate:
+        visit(model)
+    return ordered
+
+
+# -------------------------------------------------------
+# Values from field types and options
+# -------------------------------------------------------
+class ParentSample:
+    # Primary keys rows can point to, loaded one chunk per batch instead of
+    # the whole parent table
+    chunk_size = 1000
+
+    def __init__(self, model, using):
+        self.queryset = model._base_manager.using(using).order_by("pk").values_list("pk", flat=True)
+        self.count = self.queryset.count()
+        self.pks = []
+
+    def load(self, position, size):
+        # 'size' pks from 'position' on, wrapping around to the first rows
+        position %= self.count
+        self.pks = list(self.queryset[position:position + size])
+        if len(self.pks) < size and position:
+            self.pks += self.queryset[:min(size - len(self.pks), position)]
+        return self.pks
+
+
+def get_value_range(model_field, default_min, default_max):
+    # Bounds of the field's own and its backend range validators
+    low, high = default_min, default_max
+    for validator in model_field.validators:
+        if isinstance(validator, MinValueValidator) and not callable(validator.limit_value):
+            low = max(low, validator.limit_value)
+        elif isinstance(validator, MaxValueValidator) and not callable(validator.limit_value):
+            high = min(high, validator.limit_value)
+    return low, max(low, high)
+
+
+def truncate(value, model_field):
+    return value[:model_field.max_length] if model_field.max_length else value
+
+
+def make_text_value(model_field):
+    if isinstance(model_field, models.EmailField):
+        return lambda index, rng: truncate(f"{model_field.name.replace('_', '.')}{index}@example.com", model_field)
+    if isinstance(model_field, models.URLField):
+        return lambda index, rng: truncate(f"https://example.com/{model_field.name}/{index}", model_field)
+    if isinstance(model_field, models.SlugField):
+        return lambda index, rng: truncate(f"{model_field.name.replace('_', '-')}-{index}", model_field)
+    if isinstance(model_field, models.TextField):
+        return lambda index, rng: " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))).capitalize() + "."
+
+    names = TEXT_HINTS.get(model_field.name)
+    if names is not None:
+        # Index suffix keeps values unique and searchable
+        return lambda index, rng: truncate(f"{names[index % len(names)]}{index}", model_field)
+    label = capfirst(str(model_field.verbose_name))
+    return lambda index, rng: truncate(f"{label} {index}", model_field)
+
+
+def make_decimal_value(model_field):
+    # Up to six integer digits, at the field's precision
+    digits = min(model_field.max_digits, model_field.decimal_places + 6)
+    places = model_field.decimal_places
+    return lambda index, rng: decimal.Decimal(rng.randrange(10 ** digits)).scaleb(-places)
+
+
+def make_unique_value(model_field, options):
+    # Values derived from the row index, which continues after existing rows
+    if isinstance(model_field, models.DecimalField):
+        return lambda index, rng: decimal.Decimal(index)
+    if isinstance(model_field, models.IntegerField):
+        low, _high = get_value_range(model_field, 0, 1_000_000)
+        return lambda index, rng: low + index
+    if isinstance(model_field, models.FloatField):
+        return lambda index, rng: float(index)
+    if isinstance(model_field, models.DateTimeField):
+        tzinfo = datetime.timezone.utc if settings.USE_TZ else None
+        start = datetime.datetime.combine(options.date_from, datetime.time(), tzinfo)
+        return lambda index, rng: start + datetime.timedelta(seconds=index)
+    if isinstance(model_field, models.DateField):
+        return lambda index, rng: options.date_from + datetime.timedelta(days=index)
+    if isinstance(model_field, models.TimeField):
+        return lambda index, rng: datetime.time(index // 3600 % 24, index // 60 % 60, index % 60)
+    if isinstance(model_field, models.DurationField):
+        return lambda index, rng: datetime.timedelta(seconds=index)
+    if isinstance(model_field, models.GenericIPAddressField):
+        return lambda index, rng: f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+    if isinstance(model_field, models.JSONField):
+        return lambda index, rng: {"index": index, "value": rng.randrange(1000)}
+    if isinstance(model_field, models.BinaryField):
+        return lambda index, rng: index.to_bytes(16, "big")
+    return None
+
+
+def make_value(model_field, options):
+    # (index, rng) -> value of one row
+    if model_field.unique and not model_field.choices:
+        # Text values below already carry the index
+        value = make_unique_value(model_field, options)
+        if value is not None:
+            return value
+
+    if model_field.choices:
+        values = [value for value, _label in model_field.flatchoices if value not in ("", None)]
+        return lambda index, rng: rng.choice(values)
+
+    if isinstance(model_field, models.BooleanField):
+        return lambda index, rng: rng.random() < 0.5
+    if isinstance(model_field, (models.CharField, models.TextField)):
+        return make_text_value(model_field)
+    if isinstance(model_field, models.DecimalField):
+        return make_decimal_value(model_field)
+    if isinstance(model_field, models.IntegerField):
+        low, high = get_value_range(model_field, 0, 1_000_000)
+        return lambda index, rng: rng.randint(low, high)
+    if isinstance(model_field, models.FloatField):
+        return lambda index, rng: round(rng.uniform(0, 1000), 2)
+
+    days = max((options.date_to - options.date_from).days, 1)
+    if isinstance(model_field, models.DateTimeField):
+        tzinfo = datetime.timezone.utc if settings.USE_TZ else None
+        start = datetime.datetime.combine(options.date_from, datetime.time(), tzinfo)
+        return lambda index, rng: start + datetime.timedelta(seconds=rng.randrange(days * 86400))
+    if isinstance(model_field, models.DateField):
+        return lambda index, rng: options.date_from + datetime.timedelta(days=rng.randrange(days))
+    if isinstance(model_field, models.TimeField):
+        return lambda index, rng: datetime.time(rng.randrange(24), rng.randrange(60), rng.randrange(60))
+    if isinstance(model_field, models.DurationField):
+        return lambda index, rng: datetime.timedelta(seconds=rng.randrange(86400))
+
+    if isinstance(model_field, models.UUIDField):
+        return lambda index, rng: uuid.UUID(int=rng.getrandbits(128), version=4)
+    if isinstance(model_field, models.GenericIPAddressField):
+        return lambda index, rng: f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    if isinstance(model_field, models.JSONField):
+        return lambda index, rng: {"index": index, "value": rng.randrange(1000)}
+    if isinstance(model_field, models.BinaryField):
+        return lambda index, rng: rng.randbytes(16)
+
+    if model_field.has_default():
+        return lambda index, rng: model_field.get_default()
+    if model_field.null:
+        return lambda index, rng: None
+    raise GeneratorError(f"Cannot generate values for {model_field.model._meta.label}.{model_field.name}.")
+
+
+def needs_value(model_field):
+    # False for columns the database or pre_save() fill
+    if getattr(model_field, "auto_now", False) or getattr(model_field, "auto_now_add", False):
+        return False
+    if getattr(model_field, "generated", False):
+        return False
+    return not isinstance(model_field, AutoFieldMixin)
+
+
+# -------------------------------------------------------
+# Placeholder files accepted by the field's FileValidator
+# -------------------------------------------------------
+def get_placeholder_extension(model_field):
+    file_validator = getattr(model_field, "file_validator", None)
+    allowed = file_validator.allowed_extensions if file_validator else []
+    for extension in allowed or [validators.FileExtensionEnum.TXT.value]:
+        if extension in PLACEHOLDER_CONTENT:
+            return extension
+    raise GeneratorError(
+        f"No placeholder content for the extensions of {model_field.model._meta.label}.{model_field.name}."
+    )
+
+
+def create_placeholder_file(model_field):
+    # One stored file per field, referenced by every generated row
+    extension = get_placeholder_extension(model_field)
+    content = PLACEHOLDER_CONTENT[extension]
+    if isinstance(content, str):
+        file_validator = getattr(model_field, "file_validator", None)
+        encodings = file_validator.allowed_encodings if file_validator else []
+        content = content.encode(encodings[0] if encodings else "utf-8")
+
+    instance = model_field.model()
+    name = model_field.storage.save(
+        model_field.generate_filename(instance, f"placeholder.{extension}"), ContentFile(content)
+    )
+    setattr(instance, model_field.attname, name)
+    try:
+        model_field.run_validators(getattr(instance, model_field.attname))
+    except ValidationError as e:
+        model_field.storage.delete(name)
+        raise GeneratorError(f"Placeholder for {model_field.model._meta.label}.{model_field.name}: {' '.join(e.messages)}")
+    return name
+
+
+def create_placeholder_files(model):
+    return {
+        model_field.name: create_placeholder_file(model_field)
+        for model_field in model._meta.concrete_fields
+        if isinstance(model_field, models.FileField) and not (model_field.null or model_field.blank)
+    }
+
+
+# -------------------------------------------------------
+# Row factory of one model
+# -------------------------------------------------------
+class RowFactory:
+
+    def __init__(self, model, options, using):
+        self.model = model
+        # [(attname, nullable, value function), ...]
+        self.columns = []
+        # [(ParentSample, one_to_one), ...] reloaded at every batch
+        self.samples = []
+        self.batch_start = 0
+        files = options.files.get(model._meta.label, {})
+        for model_field in model._meta.concrete_fields:
+            if not needs_value(model_field):
+                continue
+            nullable = model_field.null and options.null_ratio > 0
+            if model_field.is_relation:
+                value = self.make_relation_value(model_field, using)
+            elif isinstance(model_field, models.FileField):
+                name = files.get(model_field.name, "")
+                value = lambda index, rng, name=name: name
+            else:
+                value = make_value(model_field, options)
+            self.columns.append((model_field.attname, nullable, value))
+        self.null_ratio = options.null_ratio
+
+    def make_relation_value(self, model_field, using):
+        parent = model_field.related_model
+        sample = ParentSample(parent, using)
+        if not sample.count:
+            if model_field.null:
+                return lambda index, rng: None
+            raise GeneratorError(
+                f"{self.model._meta.label}.{model_field.name} needs {parent._meta.label} rows; generate them first."
+            )
+        self.samples.append((sample, model_field.one_to_one))
+        if model_field.one_to_one:
+            # Row i of the batch points to the i-th parent from the batch start
+            return lambda index, rng: sample.pks[(index - self.batch_start) % len(sample.pks)]
+        return lambda index, rng: rng.choice(sample.pks)
+
+    def start_batch(self, start, stop, rng):
+        self.batch_start = start
+        for sample, one_to_one in self.samples:
+            if one_to_one:
+                sample.load(start, stop - start)
+            else:
+                sample.load(rng.randrange(sample.count), sample.chunk_size)
+
+    def build(self, index, rng):
+        instance = self.model()
+        for attname, nullable, value in self.columns:
+            setattr(instance, attname, None if nullable and rng.random() < self.null_ratio else value(index, rng))
+        return instance
+
+
+_factories = {}
+
+
+def generate_batch(label, options, using, bounds):
+    # Rows [start, stop) of one model; the seed depends on the batch only, so
+    # the data is the same for any number of processes
+    start, stop = bounds
+    model = apps.get_model(label)
+    key = (label, using)
+    if key not in _factories:
+        _factories[key] = RowFactory(model, options, using)
+    factory = _factories[key]
+
+    rng = random.Random(f"{options.seed}:{label}:{start}")
+    factory.start_batch(start, stop, rng)
+    objs = [factory.build(index, rng) for index in range(start, stop)]
+    # _base_manager: plain bulk_create, no change history entries
+    model._base_manager.using(using).bulk_create(objs)
+    return len(objs)
+
+
+def init_worker():
+    import django
+
+    if not apps.ready:
+        django.setup()
+
+
+def can_use_processes(using):
+    # SQLite has a single writer: parallel inserts would only wait on the lock
+    return connections[using].vendor != "sqlite"
+
+
+# -------------------------------------------------------
+# Run
+# -------------------------------------------------------
+def generate(model, rows, options, using, processes=1, on_batch=None):
+    # Inserts 'rows' rows in batches of options.batch_size; returns the count
+    label = model._meta.label
+    options.files[label] = create_placeholder_files(model)
+    _factories.clear()
+
+    # Indexes continue after the existing rows so unique values stay unique
+    offset = model._base_manager.using(using).count()
+    ranges = [
+        (start, min(start + options.batch_size, offset + rows))
+        for start in range(offset, offset + rows, options.batch_size)
+    ]
+    run_batch = functools.partial(generate_batch, label, options, using)
+
+    created = 0
+    if processes > 1 and len(ranges) > 1 and can_use_processes(using):
+        # Forked workers must open their own connections
+        connections.close_all()
+        with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+            for count in pool.imap_unordered(run_batch, ranges):
+                created += count
+                if on_batch is not None:
+                    on_batch(model, created)
+    else:
+        for bounds in ranges:
+            created += run_batch(bounds)
+            if on_batch is not None:
+                on_batch(model, created)
+
+    # bulk_create sends no signals: invalidate admin caches
+    render_cache.bump_model_version(model)
+    return created
@@ -0,0 +1,349 @@
+import atexit
+import contextlib
+import contextvars
+import copy
+import logging
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, models, router, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from drofji_automatically_django_admin.cache import render_cache
+
+logger = logging.getLogger(__name__)
+
+CREATE = 1
+UPDATE = 2
+DELETE = 3
+
+# Field values of the last load/save, kept on history-enabled instances
+SNAPSHOT_ATTR = "_history_snapshot"
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_HISTORY = {
+#     "BATCH_SIZE": 500,        # entries per bulk_create
+#     "FLUSH_INTERVAL": 2.0,    # seconds between background flushes
+#     "MAX_QUEUE_SIZE": 10000,  # queued entries before writers flush themselves
+#     "ASYNC": True,            # False writes the entries when their transaction commits
+# }
+DEFAULT_HISTORY_SETTINGS = {
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL": 2.0,
+    "MAX_QUEUE_SIZE": 10000,
+    "ASYNC": True,
+}
+
+
+def get_history_settings():
+    options = dict(DEFAULT_HISTORY_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_HISTORY", {}))
+    return options
+
+
+def is_history_enabled(model):
+    return getattr(model, "admin_history", False)
+
+
+def get_history_model():
+    return apps.get_model("drofji_automatically_django_admin", "AutoAdminHistoryEntry")
+
+
+# -------------------------------------------------------
+# User the recorded changes are attributed to
+# -------------------------------------------------------
+_acting_user_id = contextvars.ContextVar("drofji_auto_admin_history_user_id", default=None)
+
+
+@contextlib.contextmanager
+def acting_user(user):
+    # The admin views wrap their work in this; use it in scripts and tasks too
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    token = _acting_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _acting_user_id.reset(token)
+
+
+# -------------------------------------------------------
+# Field-level diffs
+# -------------------------------------------------------
+def to_history_value(value):
+    if isinstance(value, FieldFile):
+        return value.name or None
+    if isinstance(value, (dict, list)):
+        # JSON values are mutated in place; keep the loaded state
+        return copy.deepcopy(value)
+    return value
+
+
+def get_tracked_fields(model, field_names=None):
+    return [
+        model_field for model_field in model._meta.concrete_fields
+        if not model_field.primary_key
+        and (field_names is None or model_field.name in field_names or model_field.attname in field_names)
+    ]
+
+
+def take_snapshot(instance, field_names=None):
+    # {attname: value} of the loaded (non-deferred) fields
+    loaded = instance.__dict__
+    return {
+        model_field.attname: to_history_value(loaded[model_field.attname])
+        for model_field in get_tracked_fields(type(instance), field_names)
+        if model_field.attname in loaded
+    }
+
+
+def get_changes(instance, old=None, field_names=None):
+    # {field name: [old, new]}; old is None when the instance was not loaded
+    # from the database (created, or built by hand and saved)
+    changes = {}
+    for attname, new in take_snapshot(instance, field_names).items():
+        model_field = instance._meta.get_field(attname)
+        if old is None:
+            changes[model_field.name] = [None, new]
+        elif attname in old and old[attname] != new:
+            changes[model_field.name] = [old[attname], new]
+    return changes
+
+
+def make_entry(model, pk, action, changes, object_repr=""):
+    from django.contrib.contenttypes.models import ContentType
+
+    return {
+        "content_type_id": ContentType.objects.get_for_model(model, for_concrete_model=False).id,
+        "object_id": str(pk),
+        "object_repr": object_repr[:200],
+        "action": action,
+        "changes": changes,
+        "user_id": _acting_user_id.get(),
+        "action_time": timezone.now(),
+    }
+
+
+# -------------------------------------------------------
+# Recording: entries are queued once their transaction commits
+# -------------------------------------------------------
+def record(entries, using):
+    if entries:
+        transaction.on_commit(lambda: history_queue.put(entries), using=using)
+
+
+def record_saved(instance, created, update_fields=None, using=None):
+    old = None if created else getattr(instance, SNAPSHOT_ATTR, None)
+    changes = get_changes(instance, old, update_fields)
+    snapshot = {} if update_fields is None else dict(getattr(instance, SNAPSHOT_ATTR, None) or {})
+    snapshot.update(take_snapshot(instance, update_fields))
+    setattr(instance, SNAPSHOT_ATTR, snapshot)
+    if created or changes:
+        record([make_entry(
+            type(instance), instance.pk, CREATE if created else UPDATE, changes, str(instance),
+        )], using)
+
+
+def record_deleted(instance, using=None):
+    record([make_entry(type(instance), instance.pk, DELETE, {}, str(instance))], using)
+
+
+def record_created(objs, using):
+    # Rows of bulk_create(); backends not returning primary keys are skipped
+    record([
+        make_entry(type(obj), obj.pk, CREATE, get_changes(obj), str(obj))
+        for obj in objs if obj.pk is not None
+    ], using)
+
+
+def record_instances(objs, field_names, using):
+    # Rows written by bulk_update(), diffed against their loaded values
+    entries = []
+    for obj in objs:
+        changes = get_changes(obj, getattr(obj, SNAPSHOT_ATTR, None), field_names)
+        snapshot = dict(getattr(obj, SNAPSHOT_ATTR, None) or {})
+        snapshot.update(take_snapshot(obj, field_names))
+        setattr(obj, SNAPSHOT_ATTR, snapshot)
+        if changes:
+            entries.append(make_entry(type(obj), obj.pk, UPDATE, changes, str(obj)))
+    record(entries, using)
+
+
+def get_update_entries(model, tracked_fields, before, using):
+    # Diffs {pk: old values} read before an UPDATE against the rows' current values
+    attnames = [model_field.attname for model_field in tracked_fields]
+    entries = []
+    rows = model._base_manager.using(using).filter(pk__in=list(before)).values_list("pk", *attnames)
+    for pk, *after in rows:
+        changes = {
+            model_field.name: [to_history_value(old), to_history_value(new)]
+            for model_field, old, new in zip(tracked_fields, before[pk], after)
+            if old != new
+        }
+        if changes:
+            entries.append(make_entry(model, pk, UPDATE, changes))
+    return entries
+
+
+@contextlib.contextmanager
+def track_update(queryset, field_names, chunk_size=1000):
+    # Wraps an UPDATE of the queryset's rows: their values are read before
+    # and after it and diffed per row. The old values of every row are held
+    # until the UPDATE ran: use it on bounded querysets (an import chunk);
+    # update_tracked() walks a QuerySet.update() in chunks instead
+    model = queryset.model
+    using = queryset._db or router.db_for_write(model)
+    tracked_fields = get_tracked_fields(model, field_names)
+    attnames = [model_field.attname for model_field in tracked_fields]
+    before = {
+        row[0]: row[1:]
+        for row in queryset.using(using).order_by().values_list("pk", *attnames)
+    } if attnames else {}
+
+    yield
+
+    pks = list(before)
+    entries = []
+    for start in range(0, len(pks), chunk_size):
+        chunk = {pk: before[pk] for pk in pks[start:start + chunk_size]}
+        entries.extend(get_update_entries(model, tracked_fields, chunk, using))
+    record(entries, using)
+
+
+def update_tracked(queryset, values, chunk_size=1000):
+    # QuerySet.update() of a history model, in one transaction: the rows are
+    # walked in pk order, chunk_size at a time (read old values, UPDATE, read
+    # new values), so memory does not grow with the number of rows
+    model = queryset.model
+    using = queryset._db or router.db_for_write(model)
+    tracked_fields = get_tracked_fields(model, values)
+    attnames = [model_field.attname for model_field in tracked_fields]
+    if not attnames:
+        return models.QuerySet.update(queryset, **values)
+
+    queryset = queryset.using(using).order_by("pk")
+    manager = model._base_manager.using(using)
+    updated = 0
+    last_pk = None
+    with transaction.atomic(using=using):
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            before = {row[0]: row[1:] for row in chunk.values_list("pk", *attnames)[:chunk_size]}
+            if not before:
+                return updated
+            updated += models.QuerySet.update(manager.filter(pk__in=list(before)), **values)
+            record(get_update_entries(model, tracked_fields, before, using), using)
+            if len(before) < chunk_size:
+                return updated
+            last_pk = max(before)
+
+
+class AutoAdminQuerySet(models.QuerySet):
+    # update()/bulk_create() send no signals: they bump the model version of
+    # the admin caches and record the history of history-enabled models
+    # themselves (bulk_update() runs through update()); custom managers
+    # should build on this queryset
+
+    def update(self, **kwargs):
+        if not is_history_enabled(self.model):
+            rows = super().update(**kwargs)
+        else:
+            rows = update_tracked(self, kwargs)
+        render_cache.bump_model_version(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if is_history_enabled(self.model):
+            record_created(objs, self._db or router.db_for_write(self.model))
+        render_cache.bump_model_version(self.model)
+        return objs
+
+
+AutoAdminManager = models.Manager.from_queryset(AutoAdminQuerySet)
+
+
+# -------------------------------------------------------
+# In-process queue flushed with bulk_create
+# -------------------------------------------------------
+class HistoryQueue:
+
+    def __init__(self):
+        self.entries = []
+        self.lock = threading.Lock()
+        # Serializes writes so ids follow the order changes were queued
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def put(self, entries):
+        options = get_history_settings()
+        with self.lock:
+            self.entries.extend(entries)
+            size = len(self.entries)
+
+        if not options["ASYNC"] or size >= options["MAX_QUEUE_SIZE"]:
+            # Synchronous mode, or back-pressure when the writer falls behind
+            self.flush()
+            return
+        self.start()
+        if size >= options["BATCH_SIZE"]:
+            self.wakeup.set()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if self.thread is None:
+                atexit.register(self.flush)
+            self.thread = threading.Thread(target=self.run, name="drofji-auto-admin-history", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(get_history_settings()["FLUSH_INTERVAL"])
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing AutoAdmin history entries failed")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        # Writes the queued entries; returns how many
+        with self.flush_lock:
+            with self.lock:
+                entries, self.entries = self.entries, []
+            if not entries:
+                return 0
+            history_model = get_history_model()
+            try:
+                # bulk_create() writes all batches in one transaction
+                history_model._default_manager.bulk_create(
+                    [history_model(**entry) for entry in entries],
+                    batch_size=get_history_settings()["BATCH_SIZE"],
+                )
+            except Exception:
+                self.requeue(entries)
+                raise
+            return len(entries)
+
+    def requeue(self, entries):
+        # Entries of a failed write go back to the head of the queue for the
+        # next flush; past MAX_QUEUE_SIZE the oldest ones are dropped
+        max_size = get_history_settings()["MAX_QUEUE_SIZE"]
+        with self.lock:
+            self.entries[:0] = entries
+            dropped = len(self.entries) - max_size
+            if dropped > 0:
+                del self.entries[:dropped]
+        if dropped > 0:
+            logger.error("Dropped %d AutoAdmin history entries that could not be written", dropped)
+
+
+history_queue = HistoryQueue()
@@ -0,0 +1,405 @@
+import csv
+import io
+import itertools
+import json
+import time
+from dataclasses import dataclass, field as dataclass_field
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, models, router, transaction
+from django.utils.translation import gettext_lazy as _
+
+from drofji_automatically_django_admin import history
+from drofji_automatically_django_admin.cache import render_cache
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+
+
+# Names of the fields a row set, kept on the instances built from it
+IMPORTED_FIELDS_ATTR = "_imported_fields"
+
+
+def guess_format(file_name):
+    return JSONL if file_name.lower().endswith((".jsonl", ".ndjson", ".json")) else CSV
+
+
+# -------------------------------------------------------
+# Readers yielding (row_number, row) pairs
+# -------------------------------------------------------
+class RowError:
+    # Row a reader could not parse: reported for its row, the file goes on
+
+    def __init__(self, message):
+        self.message = str(message)
+
+    def __str__(self):
+        return self.message
+
+
+def iter_csv_rows(text_stream):
+    # Rows are numbered from the first record after the header
+    reader = csv.DictReader(text_stream)
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            row = RowError(e)
+        yield row_number, row
+
+
+def iter_jsonl_rows(text_stream):
+    # Rows are numbered by their line in the file
+    for line_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = RowError(f"Invalid JSON: {e}")
+        yield line_number, row
+
+
+def open_text(binary_stream, encoding="utf-8-sig"):
+    return io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+
+
+# -------------------------------------------------------
+# Result of one import run
+# -------------------------------------------------------
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    # [(row_number, message), ...], at most 'max_errors' entries
+    errors: list = dataclass_field(default_factory=list)
+    # {column: field_name} and columns matching no field
+    mapping: dict = dataclass_field(default_factory=dict)
+    ignored_columns: tuple = ()
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# -------------------------------------------------------
+# Chunked import: validate with field metadata, write in bulk
+# -------------------------------------------------------
+class AutoAdminImporter:
+
+    def __init__(self, model, mapping=None, update_key=None, batch_size=500, using=None, max_errors=1000):
+        self.model = model
+        self.mapping = dict(mapping or {})
+        self.update_key = self.model._meta.pk.name if update_key == "pk" else update_key
+        self.batch_size = batch_size
+        self.using = using or router.db_for_write(model)
+        self.max_errors = max_errors
+        self.result = ImportResult()
+
+    # ---------------------------------------------------
+    # Column mapping
+    # ---------------------------------------------------
+    def get_importable_fields(self):
+        fields = {}
+        for model_field in self.model._meta.concrete_fields:
+            if model_field.primary_key and model_field.name != self.update_key:
+                continue
+            if not model_field.editable and model_field.name != self.update_key:
+                continue
+            fields[model_field.name] = model_field
+        return fields
+
+    def resolve_mapping(self, columns, mapping=None):
+        # Columns match a field's name, attname or verbose_name (any case).
+        # JSON Lines rows may each bring new keys: 'mapping' holds the columns
+        # resolved so far and only unseen columns are added to it
+        fields = self.get_importable_fields()
+        lookup = {}
+        for model_field in fields.values():
+            for alias in (model_field.name, model_field.attname, str(model_field.verbose_name)):
+                lookup.setdefault(alias.lower(), model_field)
+
+        first = mapping is None
+        mapping = dict(mapping or {})
+        ignored = list(self.result.ignored_columns)
+        for column in columns:
+            if column in mapping or column in ignored:
+                continue
+            field_name = self.mapping.get(column)
+            model_field = fields.get(field_name) if field_name else lookup.get(str(column).strip().lower())
+            if model_field is None:
+                ignored.append(column)
+            else:
+                mapping[column] = model_field
+
+        if first and not mapping:
+            raise ValidationError(f"No column matches a field of {self.model._meta.verbose_name}.")
+        if first and self.update_key and self.update_key not in {f.name for f in mapping.values()}:
+            raise ValidationError(f"No column is mapped to the update key '{self.update_key}'.")
+
+        self.result.mapping = {column: model_field.name for column, model_field in mapping.items()}
+        self.result.ignored_columns = tuple(ignored)
+        return mapping
+
+    # ---------------------------------------------------
+    # Row validation
+    # ---------------------------------------------------
+    @staticmethod
+    def to_python(model_field, raw):
+        if raw is None or raw == "":
+            if model_field.null:
+                return None
+            if model_field.has_default():
+                return model_field.get_default()
+            return raw
+        if model_field.is_relation:
+            return model_field.target_field.to_python(raw)
+        if isinstance(model_field, models.JSONField) and isinstance(raw, str):
+            try:
+                return json.loads(raw)
+            except ValueError:
+                raise ValidationError("Enter valid JSON.")
+        return model_field.to_python(raw)
+
+    def build_instance(self, row, mapping):
+        # Only the columns present in the row are set (and later updated)
+        instance = self.model()
+        errors = {}
+        present = {column: model_field for column, model_field in mapping.items() if column in row}
+        setattr(instance, IMPORTED_FIELDS_ATTR, {model_field.name for model_field in present.values()})
+        if not present:
+            errors["__all__"] = [f"No column matches a field of {self.model._meta.verbose_name}."]
+        elif self.update_key and self.update_key not in getattr(instance, IMPORTED_FIELDS_ATTR):
+            errors[self.update_key] = ["The update key is missing."]
+        for column, model_field in present.items():
+            try:
+                value = self.to_python(model_field, row.get(column))
+                setattr(instance, model_field.attname, value)
+
+                if model_field.is_relation:
+                    # Existence of related rows is checked once per chunk
+                    if value is None and not model_field.null:
+                        raise ValidationError(model_field.error_messages["null"], code="null")
+                    continue
+
+                if isinstance(model_field, models.FileField):
+                    # Validators (e.g. FileValidator) read the referenced stored file
+                    value = getattr(instance, model_field.attname)
+                    if value:
+                        try:
+                            model_field.run_validators(value)
+                        except OSError:
+                            raise ValidationError(f"File '{value.name}' does not exist.")
+                    elif not model_field.blank:
+                        raise ValidationError(model_field.error_messages["blank"], code="blank")
+                    continue
+
+                model_field.validate(value, instance)
+                model_field.run_validators(value)
+            except ValidationError as e:
+                errors[model_field.name] = e.messages
+        return instance, errors
+
+    def check_relations(self, items, mapping):
+        # One query per relation column and chunk instead of one per row
+        for model_field in {f for f in mapping.values() if f.is_relation}:
+            values = {getattr(instance, model_field.attname) for _row_number, instance in items} - {None}
+            if not values:
+                continue
+            target = model_field.target_field
+            existing = set(
+                model_field.related_model._base_manager.using(self.using)
+                .filter(**{f"{target.attname}__in": values})
+                .values_list(target.attname, flat=True)
+            )
+            valid = []
+            for row_number, instance in items:
+                value = getattr(instance, model_field.attname)
+                if value is not None and value not in existing:
+                    self.add_error(row_number, {model_field.name: [f"{model_field.related_model.__name__} {value!r} does not exist."]})
+                else:
+                    valid.append((row_number, instance))
+            items = valid
+        return items
+
+    def add_error(self, row_number, errors):
+        self.result.error_count += 1
+        if len(self.result.errors) < self.max_errors:
+            if isinstance(errors, dict):
+                message = "; ".join(f"{name}: {' '.join(messages)}" for name, messages in errors.items())
+            else:
+                message = str(errors)
+            self.result.errors.append((row_number, message))
+
+    # ---------------------------------------------------
+    # Writes
+    # ---------------------------------------------------
+    def split_updates(self, items):
+        if not self.update_key:
+            return items, []
+
+        key_field = self.model._meta.get_field(self.update_key)
+        keys = {getattr(instance, key_field.attname) for _row_number, instance in items} - {None}
+        existing = dict(
+            self.model._base_manager.using(self.using)
+            .filter(**{f"{key_field.attname}__in": keys})
+            .values_list(key_field.attname, "pk")
+        )
+
+        to_create, to_update = [], []
+        for row_number, instance in items:
+            pk = existing.get(getattr(instance, key_field.attname))
+            if pk is None:
+                to_create.append((row_number, instance))
+            else:
+                instance.pk = pk
+                instance._state.adding = False
+                to_update.append((row_number, instance))
+        return to_create, to_update
+
+    def get_update_fields(self, instance, mapping):
+        imported = getattr(instance, IMPORTED_FIELDS_ATTR, None)
+        return [
+            model_field.name for model_field in dict.fromkeys(mapping.values())
+            if not model_field.primary_key and model_field.name != self.update_key
+            and (imported is None or model_field.name in imported)
+        ]
+
+    def write_chunk(self, items, mapping):
+        to_create, to_update = self.split_updates(items)
+        # One bulk_update per set of columns the rows carry
+        update_groups = {}
+        for _row_number, instance in to_update:
+            update_groups.setdefault(tuple(self.get_update_fields(instance, mapping)), []).append(instance)
+        manager = self.model._base_manager.db_manager(self.using)
+        track_history = history.is_history_enabled(self.model)
+        # bulk_create sets pks that the rollback below does not undo
+        file_pks = [instance.pk for _row_number, instance in to_create]
+
+        try:
+            with transaction.atomic(using=self.using):
+                if to_create:
+                    created = manager.bulk_create([instance for _row_number, instance in to_create], batch_size=self.batch_size)
+                    if track_history:
+                        history.record_created(created, self.using)
+                for update_fields, objs in update_groups.items():
+                    if not update_fields:
+                        continue
+                    if track_history:
+                        with history.track_update(manager.filter(pk__in=[obj.pk for obj in objs]), update_fields):
+                            manager.bulk_update(objs, update_fields, batch_size=self.batch_size)
+                    else:
+                        manager.bulk_update(objs, update_fields, batch_size=self.batch_size)
+            self.result.created += len(to_create)
+            self.result.updated += len(to_update)
+        except DatabaseError:
+            # Isolate the failing rows; the rest of the chunk is still written
+            for (row_number, instance), pk in zip(to_create, file_pks):
+                instance.pk = pk
+                instance._state.adding = True
+                try:
+                    with transaction.atomic(using=self.using):
+                        instance.save(using=self.using, force_insert=True)
+                    self.result.created += 1
+                except DatabaseError as e:
+                    self.add_error(row_number, e)
+            for row_number, instance in to_update:
+                try:
+                    with transaction.atomic(using=self.using):
+                        update_fields = self.get_update_fields(instance, mapping)
+                        if update_fields:
+                            instance.save(using=self.using, update_fields=update_fields)
+                    self.result.updated += 1
+                except DatabaseError as e:
+                    self.add_error(row_number, e)
+
+        # bulk_create/bulk_update send no signals: invalidate admin caches
+        render_cache.bump_model_version(self.model)
+
+    # ---------------------------------------------------
+    # Run
+    # ---------------------------------------------------
+    def run(self, rows, on_chunk=None):
+        return self.run_numbered(enumerate(rows, start=1), on_chunk=on_chunk)
+
+    def run_numbered(self, numbered_rows, on_chunk=None):
+        started = time.perf_counter()
+        numbered_rows = iter(numbered_rows)
+        mapping = None
+
+        while True:
+            chunk = list(itertools.islice(numbered_rows, self.batch_size))
+            if not chunk:
+                break
+
+            items = []
+            for row_number, row in chunk:
+                if isinstance(row, RowError):
+                    self.add_error(row_number, row)
+                    continue
+                if not isinstance(row, dict):
+                    self.add_error(row_number, "Expected an object mapping columns to values.")
+                    continue
+                if mapping is None or row.keys() - mapping.keys() - set(self.result.ignored_columns):
+                    # The first readable row sets the mapping, later rows extend it
+                    mapping = self.resolve_mapping(list(row), mapping)
+                instance, errors = self.build_instance(row, mapping)
+                if errors:
+                    self.add_error(row_number, errors)
+                else:
+                    items.append((row_number, instance))
+
+            if items:
+                items = self.check_relations(items, mapping)
+            if items:
+                self.write_chunk(items, mapping)
+
+            self.result.rows += len(chunk)
+            self.result.seconds = time.perf_counter() - started
+            if on_chunk is not None:
+                on_chunk(self.result)
+
+        self.result.seconds = time.perf_counter() - started
+        self.result.errors.sort(key=lambda error: error[0])
+        return self.result
+
+    def run_file(self, binary_stream, file_format=CSV, encoding="utf-8-sig", on_chunk=None):
+        text_stream = open_text(binary_stream, encoding)
+        rows = iter_jsonl_rows(text_stream) if file_format == JSONL else iter_csv_rows(text_stream)
+        try:
+            return self.run_numbered(rows, on_chunk=on_chunk)
+        except UnicodeDecodeError as e:
+            # The file cannot be decoded any further
+            self.add_error(self.result.rows + 1, e)
+            return self.result
+
+
+# -------------------------------------------------------
+# Upload form of the admin import view
+# -------------------------------------------------------
+class ImportForm(forms.Form):
+    file = forms.FileField(label=_("File"), help_text=_("CSV with a header row, or JSON Lines (.jsonl)."))
+    update_key = forms.ChoiceField(
+        label=_("Update existing rows by"),
+        required=False,
+        help_text=_("Rows whose key already exists are updated, the others are created."),
+    )
+    batch_size = forms.IntegerField(label=_("Batch size"), min_value=1, max_value=10000, initial=500)
+
+    def __init__(self, *args, model=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["update_key"].choices = [("", _("Create only"))] + [
+            (model_field.name, model_field.verbose_name)
+            for model_field in model._meta.concrete_fields
+            if model_field.unique
+        ]
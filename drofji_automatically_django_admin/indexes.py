@@ -0,0 +1,168 @@
+import re
+
+from django.db import models
+from django.db.backends.utils import names_digest
+from django.db.models import F
+
+RANGE_FIELD_TYPES = (
+    models.DateField, models.DateTimeField, models.TimeField,
+    models.IntegerField, models.FloatField, models.DecimalField,
+)
+TEXT_FIELD_TYPES = (models.CharField, models.TextField)
+
+BTREE = "btree"
+TRIGRAM = "trigram"
+FULL_TEXT = "full_text"
+
+
+# -------------------------------------------------------
+# Index wanted by the generated admin
+# -------------------------------------------------------
+class IndexSuggestion:
+    def __init__(self, model, fields, kind=BTREE, reason=""):
+        self.model = model
+        # [(field, descending)]
+        self.fields = fields
+        self.kind = kind
+        self.reason = reason
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def columns(self):
+        return [field.column for field, _ in self.fields]
+
+    def get_name(self):
+        # Shaped like Index.set_name_with_model(): within the 30 character limit
+        suffix = "gin" if self.kind == TRIGRAM else "idx"
+        ordered = [f"-{column}" if descending else column for column, (_, descending) in zip(self.columns, self.fields)]
+        name = f"{self.table[:11]}_{self.columns[0][:7]}_{names_digest(self.table, *ordered, suffix, length=6)}_{suffix}"
+        return f"D{name[1:]}" if name[0] == "_" or name[0].isdigit() else name
+
+    def is_covered(self, constraints):
+        for constraint in constraints.values():
+            columns = constraint.get("columns") or []
+            if self.kind == TRIGRAM:
+                if constraint.get("type") == "gin" and self.columns[0] in columns:
+                    return True
+            elif (constraint.get("index") or constraint.get("unique") or constraint.get("primary_key")) \
+                    and columns[:len(self.columns)] == self.columns:
+                # B-tree prefixes are usable in both scan directions
+                return True
+        return False
+
+    def get_index(self):
+        # Index for Meta.indexes / migrations.AddIndex
+        if self.kind == TRIGRAM:
+            # Imported here: django.contrib.postgres needs psycopg
+            from django.contrib.postgres.indexes import GinIndex, OpClass
+            return GinIndex(OpClass(F(self.fields[0][0].name), name="gin_trgm_ops"), name=self.get_name())
+        return models.Index(
+            fields=[f"-{field.name}" if descending else field.name for field, descending in self.fields],
+            name=self.get_name(),
+        )
+
+    def get_sample_queryset(self):
+        # Query shaped like the changelist query this index serves
+        field = self.fields[0][0]
+        ordering = get_list_ordering(self.model)
+        sample = (
+            self.model._default_manager
+            .exclude(**{f"{field.name}__isnull": True})
+            .values_list(field.name, flat=True)
+            .first()
+        )
+        if sample is None:
+            return None
+
+        queryset = self.model._default_manager.all()
+        if self.kind in (TRIGRAM, FULL_TEXT):
+            return queryset.filter(**{f"{field.name}__icontains": str(sample)[:3]})
+        if self.reason == "range filter":
+            return queryset.filter(**{f"{field.name}__gte": sample}).order_by(*ordering)
+        if self.reason == "ordering":
+            return queryset.order_by(*ordering)
+        return queryset.filter(**{field.name: sample}).order_by(*ordering)
+
+    def __str__(self):
+        columns = ", ".join(f"{c}{' DESC' if d else ''}" for c, (_, d) in zip(self.columns, self.fields))
+        return f"{self.table} ({columns}) [{self.kind}: {self.reason}]"
+
+
+# -------------------------------------------------------
+# Derive indexes from AutoAdmin field flags
+# -------------------------------------------------------
+def get_list_ordering(model):
+    if getattr(model, "admin_keyset_pagination", False):
+        ordering = getattr(model, "admin_keyset_ordering", "-pk")
+    else:
+        ordering = (getattr(model, "admin_overrides", {}).get("ordering") or model._meta.ordering or ["-pk"])[0]
+    if not isinstance(ordering, str):
+        return ["-pk"]
+    return [ordering] if ordering.lstrip("-") in ("pk", model._meta.pk.name) else [ordering, "-pk"]
+
+
+def get_ordering_field(model):
+    ordering = get_list_ordering(model)[0]
+    name = ordering.lstrip("-")
+    field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+    return field, ordering.startswith("-")
+
+
+def get_index_suggestions(model, connection, include_sort_columns=False):
+    suggestions = []
+    order_field, order_descending = get_ordering_field(model)
+    concrete_fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+
+    def add(suggestion):
+        for existing in suggestions:
+            if existing.kind == suggestion.kind and \
+                    existing.columns[:len(suggestion.columns)] == suggestion.columns:
+                return
+        suggestions.append(suggestion)
+
+    # Ordering of the changelist (and keyset pagination)
+    if not order_field.primary_key:
+        add(IndexSuggestion(model, [(order_field, order_descending), (model._meta.pk, order_descending)],
+                            reason="ordering"))
+
+    for field in concrete_fields:
+        if getattr(field, "filterable", False):
+            if isinstance(field, RANGE_FIELD_TYPES) and not field.is_relation:
+                # NumericRangeFilter / DateRangeFilter: range scans
+                add(IndexSuggestion(model, [(field, False)], reason="range filter"))
+            elif field is not order_field:
+                # Equality filters (choices, booleans, relations) followed by the list ordering
+                add(IndexSuggestion(model, [(field, False), (order_field, order_descending)],
+                                    reason="filter + ordering"))
+
+        if getattr(field, "searchable", False) and isinstance(field, TEXT_FIELD_TYPES):
+            if getattr(model, "admin_full_text_search", False):
+                continue
+            if connection.vendor == "postgresql":
+                add(IndexSuggestion(model, [(field, False)], kind=TRIGRAM, reason="icontains search"))
+            else:
+                add(IndexSuggestion(model, [(field, False)], kind=FULL_TEXT,
+                                    reason="icontains search; set admin_full_text_search = True"))
+
+        if include_sort_columns and getattr(field, "show_in_list", False) \
+                and not isinstance(field, (models.TextField, models.JSONField, models.FileField)):
+            add(IndexSuggestion(model, [(field, False)], reason="sortable column"))
+
+    return suggestions
+
+
+def get_missing_indexes(model, connection, include_sort_columns=False):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [
+        suggestion for suggestion in get_index_suggestions(model, connection, include_sort_columns)
+        if suggestion.kind == FULL_TEXT or not suggestion.is_covered(constraints)
+    ]
+
+
+def is_full_scan(plan):
+    # SQLite: "SCAN table" without an index; PostgreSQL: "Seq Scan on table"
+    return bool(re.search(r"\bSCAN \S+\s*$", plan, re.MULTILINE) or "Seq Scan" in plan)
@@ -0,0 +1,252 @@
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import sys
+import sysconfig
+import time
+from dataclasses import dataclass, field as dataclass_field
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+from django.template.response import SimpleTemplateResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------
+# Settings
+# -------------------------------------------------------
+# DROFJI_AUTO_ADMIN_INSTRUMENTATION = {
+#     "ENABLED": False,          # instrument the views of generated admins
+#     "PANEL": True,             # footer panel on admin pages while DEBUG is on
+#     "SLOW_PAGE_MS": 500,       # slower pages are logged as warnings
+#     "SLOW_QUERY_COUNT": 50,    # ... as are pages running more queries
+#     "DUPLICATE_THRESHOLD": 2,  # runs of one SQL from one call site reported as N+1
+#     "METRICS_HOOK": None,      # callable (or dotted path) called with every report
+# }
+DEFAULT_INSTRUMENTATION_SETTINGS = {
+    "ENABLED": False,
+    "PANEL": True,
+    "SLOW_PAGE_MS": 500,
+    "SLOW_QUERY_COUNT": 50,
+    "DUPLICATE_THRESHOLD": 2,
+    "METRICS_HOOK": None,
+}
+
+
+def get_instrumentation_settings():
+    options = dict(DEFAULT_INSTRUMENTATION_SETTINGS)
+    options.update(getattr(settings, "DROFJI_AUTO_ADMIN_INSTRUMENTATION", {}))
+    return options
+
+
+# -------------------------------------------------------
+# Report of one admin request
+# -------------------------------------------------------
+@dataclass
+class PageReport:
+    view: str
+    method: str
+    path: str
+    status: int = 0
+    total_ms: float = 0.0
+    template_ms: float = 0.0
+    query_count: int = 0
+    sql_ms: float = 0.0
+    # {(sql, call_site): [count, ms]}
+    queries: dict = dataclass_field(default_factory=dict)
+    # {column: [calls, ms]} of autoAdminFunctionField* columns
+    columns: dict = dataclass_field(default_factory=dict)
+
+    def add_query(self, sql, ms, call_site):
+        self.query_count += 1
+        self.sql_ms += ms
+        stats = self.queries.setdefault((sql, call_site), [0, 0.0])
+        stats[0] += 1
+        stats[1] += ms
+
+    def add_column(self, column, ms):
+        stats = self.columns.setdefault(column, [0, 0.0])
+        stats[0] += 1
+        stats[1] += ms
+
+    def get_duplicates(self, threshold):
+        # Same SQL (parameters aside) run repeatedly from one call site
+        return sorted(
+            (
+                {"call_site": call_site, "sql": sql, "count": count, "ms": round(ms, 3)}
+                for (sql, call_site), (count, ms) in self.queries.items()
+                if count >= threshold
+            ),
+            key=lambda duplicate: (-duplicate["count"], -duplicate["ms"]),
+        )
+
+    def is_slow(self, options):
+        return self.total_ms >= options["SLOW_PAGE_MS"] or self.query_count >= options["SLOW_QUERY_COUNT"]
+
+    def as_dict(self, options):
+        return {
+            "view": self.view,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 3),
+            "template_ms": round(self.template_ms, 3),
+            "query_count": self.query_count,
+            "sql_ms": round(self.sql_ms, 3),
+            "duplicates": self.get_duplicates(options["DUPLICATE_THRESHOLD"]),
+            "columns": {
+                column: {"calls": calls, "ms": round(ms, 3)}
+                for column, (calls, ms) in sorted(self.columns.items(), key=lambda item: -item[1][1])
+            },
+            "slow": self.is_slow(options),
+        }
+
+
+_current_report = contextvars.ContextVar("drofji_auto_admin_page_report", default=None)
+
+
+# -------------------------------------------------------
+# SQL: time and call site of every query
+# -------------------------------------------------------
+DJANGO_PATH = os.path.dirname(django.__file__) + os.sep
+STDLIB_PATH = sysconfig.get_paths()["stdlib"] + os.sep
+# Installed packages live below the standard library on most layouts
+PACKAGE_PATHS = (sysconfig.get_paths()["purelib"] + os.sep, sysconfig.get_paths()["platlib"] + os.sep)
+MODULE_PATH = os.path.splitext(__file__)[0]
+
+
+def is_ignored_frame(filename):
+    if filename.startswith((DJANGO_PATH, MODULE_PATH)):
+        return True
+    return filename.startswith(STDLIB_PATH) and not filename.startswith(PACKAGE_PATHS)
+
+
+@functools.lru_cache(maxsize=4096)
+def get_code_path(code):
+    # Relative path of a code object's file, None for ignored frames; cached
+    # since every query walks the stack
+    if is_ignored_frame(code.co_filename):
+        return None
+    return os.path.relpath(code.co_filename)
+
+
+def get_call_site():
+    # Innermost frame outside Django and the standard library: the column
+    # function, admin method or template tag that ran the query
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = get_code_path(frame.f_code)
+        if path is not None:
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class QueryRecorder:
+
+    def __init__(self, report):
+        self.report = report
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.report.add_query(sql, (time.perf_counter() - started) * 1000, get_call_site())
+
+
+# -------------------------------------------------------
+# Function columns
+# -------------------------------------------------------
+def render_column(column, render):
+    report = _current_report.get()
+    if report is None:
+        return render()
+    started = time.perf_counter()
+    try:
+        return render()
+    finally:
+        report.add_column(column, (time.perf_counter() - started) * 1000)
+
+
+# -------------------------------------------------------
+# Instrumented admin views
+# -------------------------------------------------------
+def instrument_view(view, name=None):
+
+    @functools.wraps(view)
+    def _view(request, *args, **kwargs):
+        options = get_instrumentation_settings()
+        if not options["ENABLED"]:
+            return view(request, *args, **kwargs)
+
+        report = PageReport(view=name or view.__name__, method=request.method, path=request.path)
+        token = _current_report.set(report)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(QueryRecorder(report)))
+                response = view(request, *args, **kwargs)
+                # Rendered here so template time and template queries count
+                if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+                    render_started = time.perf_counter()
+                    response.render()
+                    report.template_ms = (time.perf_counter() - render_started) * 1000
+        finally:
+            _current_report.reset(token)
+        report.total_ms = (time.perf_counter() - started) * 1000
+        report.status = response.status_code
+
+        data = report.as_dict(options)
+        publish(data, options)
+        if show_panel(request, response, options):
+            add_panel(response, data)
+        return response
+
+    return _view
+
+
+def publish(data, options):
+    logger.log(
+        logging.WARNING if data["slow"] else logging.DEBUG,
+        "%s %s: %.0f ms, %d queries (%.0f ms SQL), %d duplicated query groups",
+        data["method"], data["path"], data["total_ms"], data["query_count"], data["sql_ms"], len(data["duplicates"]),
+        extra={"auto_admin_page": data},
+    )
+    hook = options["METRICS_HOOK"]
+    if hook is None:
+        return
+    if isinstance(hook, str):
+        hook = import_string(hook)
+    try:
+        hook(data)
+    except Exception:
+        logger.exception("AutoAdmin metrics hook failed")
+
+
+def show_panel(request, response, options):
+    return (
+        settings.DEBUG
+        and options["PANEL"]
+        and not response.streaming
+        and response.get("Content-Type", "").startswith("text/html")
+        and getattr(request.user, "is_staff", False)
+    )
+
+
+def add_panel(response, data):
+    content = response.content.decode(response.charset)
+    index = content.rfind("</body>")
+    if index == -1:
+        return
+    panel = render_to_string("drofji_automatically_django_admin/instrumentation_panel.html", {"report": data})
+    response.content = content[:index] + panel + content[index:]
+    if response.has_header("Content-Length"):
+        response["Content-Length"] = str(len(response.content))
@@ -0,0 +1,86 @@
+import datetime
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from drofji_automatically_django_admin import generator
+from drofji_automatically_django_admin.models import AutoAdminModel
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic rows for AutoAdmin models from their field definitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models", nargs="+", metavar="app_label.Model[:ROWS]",
+            help="Models to fill; parents of foreign keys are filled first.",
+        )
+        parser.add_argument("--rows", type=int, default=1000, help="Rows per model without an explicit count.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create.")
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Worker processes inserting batches in parallel (SQLite always uses one).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Same seed, same data.")
+        parser.add_argument("--date-from", type=datetime.date.fromisoformat, help="Earliest date (default: a year ago).")
+        parser.add_argument("--date-to", type=datetime.date.fromisoformat, help="Latest date (default: today).")
+        parser.add_argument("--null-ratio", type=float, default=0.1, help="Share of NULL in nullable columns.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def parse_models(self, specs, default_rows):
+        rows_by_model = {}
+        for spec in specs:
+            label, separator, rows = spec.partition(":")
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+            if not issubclass(model, AutoAdminModel):
+                raise CommandError(f"{model._meta.label} is not an AutoAdminModel.")
+            if separator and not rows.isdigit():
+                raise CommandError(f"Invalid row count in '{spec}'.")
+            rows_by_model[model] = int(rows) if separator else default_rows
+        return rows_by_model
+
+    def handle(self, *args, **options):
+        rows_by_model = self.parse_models(options["models"], options["rows"])
+        generator_options = generator.GeneratorOptions(
+            seed=options["seed"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            null_ratio=options["null_ratio"],
+            batch_size=options["batch_size"],
+        )
+        using = options["database"]
+        processes = options["processes"] if generator.can_use_processes(using) else 1
+
+        try:
+            order = generator.get_generation_order(list(rows_by_model))
+        except generator.GeneratorError as e:
+            raise CommandError(e)
+
+        started = time.perf_counter()
+        total = 0
+        for model in order:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{model._meta.label}: {rows_by_model[model]} rows, {processes} process(es)"
+            ))
+            model_started = time.perf_counter()
+
+            def on_batch(model, created):
+                seconds = time.perf_counter() - model_started
+                self.stdout.write(f"  {created} rows ({created / seconds if seconds else 0:.0f} rows/sec)")
+
+            try:
+                total += generator.generate(
+                    model, rows_by_model[model], generator_options, using, processes=processes, on_batch=on_batch,
+                )
+            except generator.GeneratorError as e:
+                raise CommandError(e)
+
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} rows in {seconds:.2f} s ({total / seconds if seconds else 0:.0f} rows/sec)"
+        ))
@@ -0,0 +1,81 @@
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from drofji_automatically_django_admin import importer
+
+
+class Command(BaseCommand):
+    help = "Bulk import a CSV or JSON Lines file into a model, validated by its field metadata."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model as app_label.ModelName.")
+        parser.add_argument("path", help="CSV file with a header row, or JSON Lines file.")
+        parser.add_argument("--format", choices=importer.FORMATS, help="File format; guessed from the extension by default.")
+        parser.add_argument("--encoding", default="utf-8-sig")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows validated and written per transaction.")
+        parser.add_argument("--update-key", help="Unique field (or 'pk') identifying rows to update instead of create.")
+        parser.add_argument(
+            "--map", action="append", default=[], metavar="COLUMN=FIELD",
+            help="Map a column onto a field; columns match field names/verbose names by default.",
+        )
+        parser.add_argument("--database", help="Database alias to write to.")
+        parser.add_argument("--max-errors", type=int, default=50, help="Row errors to print.")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        mapping = {}
+        for item in options["map"]:
+            column, separator, field_name = item.partition("=")
+            if not separator:
+                raise CommandError(f"Invalid --map '{item}', expected COLUMN=FIELD.")
+            mapping[column] = field_name
+
+        rows_importer = importer.AutoAdminImporter(
+            model,
+            mapping=mapping,
+            update_key=options["update_key"],
+            batch_size=options["batch_size"],
+            using=options["database"],
+            max_errors=options["max_errors"],
+        )
+        file_format = options["format"] or importer.guess_format(options["path"])
+
+        def on_chunk(result):
+            self.stdout.write(
+                f"  {result.rows} rows, {result.created} created, {result.updated} updated, "
+                f"{result.error_count} errors ({result.rows_per_second:.0f} rows/sec)"
+            )
+
+        try:
+            with open(options["path"], "rb") as binary_stream:
+                result = rows_importer.run_file(
+                    binary_stream, file_format, encoding=options["encoding"], on_chunk=on_chunk
+                )
+        except OSError as e:
+            raise CommandError(e)
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        if result.mapping:
+            self.stdout.write(self.style.MIGRATE_HEADING("Columns:"))
+            for column, field_name in result.mapping.items():
+                self.stdout.write(f"  {column} -> {field_name}")
+        if result.ignored_columns:
+            self.stdout.write(self.style.WARNING(f"Ignored columns: {', '.join(result.ignored_columns)}"))
+
+        if result.errors:
+            self.stdout.write(self.style.MIGRATE_HEADING("Errors:"))
+            for row_number, message in result.errors:
+                self.stdout.write(f"  row {row_number}: {message}")
+            if result.error_count > len(result.errors):
+                self.stdout.write(f"  ... {result.error_count - len(result.errors)} more")
+
+        style = self.style.SUCCESS if not result.error_count else self.style.WARNING
+        self.stdout.write(style(
+            f"{result.rows} rows in {result.seconds:.2f} s ({result.rows_per_second:.0f} rows/sec): "
+            f"{result.created} created, {result.updated} updated, {result.error_count} errors"
+        ))
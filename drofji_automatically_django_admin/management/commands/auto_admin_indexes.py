@@ -0,0 +1,111 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, migrations
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from drofji_automatically_django_admin import indexes, search
+from drofji_automatically_django_admin.models import AutoAdminModel
+
+
+class Command(BaseCommand):
+    help = "Report database indexes missing for the filter, sort and search columns of AutoAdmin models."
+
+    def add_arguments(self, parser):
+        parser.add_argument("app_label", nargs="*", help="Limit to these apps.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--include-sort-columns", action="store_true",
+                            help="Also suggest an index for every sortable list column.")
+        parser.add_argument("--emit-migrations", action="store_true",
+                            help="Write a migration per app creating the missing indexes "
+                                 "(AddIndex, RunSQL for full-text indexes).")
+        parser.add_argument("--explain", action="store_true",
+                            help="EXPLAIN a changelist-shaped query for every suggested index.")
+
+    def handle(self, *app_labels, **options):
+        connection = connections[options["database"]]
+        missing_by_app = {}
+        search_operations_by_app = {}
+
+        for model in apps.get_models():
+            if not issubclass(model, AutoAdminModel) or not model._meta.managed or model._meta.proxy:
+                continue
+            if app_labels and model._meta.app_label not in app_labels:
+                continue
+
+            missing = indexes.get_missing_indexes(model, connection, options["include_sort_columns"])
+            search_operation = search.get_index_operation(model, connection)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{model._meta.label}:"))
+            if not missing and search_operation is None:
+                self.stdout.write("  all indexes present")
+            if search_operation is not None:
+                state = "missing" if model.admin_full_text_search else "unused "
+                self.stdout.write(f"  {state} {model._meta.db_table} full-text index [admin_full_text_search]")
+                search_operations_by_app.setdefault(model._meta.app_label, []).append(search_operation)
+            for suggestion in missing:
+                label = "advice " if suggestion.kind == indexes.FULL_TEXT else "missing"
+                self.stdout.write(f"  {label} {suggestion}")
+                if options["explain"]:
+                    self.explain(suggestion)
+
+            emittable = [s for s in missing if s.kind != indexes.FULL_TEXT]
+            if emittable:
+                missing_by_app.setdefault(model._meta.app_label, []).extend(emittable)
+
+        if options["emit_migrations"]:
+            for app_label in {**missing_by_app, **search_operations_by_app}:
+                self.write_migration(
+                    app_label, missing_by_app.get(app_label, []), search_operations_by_app.get(app_label, [])
+                )
+
+    def explain(self, suggestion):
+        queryset = suggestion.get_sample_queryset()
+        if queryset is None:
+            self.stdout.write("    explain: no data")
+            return
+        plan = queryset.explain()
+        style = self.style.WARNING if indexes.is_full_scan(plan) else self.style.SUCCESS
+        for line in plan.splitlines():
+            self.stdout.write(style(f"    {line}"))
+
+    @staticmethod
+    def get_operations(suggestions):
+        operations = []
+        if any(s.kind == indexes.TRIGRAM for s in suggestions):
+            # Imported here: django.contrib.postgres needs psycopg
+            from django.contrib.postgres.operations import TrigramExtension
+            operations.append(TrigramExtension())
+        for suggestion in suggestions:
+            operations.append(migrations.AddIndex(
+                model_name=suggestion.model._meta.model_name, index=suggestion.get_index()
+            ))
+        return operations
+
+    def write_migration(self, app_label, suggestions, search_operations=()):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaf_nodes = loader.graph.leaf_nodes(app_label)
+        if not leaf_nodes:
+            raise CommandError(f"App '{app_label}' has no migrations; run makemigrations first.")
+
+        number = max(MigrationAutodetector.parse_number(name) or 0 for _, name in leaf_nodes) + 1
+        migration = migrations.Migration(f"{number:04d}_auto_admin_indexes", app_label)
+        migration.dependencies = leaf_nodes
+        # Full-text index SQL is written for the vendor of --database
+        migration.operations = self.get_operations(suggestions) + list(search_operations)
+
+        writer = MigrationWriter(migration)
+        os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+        with open(writer.path, "w", encoding="utf-8") as fh:
+            fh.write(writer.as_string())
+        self.stdout.write(self.style.SUCCESS(f"Created {writer.path}"))
+
+        if not suggestions:
+            return
+        # The migration state now has the indexes; without them in Meta.indexes
+        # the next makemigrations would remove them again
+        self.stdout.write("Add the indexes to the models' Meta.indexes:")
+        for suggestion in suggestions:
+            source, _imports = MigrationWriter.serialize(suggestion.get_index())
+            self.stdout.write(f"  {suggestion.model.__name__}: {source}")
@@ -0,0 +1,40 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from drofji_automatically_django_admin import registry
+
+
+class Command(BaseCommand):
+    help = "Report optional import and admin registration cost of AutoAdmin models."
+    # System checks would build the deferred ModelAdmin classes before measuring
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        registration = registry.lazy_registrations.get(admin.site)
+        lazy = registration is not None
+        pending = len(registration.pending) if lazy else 0
+
+        # Build deferred ModelAdmin classes the way the first admin request would
+        started = time.perf_counter()
+        registry.materialize()
+        materialize_time = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Registration mode:"))
+        if lazy:
+            self.stdout.write(f"  lazy, {pending} model(s) deferred, built in {materialize_time * 1000:.1f} ms")
+        else:
+            self.stdout.write("  eager (DROFJI_AUTO_ADMIN_LAZY_REGISTRATION = False)")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Optional imports:"))
+        if not registry.import_timings:
+            self.stdout.write("  none")
+        for module_path, seconds in sorted(registry.import_timings.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {seconds * 1000:8.2f} ms  {module_path}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Admin registration per model:"))
+        for label, seconds in sorted(registry.registration_timings.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {seconds * 1000:8.2f} ms  {label}")
+
+        total = sum(registry.import_timings.values()) + sum(registry.registration_timings.values())
+        self.stdout.write(f"Total: {total * 1000:.2f} ms")
@@ -1,17 +1,21 @@
 # drofji_automatically_django_admin/models.py
-from PIL.ImageCms import applyTransform
+import time
+
+from django.conf import settings
 from django.db import models
-from admin_auto_filters.filters import AutocompleteFilter
 from django.contrib import admin
 from django.apps import apps
-from django.db.models import DateField
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.utils.safestring import mark_safe
-from drofji_automatically_django_admin import fields as drofji_fields
-from drofji_automatically_django_admin.fields import (
-                            AutoAdminDateField, AutoAdminDateTimeField,
-                            AutoAdminIntegerField, AutoAdminFloatField, AutoAdminDecimalField
-                        )
-from rangefilter.filters import DateRangeFilter, NumericRangeFilter
+from django.utils.translation import gettext_lazy as _
+from drofji_automatically_django_admin import actions as drofji_actions, fields as drofji_fields, history, instrumentation, registry, spec
+from drofji_automatically_django_admin.autocomplete import get_autocomplete_url
+from drofji_automatically_django_admin.cache import render_cache
+from drofji_automatically_django_admin.options import AutoAdminModelAdmin
+from drofji_automatically_django_admin.paginators import EstimatedCountPaginator
 
 
 # -------------------------------------------------------
@@ -38,6 +42,53 @@ class AutoAdminModel(models.Model):
     css_admin_files = []
     admin_sections = []
 
+    # Changelist join/prefetch plan; None builds it from list_display
+    admin_list_select_related = None
+    admin_list_prefetch_related = None
+
+    # Columns loaded for changelist rows; None derives them from list_display,
+    # function field 'columns' and the query plan, False loads every column
+    admin_list_only = None
+
+    # Opt-in cross-request cache of rendered function/badge cells.
+    # Rows are versioned by 'admin_render_cache_version_field' (e.g. an
+    # auto_now field) plus a counter of bulk writes, or by a per-model
+    # counter bumped on every write.
+    admin_render_cache = False
+    admin_render_cache_version_field = None
+
+    # Opt-in paginator using planner/statistics estimates above the threshold
+    admin_estimated_count = False
+    admin_estimated_count_threshold = 100_000
+
+    # Opt-in keyset (cursor) pagination on (ordering field, pk).
+    # The ordering field should be non-null and indexed together with pk.
+    admin_keyset_pagination = False
+    admin_keyset_ordering = "-pk"
+
+    # Opt-in full-text search over 'searchable' text fields (SQLite FTS5 or
+    # PostgreSQL tsvector + GIN) created by the migration auto_admin_indexes
+    # --emit-migrations writes; icontains when missing
+    admin_full_text_search = False
+
+    # Columns loaded for autocomplete results; None loads 'name'/'alias' when
+    # __str__ is the default one, otherwise every column
+    admin_autocomplete_only = None
+
+    # Always show counts next to choice/boolean filter options; all of them
+    # come from one conditional-aggregate query (else a "Show counts" toggle)
+    admin_facet_counts = False
+
+    # Opt-in read-only JSON API (drofji_automatically_django_admin.urls) of
+    # the list and form columns, for users with the view permission
+    admin_api_enabled = False
+
+    # Opt-in field-level change history (AutoAdminHistoryEntry), covering
+    # save/delete and the bulk paths, written in batches off the request
+    admin_history = False
+
+    objects = history.AutoAdminManager()
+
     class Meta:
         abstract = True
 
@@ -49,15 +100,57 @@ class AutoAdminModel(models.Model):
             return str(self.alias)
         return super().__str__()
 
+    # ---------------------------------------------------
+    # Loaded field values, diffed by the change history
+    # ---------------------------------------------------
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.admin_history:
+            setattr(instance, history.SNAPSHOT_ATTR, history.take_snapshot(instance))
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if self.admin_history:
+            setattr(self, history.SNAPSHOT_ATTR, history.take_snapshot(self))
+
+    # ---------------------------------------------------
+    # Compiled admin spec, built once per model
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_spec(cls):
+        return spec.get_admin_spec(cls)
+
+    @classmethod
+    def invalidate_admin_spec(cls):
+        spec.invalidate_admin_spec(cls)
+
     # ---------------------------------------------------
     # Compute admin fields dynamically
     # ---------------------------------------------------
     @classmethod
     def get_admin_fields(cls):
-        meta_fields = {f.name: f for f in cls._meta.get_fields() if
-                       hasattr(f, "name") and not (f.one_to_many or f.one_to_one or f.many_to_many)}
-        meta_fields_related = {f.name: f for f in cls._meta.get_fields() if
-                       hasattr(f, "name") and (f.many_to_one or f.many_to_many)}
+        admin_spec = cls.get_admin_spec()
+        return (
+            list(admin_spec.form_fields),
+            list(admin_spec.list_display),
+            list(admin_spec.search_fields),
+            list(admin_spec.list_filter),
+            list(admin_spec.autocomplete_fields),
+        )
+
+    @classmethod
+    def build_admin_spec(cls):
+        meta_fields = {}
+        meta_fields_related = {}
+        for f in cls._meta.get_fields():
+            if not hasattr(f, "name"):
+                continue
+            if not (f.one_to_many or f.one_to_one or f.many_to_many):
+                meta_fields[f.name] = f
+            if f.many_to_one or f.many_to_many:
+                meta_fields_related[f.name] = f
         attr_fields = cls.__dict__
 
         #####################
@@ -76,7 +169,18 @@ class AutoAdminModel(models.Model):
         #   SEARCHABLE    #
         ###################
 
-        search_fields = [fn for fn, fo in meta_fields.items() if getattr(fo, "searchable", False)]
+        search_fields = []
+        for fn, fo in meta_fields.items():
+            if not getattr(fo, "searchable", False):
+                continue
+            if fo.is_relation:
+                # Search relations through the related model's own searchable text fields
+                search_fields.extend(
+                    f"{fn}__{rf.name}" for rf in fo.related_model._meta.get_fields()
+                    if not rf.is_relation and getattr(rf, "searchable", False)
+                )
+            else:
+                search_fields.append(fn)
 
         ###################
         #   FILTERABLE    #
@@ -89,22 +193,44 @@ class AutoAdminModel(models.Model):
                 continue
 
             if isinstance(meta_field, (models.DateField, models.DateTimeField, models.TimeField)):
+                DateRangeFilter = registry.import_optional(
+                    "drofji_automatically_django_admin.filters", "AutoAdminDateRangeFilter"
+                )
                 list_filter.append((meta_field_name, DateRangeFilter))
 
             elif isinstance(meta_field, (models.IntegerField, models.FloatField, models.DecimalField)):
+                NumericRangeFilter = registry.import_optional(
+                    "drofji_automatically_django_admin.filters", "AutoAdminNumericRangeFilter"
+                )
                 list_filter.append((meta_field_name, NumericRangeFilter))
 
             elif isinstance(meta_field, models.ForeignKey):
 
+                AutocompleteFilter = registry.import_optional("admin_auto_filters.filters", "AutocompleteFilter")
                 filter_class_name = f"{meta_field_name.capitalize()}Filter"
                 DynamicFilter = type(filter_class_name, (AutocompleteFilter,), {
                     'title': meta_field.verbose_name or meta_field_name,
                     'field_name': meta_field_name,
+                    'get_autocomplete_url': lambda self, request, model_admin: get_autocomplete_url(model_admin),
                 })
-                if DynamicFilter not in list_filter:
-                    list_filter.append(DynamicFilter)
+                list_filter.append(DynamicFilter)
+
+            elif isinstance(meta_field, models.BooleanField):
+                BooleanFilter = registry.import_optional(
+                    "drofji_automatically_django_admin.filters", "AutoAdminBooleanFieldListFilter"
+                )
+                list_filter.append((meta_field_name, BooleanFilter))
+
+            elif meta_field.choices:
+                ChoicesFilter = registry.import_optional(
+                    "drofji_automatically_django_admin.filters", "AutoAdminChoicesFieldListFilter"
+                )
+                list_filter.append((meta_field_name, ChoicesFilter))
             else:
-                list_filter.append(meta_field_name)
+                AllValuesFilter = registry.import_optional(
+                    "drofji_automatically_django_admin.filters", "AutoAdminAllValuesFieldListFilter"
+                )
+                list_filter.append((meta_field_name, AllValuesFilter))
 
         #####################
         #   AUTOCOMPLETE    #
@@ -116,29 +242,220 @@ class AutoAdminModel(models.Model):
         #   FUNCTION FIELDS    #
         ########################
 
+        function_columns = []
         for attr_field_name, attr_field in list(attr_fields.items()):
 
             if isinstance(attr_field, drofji_fields.AutoAdminFunctionField):
                 method_name = f"autoAdminFunctionField{str(attr_field_name).capitalize()}"
 
-                def make_func(f):
-                    @admin.display(description=getattr(f, 'verbose_name', '') or getattr(f, 'name', ''))
+                def make_func(f, column):
+                    @admin.display(
+                        description=getattr(f, 'verbose_name', '') or getattr(f, 'name', ''),
+                        ordering=f.annotation_name
+                    )
                     def _func(self, obj):
-                        value_to_display = f.get_display_value(obj)
-                        return value_to_display
+                        if cls.admin_render_cache:
+                            return instrumentation.render_column(
+                                column, lambda: render_cache.get_or_render(obj, column, lambda: f.get_display_value(obj))
+                            )
+                        return instrumentation.render_column(column, lambda: f.get_display_value(obj))
 
                     return _func
 
-                if not hasattr(cls, 'admin_overrides'):
-                    cls.admin_overrides = {}
-                cls.admin_overrides[method_name] = make_func(attr_field)
+                function_columns.append((method_name, make_func(attr_field, method_name)))
                 list_display.append(method_name)
 
+                if attr_field.searchable and attr_field.annotation_name:
+                    search_fields.append(attr_field.annotation_name)
+
+                if attr_field.filterable and attr_field.annotation_name:
+                    make_annotation_filter = registry.import_optional(
+                        "drofji_automatically_django_admin.filters", "make_annotation_filter"
+                    )
+                    list_filter.append(make_annotation_filter(
+                        attr_field.annotation_name,
+                        attr_field.verbose_name or attr_field.annotation_name,
+                        attr_field.expression,
+                    ))
+
         if 'id' in list_display:
             list_display.remove('id')
             list_display.insert(0, 'id')
 
-        return form_fields, list_display, search_fields, list_filter, autocomplete_fields
+        ########################
+        #   EDITABLE IN LIST   #
+        ########################
+
+        # The first column links to the change form and cannot be edited
+        list_editable = [
+            fn for fn, fo in meta_fields.items()
+            if getattr(fo, "editable_in_list", False) and fo.editable and not fo.primary_key
+            and fn in list_display[1:]
+        ]
+
+        ####################
+        #   BULK ACTIONS   #
+        ####################
+
+        # "Set <field> to <value>" for flagged boolean and choice fields
+        field_actions = []
+        for fn, fo in meta_fields.items():
+            if not getattr(fo, "bulk_actions", False) or not fo.editable:
+                continue
+            if isinstance(fo, models.BooleanField) or fo.choices:
+                field_actions.extend(drofji_actions.get_set_field_actions(fo))
+
+        select_related, prefetch_related = cls.get_admin_query_plan(list_display)
+
+        return spec.AutoAdminSpec(
+            form_fields=tuple(form_fields),
+            list_display=tuple(list_display),
+            list_editable=tuple(list_editable),
+            search_fields=tuple(search_fields),
+            list_filter=tuple(list_filter),
+            autocomplete_fields=tuple(autocomplete_fields),
+            function_columns=tuple(function_columns),
+            field_actions=tuple(field_actions),
+            annotations=tuple(cls.get_admin_annotations().items()),
+            list_select_related=(
+                select_related if isinstance(select_related, bool) else tuple(select_related) or False
+            ),
+            list_prefetch_related=tuple(prefetch_related),
+            list_only=cls.get_admin_list_only(list_display, list_editable, select_related, prefetch_related),
+        )
+
+    # ---------------------------------------------------
+    # Query expressions of SQL-backed function fields
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_annotations(cls):
+        return {
+            attr_field.annotation_name: attr_field.expression
+            for attr_field in cls.__dict__.values()
+            if isinstance(attr_field, drofji_fields.AutoAdminFunctionField) and attr_field.annotation_name
+        }
+
+    # ---------------------------------------------------
+    # Function/badge fields by their list_display method name
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_function_fields(cls):
+        return {
+            f"autoAdminFunctionField{str(attr_field_name).capitalize()}": attr_field
+            for attr_field_name, attr_field in cls.__dict__.items()
+            if isinstance(attr_field, drofji_fields.AutoAdminFunctionField)
+        }
+
+    # ---------------------------------------------------
+    # Columns needed to render autocomplete results
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_autocomplete_only(cls):
+        if cls.admin_autocomplete_only is not None:
+            return cls.admin_autocomplete_only
+        if cls.__str__ is not AutoAdminModel.__str__:
+            return None
+        field_names = {f.name for f in cls._meta.concrete_fields}
+        return [cls._meta.pk.attname] + [name for name in ("name", "alias") if name in field_names]
+
+    # ---------------------------------------------------
+    # Compute changelist join/prefetch plan
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_query_plan(cls, list_display):
+        select_related = []
+        prefetch_related = []
+
+        def add(lookups, target):
+            for lookup in lookups:
+                if lookup not in target:
+                    target.append(lookup)
+
+        # Relation columns: every row renders str() of the related object
+        for name in list_display:
+            try:
+                meta_field = cls._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if meta_field.many_to_one or meta_field.one_to_one:
+                add([name], select_related)
+
+        # Function and badge columns declare the relations they read
+        function_fields = cls.get_admin_function_fields()
+        for name in list_display:
+            function_field = function_fields.get(name)
+            if function_field is None:
+                continue
+            add(function_field.select_related, select_related)
+            add(function_field.prefetch_related, prefetch_related)
+            if isinstance(function_field, drofji_fields.AutoAdminStatusBadgeField):
+                add(function_field.get_related_lookups(cls), select_related)
+
+        # Per-model override
+        if cls.admin_list_select_related is not None:
+            select_related = cls.admin_list_select_related
+        if cls.admin_list_prefetch_related is not None:
+            prefetch_related = cls.admin_list_prefetch_related
+
+        return select_related, prefetch_related
+
+    # ---------------------------------------------------
+    # Compute columns loaded for changelist rows
+    # ---------------------------------------------------
+    @classmethod
+    def get_admin_list_only(cls, list_display, list_editable=(), select_related=(), prefetch_related=()):
+        if cls.admin_list_only is False:
+            return None
+        if cls.admin_list_only is not None:
+            return tuple(cls.admin_list_only)
+
+        opts = cls._meta
+        columns = [opts.pk.name]
+
+        def add(names):
+            for name in names:
+                # Local field of a lookup; related rows come from the query plan
+                name = name.lstrip("-").split("__")[0]
+                try:
+                    meta_field = opts.get_field(name)
+                except FieldDoesNotExist:
+                    continue
+                if meta_field.concrete and not meta_field.many_to_many and name not in columns:
+                    columns.append(name)
+
+        function_fields = cls.get_admin_function_fields()
+        for name in list_display:
+            function_field = function_fields.get(name)
+            if function_field is None:
+                try:
+                    opts.get_field(name)
+                except FieldDoesNotExist:
+                    # Admin method or attribute reading unknown columns
+                    return None
+                add([name])
+                continue
+            function_columns = function_field.get_columns()
+            if function_columns is None:
+                return None
+            add(function_columns)
+
+        add(list_editable)
+
+        # select_related() cannot traverse a deferred foreign key
+        if select_related is True:
+            add(f.name for f in opts.concrete_fields if f.many_to_one)
+        elif select_related:
+            add(select_related)
+        add(getattr(lookup, "prefetch_through", lookup) for lookup in prefetch_related)
+
+        # Fields read per row: ordering, keyset cursors, render cache versions
+        add(ordering for ordering in opts.ordering if isinstance(ordering, str) and ordering != "?")
+        if cls.admin_keyset_pagination:
+            add([cls.admin_keyset_ordering])
+        if cls.admin_render_cache_version_field:
+            add([cls.admin_render_cache_version_field])
+
+        return tuple(columns)
 
     # ---------------------------------------------------
     # Register model in Django admin
@@ -148,8 +465,10 @@ class AutoAdminModel(models.Model):
         if not cls.admin_enabled:
             return
 
-        # Get fields
-        fields, list_display, search_fields, list_filter, autocomplete_fields = cls.get_admin_fields()
+        started = time.perf_counter()
+
+        # Get compiled admin spec
+        admin_spec = cls.get_admin_spec()
 
         class Media:
             css = {"all": getattr(cls, "admin_css", [])}
@@ -179,9 +498,9 @@ class AutoAdminModel(models.Model):
             result_css_files.add(css_to_add)
 
         admin_attrs = {
-            "search_fields": search_fields,
-            "list_filter": list_filter,
-            "autocomplete_fields": autocomplete_fields,
+            "search_fields": admin_spec.search_fields,
+            "list_filter": admin_spec.list_filter,
+            "autocomplete_fields": admin_spec.autocomplete_fields,
             "formatted_id": formatted_id,
             "Media": type("Media", (), {
                 "css": {"all": result_css_files},
@@ -194,15 +513,61 @@ class AutoAdminModel(models.Model):
         # ---------------------------------------------------
 
         # Add function fields to list_display
-        admin_attrs["list_display"] = list_display
+        admin_attrs["list_display"] = admin_spec.list_display
+        admin_attrs.update(admin_spec.get_function_columns())
+
+        # Cells edited in place, saved in bulk
+        admin_attrs["list_editable"] = admin_spec.list_editable
+
+        # Set-field actions running one UPDATE per chunk of the selection
+        field_actions = admin_spec.get_field_actions()
+        if field_actions:
+            admin_attrs.update(field_actions)
+            admin_attrs["actions"] = [*AutoAdminModelAdmin.actions, *field_actions]
+
+        # Join/prefetch relations read by the changelist columns
+        admin_attrs["list_select_related"] = admin_spec.list_select_related
+        admin_attrs["list_prefetch_related"] = admin_spec.list_prefetch_related
+
+        # Changelist rows load only the columns the list reads
+        admin_attrs["list_only"] = admin_spec.list_only
+
+        # Annotate SQL-backed function fields once on the admin queryset
+        admin_attrs["list_annotations"] = admin_spec.get_annotations()
+
+        # Estimated counts for huge tables; keyset pages never count exactly
+        if cls.admin_estimated_count or cls.admin_keyset_pagination:
+            admin_attrs["paginator"] = type(f"{cls.__name__}Paginator", (EstimatedCountPaginator,), {
+                "estimate_threshold": cls.admin_estimated_count_threshold,
+            })
+            admin_attrs["show_full_result_count"] = False
+
+        # Full-text search with prefix/phrase operators
+        if cls.admin_full_text_search:
+            admin_attrs["full_text_search"] = True
+            admin_attrs["search_help_text"] = _('Use word* to match a prefix and "quoted text" for an exact phrase.')
+
+        # Facet counts of choice/boolean filters
+        if cls.admin_facet_counts:
+            admin_attrs["show_facets"] = admin.ShowFacets.ALWAYS
+
+        # Keyset pagination: fixed ordering, next/previous cursors in the URL
+        if cls.admin_keyset_pagination:
+            admin_attrs["keyset_ordering"] = cls.admin_keyset_ordering
+            admin_attrs["sortable_by"] = ()
+            admin_attrs["change_list_template"] = "drofji_automatically_django_admin/keyset_change_list.html"
 
         # Apply admin overrides if defined
         overrides = getattr(cls, "admin_overrides", {})
         for k, v in overrides.items():
             admin_attrs[k] = v
 
+        # Overridden columns may read anything
+        if "list_only" not in overrides and {"list_display", "list_editable"} & set(overrides):
+            admin_attrs["list_only"] = None
+
         # Create dynamic ModelAdmin class
-        admin_class = type(f"{cls.__name__}Admin", (admin.ModelAdmin,), admin_attrs)
+        admin_class = type(f"{cls.__name__}Admin", (AutoAdminModelAdmin,), admin_attrs)
 
         # Register in admin
         try:
@@ -210,12 +575,57 @@ class AutoAdminModel(models.Model):
         except admin.sites.AlreadyRegistered:
             pass
 
+        registry.registration_timings[cls._meta.label] = time.perf_counter() - started
+
     # ---------------------------------------------------
     # Register all children models automatically
     # ---------------------------------------------------
     @staticmethod
-    def register_all_admins(app_label=None):
+    def register_all_admins(app_label=None, lazy=None):
+        # Lazy (opt-in): ModelAdmin classes are built when the admin URLs are
+        # loaded or an admin page is rendered, never in processes that don't
+        # serve the admin
+        if lazy is None:
+            lazy = registry.is_lazy_registration_enabled()
+
         for model in apps.get_models():
             if issubclass(model, AutoAdminModel) and model is not AutoAdminModel:
                 if app_label is None or model._meta.app_label == app_label:
-                    model.register_admin()
+                    if lazy and model.admin_enabled:
+                        registry.defer_registration(model)
+                    else:
+                        model.register_admin()
+
+
+# -------------------------------------------------------
+# Change history of models with admin_history = True
+# -------------------------------------------------------
+class AutoAdminHistoryEntry(models.Model):
+    ACTION_CHOICES = [
+        (history.CREATE, _("Created")),
+        (history.UPDATE, _("Changed")),
+        (history.DELETE, _("Deleted")),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name="+")
+    object_id = models.CharField(max_length=64)
+    object_repr = models.CharField(max_length=200, blank=True)
+    action = models.PositiveSmallIntegerField(choices=ACTION_CHOICES)
+    # {field name: [old value, new value]}
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    action_time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            # Per-object history, newest first
+            models.Index(fields=["content_type", "object_id", "-id"], name="drofji_history_object_idx"),
+        ]
+        verbose_name = _("history entry")
+        verbose_name_plural = _("history entries")
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.object_repr or self.object_id}"
@@ -0,0 +1,322 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.template.response import TemplateResponse
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import lookup_spawns_duplicates, unquote
+from django.contrib.admin.views.main import ERROR_FLAG, PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import router, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.urls import path, reverse
+from django.utils.text import capfirst
+from django.utils.translation import gettext_lazy as _
+from drofji_automatically_django_admin.autocomplete import (
+    AutoAdminAutocompleteJsonView, AutoAdminAutocompleteSelect, AutoAdminAutocompleteSelectMultiple,
+)
+from drofji_automatically_django_admin import editable, export, history, importer, instrumentation
+from drofji_automatically_django_admin.changelist import AutoAdminChangeList
+from drofji_automatically_django_admin.search import get_search_backend, parse_search_terms
+
+
+# -------------------------------------------------------
+# Base class for generated ModelAdmin classes
+# -------------------------------------------------------
+class AutoAdminModelAdmin(admin.ModelAdmin):
+    # Lookups passed to prefetch_related() on the changelist queryset
+    list_prefetch_related = ()
+    # Columns loaded for changelist rows (QuerySet.only()); None loads all
+    list_only = None
+    # Annotations of SQL-backed function fields, {name: expression}
+    list_annotations = {}
+    # Keyset pagination ordering, e.g. "-created_at"; None uses page numbers
+    keyset_ordering = None
+    # Use the model's full-text index for search when it exists
+    full_text_search = False
+    # Entries per page of the change history view
+    history_per_page = 50
+
+    actions = ["export_csv", "export_jsonl"]
+    change_list_template = "drofji_automatically_django_admin/change_list.html"
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.list_annotations:
+            qs = qs.annotate(**self.list_annotations)
+        return qs
+
+    def get_changelist(self, request, **kwargs):
+        return AutoAdminChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        if self.full_text_search and search_term:
+            backend = get_search_backend(self.model, queryset.db)
+            terms = parse_search_terms(search_term)
+            if backend is not None and terms:
+                return self.get_full_text_search_results(request, queryset, backend, terms)
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_full_text_search_results(self, request, queryset, backend, terms):
+        # Indexed fields are matched by the index; the other search fields
+        # (relations, annotations, '^'/'=' lookups) keep their lookups, and
+        # every term may match either
+        indexed = {model_field.name for model_field in backend.get_fields()}
+        lookups = [
+            self.get_search_lookup(str(field_name))
+            for field_name in self.get_search_fields(request)
+            if str(field_name) not in indexed
+        ]
+        for term in terms:
+            condition = backend.match([term], queryset.db)
+            value = " ".join(term[1])
+            for lookup in lookups:
+                condition |= Q(**{lookup: value})
+            queryset = queryset.filter(condition)
+        may_have_duplicates = any(lookup_spawns_duplicates(self.opts, lookup) for lookup in lookups)
+        return queryset, may_have_duplicates
+
+    @staticmethod
+    def get_search_lookup(field_name):
+        # Same prefixes as ModelAdmin.get_search_results
+        if field_name.startswith("^"):
+            return f"{field_name[1:]}__istartswith"
+        if field_name.startswith("="):
+            return f"{field_name[1:]}__iexact"
+        if field_name.startswith("@"):
+            return f"{field_name[1:]}__search"
+        return f"{field_name}__icontains"
+
+    # ---------------------------------------------------
+    # Autocomplete widgets use the cached prefix endpoint
+    # ---------------------------------------------------
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if "widget" not in kwargs and db_field.name in self.get_autocomplete_fields(request):
+            kwargs["widget"] = AutoAdminAutocompleteSelect(db_field, self.admin_site, using=kwargs.get("using"))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if "widget" not in kwargs and db_field.name in self.get_autocomplete_fields(request):
+            kwargs["widget"] = AutoAdminAutocompleteSelectMultiple(
+                db_field, self.admin_site, using=kwargs.get("using")
+            )
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    # ---------------------------------------------------
+    # list_editable: changed cells saved with bulk_update
+    # ---------------------------------------------------
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault("formset", editable.AutoAdminListEditableFormSet)
+        return super().get_changelist_formset(request, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        with history.acting_user(request.user):
+            return self._changelist_view(request, extra_context)
+
+    def _changelist_view(self, request, extra_context=None):
+        if not (request.method == "POST" and self.list_editable and "_save" in request.POST):
+            return super().changelist_view(request, extra_context)
+
+        # Validation, row locks and the bulk writes share one transaction;
+        # save_model()/log_change() only collect the changed rows
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            request._list_editable_batch = batch = editable.ListEditableBatch(self.model, using)
+            try:
+                response = super().changelist_view(request, extra_context)
+                batch.flush()
+            finally:
+                del request._list_editable_batch
+        return response
+
+    def save_model(self, request, obj, form, change):
+        batch = getattr(request, "_list_editable_batch", None)
+        if batch is None or not change:
+            return super().save_model(request, obj, form, change)
+        batch.add(obj, form.changed_data)
+
+    def log_change(self, request, obj, message):
+        batch = getattr(request, "_list_editable_batch", None)
+        if batch is None:
+            return super().log_change(request, obj, message)
+        batch.add_log_entry(request.user.pk, obj, message)
+
+    # ---------------------------------------------------
+    # Change history: entries attributed to the request user
+    # ---------------------------------------------------
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        with history.acting_user(request.user):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        with history.acting_user(request.user):
+            return super().delete_view(request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        if not history.is_history_enabled(self.model):
+            return super().history_view(request, object_id, extra_context)
+
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            return self._get_obj_does_not_exist_redirect(request, self.opts, object_id)
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+
+        # Served by the (content_type, object_id, -id) index
+        from django.contrib.contenttypes.models import ContentType
+        entries = history.get_history_model()._default_manager.filter(
+            content_type=ContentType.objects.get_for_model(self.model, for_concrete_model=False),
+            object_id=str(obj.pk),
+        ).select_related("user").order_by("-id")
+
+        paginator = Paginator(entries, self.history_per_page)
+        page_obj = paginator.get_page(request.GET.get(PAGE_VAR, 1))
+        labels = {model_field.name: capfirst(model_field.verbose_name) for model_field in self.opts.concrete_fields}
+        for entry in page_obj:
+            entry.change_rows = [
+                (labels.get(name, name), old, new) for name, (old, new) in entry.changes.items()
+            ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Change history: %s") % obj,
+            "subtitle": None,
+            "action_list": page_obj,
+            "page_range": paginator.get_elided_page_range(page_obj.number),
+            "page_var": PAGE_VAR,
+            "pagination_required": paginator.num_pages > 1,
+            "module_name": str(capfirst(self.opts.verbose_name_plural)),
+            "object": obj,
+            "opts": self.opts,
+            "preserved_filters": self.get_preserved_filters(request),
+            **(extra_context or {}),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, "drofji_automatically_django_admin/object_history.html", context)
+
+    # ---------------------------------------------------
+    # Streaming export of the list_display columns
+    # ---------------------------------------------------
+    @admin.action(description=_("Export selected rows as CSV"), permissions=["view"])
+    def export_csv(self, request, queryset):
+        return export.export_response(self, request, queryset, export.CSV)
+
+    @admin.action(description=_("Export selected rows as JSON Lines"), permissions=["view"])
+    def export_jsonl(self, request, queryset):
+        return export.export_response(self, request, queryset, export.JSONL)
+
+    def export_view(self, request):
+        # Every row matching the changelist's current filters and search
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        request.GET = request.GET.copy()
+        export_format = request.GET.pop(export.FORMAT_VAR, [export.CSV])[-1]
+        if export_format not in export.FORMATS:
+            raise Http404
+
+        try:
+            changelist = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            changelist_url = reverse(
+                "admin:%s_%s_changelist" % (self.opts.app_label, self.opts.model_name),
+                current_app=self.admin_site.name,
+            )
+            return HttpResponseRedirect(f"{changelist_url}?{ERROR_FLAG}=1")
+        queryset = changelist.get_queryset(request)
+        return export.export_response(self, request, queryset, export_format)
+
+    # ---------------------------------------------------
+    # Bulk import of CSV/JSONL files
+    # ---------------------------------------------------
+    def import_view(self, request):
+        with history.acting_user(request.user):
+            return self._import_view(request)
+
+    def _import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = importer.ImportForm(request.POST or None, request.FILES or None, model=self.model)
+        result = None
+        if request.method == "POST" and form.is_valid():
+            update_key = form.cleaned_data["update_key"] or None
+            if update_key and not self.has_change_permission(request):
+                raise PermissionDenied
+
+            upload = form.cleaned_data["file"]
+            rows_importer = importer.AutoAdminImporter(
+                self.model, update_key=update_key, batch_size=form.cleaned_data["batch_size"]
+            )
+            try:
+                result = rows_importer.run_file(upload.file, importer.guess_format(upload.name))
+            except ValidationError as e:
+                form.add_error(None, e)
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Import %(name)s") % {"name": self.opts.verbose_name_plural},
+            "opts": self.opts,
+            "form": form,
+            "result": result,
+        }
+        return TemplateResponse(request, "drofji_automatically_django_admin/import.html", context)
+
+    # ---------------------------------------------------
+    # Extra endpoints: autocomplete, distinct-value picker, export, import
+    # ---------------------------------------------------
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="%s_%s_import" % info,
+            ),
+            path(
+                "export/",
+                self.admin_site.admin_view(self.export_view),
+                name="%s_%s_export" % info,
+            ),
+            path(
+                "autocomplete/",
+                self.admin_site.admin_view(AutoAdminAutocompleteJsonView.as_view(admin_site=self.admin_site)),
+                name="%s_%s_autocomplete" % info,
+            ),
+            path(
+                "distinct-values/<str:field_path>/",
+                self.admin_site.admin_view(self.distinct_values_view),
+                name="%s_%s_distinct_values" % info,
+            ),
+        ] + super().get_urls()
+
+        # Per-request SQL/column/template timings (DROFJI_AUTO_ADMIN_INSTRUMENTATION)
+        for pattern in urls:
+            pattern.callback = instrumentation.instrument_view(pattern.callback, pattern.name)
+        return urls
+
+    def get_distinct_value_fields(self, request):
+        return {
+            list_filter[0] for list_filter in self.get_list_filter(request)
+            if isinstance(list_filter, (list, tuple)) and getattr(list_filter[1], "distinct_values", False)
+        }
+
+    def distinct_values_view(self, request, field_path):
+        from drofji_automatically_django_admin.filters import get_filter_cache_settings
+
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        if field_path not in self.get_distinct_value_fields(request):
+            raise Http404
+
+        limit = get_filter_cache_settings()["DISTINCT_LIMIT"]
+        term = request.GET.get("term", "")
+
+        queryset = self.get_queryset(request).filter(**{f"{field_path}__isnull": False})
+        if term:
+            queryset = queryset.filter(**{f"{field_path}__istartswith": term})
+        values = queryset.order_by(field_path).values_list(field_path, flat=True).distinct()[:limit]
+
+        return JsonResponse({
+            "results": [{"id": str(value), "text": str(value)} for value in values],
+            "pagination": {"more": False},
+        })
@@ -0,0 +1,107 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+# -------------------------------------------------------
+# Counts shown as "~N" or "N+" in the changelist
+# -------------------------------------------------------
+class ApproximateCount(int):
+    is_approximate = True
+
+    def __str__(self):
+        return f"~{int(self)}"
+
+
+class LowerBoundCount(int):
+    # At least this many rows; shown as "N+" when nothing better is known
+    is_approximate = True
+
+    def __str__(self):
+        return f"{int(self)}+"
+
+
+# -------------------------------------------------------
+# Planner/statistics row estimates
+# -------------------------------------------------------
+def estimate_table_rows(model, using="default"):
+    connection = connections[using]
+    table = model._meta.db_table
+
+    try:
+        # Savepoint: a failed statistics query must not break the request transaction
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+                row = cursor.fetchone()
+                # -1 for tables that were never analyzed
+                return row[0] if row and row[0] >= 0 else None
+
+            if connection.vendor == "sqlite":
+                # Filled by ANALYZE; first integer of 'stat' is the row count
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+
+            if connection.vendor == "mysql":
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table]
+                )
+                row = cursor.fetchone()
+                return row[0] if row else None
+    except DatabaseError:
+        return None
+
+    return None
+
+
+def estimate_queryset_rows(queryset):
+    if not queryset.query.where:
+        return estimate_table_rows(queryset.model, queryset.db)
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    try:
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# -------------------------------------------------------
+# Paginator counting exactly only below a threshold
+# -------------------------------------------------------
+class EstimatedCountPaginator(Paginator):
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return Paginator.count.func(self)
+
+        estimate = estimate_queryset_rows(queryset)
+        if estimate is not None:
+            if estimate < self.estimate_threshold:
+                return Paginator.count.func(self)
+            return ApproximateCount(estimate)
+
+        # No estimate available: count at most 'estimate_threshold' rows
+        bounded_count = queryset.order_by()[:self.estimate_threshold + 1].count()
+        if bounded_count <= self.estimate_threshold:
+            return bounded_count
+
+        return LowerBoundCount(self.estimate_threshold)
@@ -0,0 +1,95 @@
+import importlib
+import sys
+import time
+import weakref
+
+from django.conf import settings
+from django.contrib import admin
+
+
+# -------------------------------------------------------
+# Startup cost bookkeeping
+# -------------------------------------------------------
+# module path -> seconds spent importing it
+import_timings = {}
+# model label -> seconds spent building and registering its ModelAdmin
+registration_timings = {}
+
+
+def import_optional(module_path, attribute=None):
+    # Import optional dependencies only when a feature needs them
+    module = sys.modules.get(module_path)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(module_path)
+        import_timings[module_path] = time.perf_counter() - started
+    return getattr(module, attribute) if attribute else module
+
+
+def is_lazy_registration_enabled():
+    return getattr(settings, "DROFJI_AUTO_ADMIN_LAZY_REGISTRATION", False)
+
+
+# -------------------------------------------------------
+# Deferred registration, completed on first admin use
+# -------------------------------------------------------
+class LazyRegistration:
+    # Models waiting for register_admin() on one admin site. The site's
+    # get_urls() and each_context() complete them: loading the URLconf
+    # or rendering an admin page registers every deferred model first
+
+    def __init__(self, site):
+        self.site = site
+        self.pending = {}
+        self._materializing = False
+
+        get_urls = site.get_urls
+        each_context = site.each_context
+
+        def lazy_get_urls():
+            self.materialize()
+            return get_urls()
+
+        def lazy_each_context(request):
+            self.materialize()
+            return each_context(request)
+
+        site.get_urls = lazy_get_urls
+        site.each_context = lazy_each_context
+
+    def defer(self, model):
+        self.pending[model] = None
+
+    def materialize(self):
+        if self._materializing or not self.pending:
+            return
+        self._materializing = True
+        try:
+            while self.pending:
+                model = next(iter(self.pending))
+                del self.pending[model]
+                model.register_admin()
+        finally:
+            self._materializing = False
+
+
+# admin site -> LazyRegistration
+lazy_registrations = weakref.WeakKeyDictionary()
+
+
+def get_lazy_registration(site=None):
+    site = site or admin.site
+    if site not in lazy_registrations:
+        lazy_registrations[site] = LazyRegistration(site)
+    return lazy_registrations[site]
+
+
+def defer_registration(model, site=None):
+    get_lazy_registration(site).defer(model)
+
+
+def materialize(site=None):
+    # Registers the deferred models of the site now
+    registration = lazy_registrations.get(site or admin.site)
+    if registration is not None:
+        registration.materialize()
@@ -0,0 +1,279 @@
+import hashlib
+import time
+
+from django.db import DatabaseError, connections, migrations, models, transaction
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+
+# -------------------------------------------------------
+# Search term parsing: word, word* (prefix), "exact phrase"
+# -------------------------------------------------------
+TERM = "term"
+PREFIX = "prefix"
+PHRASE = "phrase"
+
+
+def parse_search_terms(search_term):
+    terms = []
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1] and len(bit) > 1:
+            words = unescape_string_literal(bit).split()
+            if words:
+                terms.append((PHRASE, words))
+        elif bit.endswith("*") and bit.strip("*"):
+            terms.append((PREFIX, [bit.strip("*")]))
+        elif bit.strip("*"):
+            terms.append((TERM, [bit]))
+    return terms
+
+
+# -------------------------------------------------------
+# Backends
+# -------------------------------------------------------
+class BaseSearchBackend:
+    vendor = None
+    # Seconds a missing index is remembered; found indexes are kept
+    missing_index_ttl = 60
+
+    # (model label, alias) -> index present, or the time it was found missing
+    _available = {}
+
+    def __init__(self, model):
+        self.model = model
+        self.table = model._meta.db_table
+
+    def supports_model(self):
+        return True
+
+    def get_fields(self):
+        return [
+            f for f in self.model._meta.concrete_fields
+            if getattr(f, "searchable", False) and isinstance(f, (models.CharField, models.TextField))
+        ]
+
+    def get_columns(self):
+        return [f.column for f in self.get_fields()]
+
+    def get_index_name(self):
+        digest = hashlib.md5(",".join(self.get_columns()).encode()).hexdigest()[:8]
+        return f"{self.table[:40]}_fts_{digest}"
+
+    def is_available(self, using):
+        key = (self.model._meta.label_lower, using)
+        available = self._available.get(key)
+        if available is True:
+            return True
+        if available is not None and time.monotonic() - available < self.missing_index_ttl:
+            return False
+        try:
+            with transaction.atomic(using=using):
+                exists = self.index_exists(connections[using])
+        except DatabaseError:
+            exists = False
+        # Checked again later: the index may be created by a later migrate
+        self._available[key] = True if exists else time.monotonic()
+        return exists
+
+    def ensure_index(self, using):
+        if not self.get_columns() or not self.supports_model():
+            return False
+        connection = connections[using]
+        if self.table not in connection.introspection.table_names():
+            return False
+        with transaction.atomic(using=using):
+            self.create_index(connection)
+        self._available[(self.model._meta.label_lower, using)] = True
+        return True
+
+    def create_index(self, connection):
+        # Recreated when the set of searchable columns changed
+        if self.get_indexed_columns(connection) == self.get_columns():
+            return
+        with connection.cursor() as cursor:
+            for sql in self.get_drop_sql(connection) + self.get_create_sql(connection):
+                cursor.execute(sql)
+
+    def get_indexed_columns(self, connection):
+        # Columns of the existing index, None when there is none
+        return self.get_columns() if self.index_exists(connection) else None
+
+    def search(self, queryset, search_term):
+        terms = parse_search_terms(search_term)
+        if not terms:
+            return None
+        return queryset.filter(self.match(terms, queryset.db))
+
+    def index_exists(self, connection):
+        raise NotImplementedError
+
+    def get_create_sql(self, connection, columns=None):
+        raise NotImplementedError
+
+    def get_drop_sql(self, connection):
+        raise NotImplementedError
+
+    def match(self, terms, using):
+        # Q matching the rows that contain all the terms
+        raise NotImplementedError
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    vendor = "sqlite"
+
+    def supports_model(self):
+        # External-content tables map rows by an integer rowid
+        pk = self.model._meta.pk
+        return isinstance(pk.target_field if pk.is_relation else pk, models.IntegerField)
+
+    def get_index_name(self):
+        return f"{self.table}_fts"
+
+    def index_exists(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.get_index_name()])
+            return cursor.fetchone() is not None
+
+    def get_indexed_columns(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM pragma_table_info(%s)", [self.get_index_name()])
+            return [row[0] for row in cursor.fetchall()] or None
+
+    def get_create_sql(self, connection, columns=None):
+        qn = connection.ops.quote_name
+        fts_table = self.get_index_name()
+        columns = columns or self.get_columns()
+        pk_column = self.model._meta.pk.column
+
+        column_list = ", ".join(qn(c) for c in columns)
+        new_values = ", ".join(f"new.{qn(c)}" for c in columns)
+        old_values = ", ".join(f"old.{qn(c)}" for c in columns)
+
+        # External-content table kept in sync by triggers
+        return [
+            f"CREATE VIRTUAL TABLE {qn(fts_table)} USING fts5("
+            f"{column_list}, content={qn(self.table)}, content_rowid={qn(pk_column)})",
+            f"CREATE TRIGGER {qn(f'{fts_table}_ai')} AFTER INSERT ON {qn(self.table)} BEGIN "
+            f"INSERT INTO {qn(fts_table)}(rowid, {column_list}) VALUES (new.{qn(pk_column)}, {new_values}); END",
+            f"CREATE TRIGGER {qn(f'{fts_table}_ad')} AFTER DELETE ON {qn(self.table)} BEGIN "
+            f"INSERT INTO {qn(fts_table)}({qn(fts_table)}, rowid, {column_list}) "
+            f"VALUES ('delete', old.{qn(pk_column)}, {old_values}); END",
+            f"CREATE TRIGGER {qn(f'{fts_table}_au')} AFTER UPDATE ON {qn(self.table)} BEGIN "
+            f"INSERT INTO {qn(fts_table)}({qn(fts_table)}, rowid, {column_list}) "
+            f"VALUES ('delete', old.{qn(pk_column)}, {old_values}); "
+            f"INSERT INTO {qn(fts_table)}(rowid, {column_list}) VALUES (new.{qn(pk_column)}, {new_values}); END",
+            f"INSERT INTO {qn(fts_table)}({qn(fts_table)}) VALUES ('rebuild')",
+        ]
+
+    def get_drop_sql(self, connection):
+        qn = connection.ops.quote_name
+        fts_table = self.get_index_name()
+        return [
+            *(f"DROP TRIGGER IF EXISTS {qn(f'{fts_table}_{suffix}')}" for suffix in ("ai", "ad", "au")),
+            f"DROP TABLE IF EXISTS {qn(fts_table)}",
+        ]
+
+    @staticmethod
+    def quote(word):
+        return '"' + word.replace('"', '""') + '"'
+
+    def match(self, terms, using):
+        match = []
+        for kind, words in terms:
+            if kind == PREFIX:
+                match.append(f"{self.quote(words[0])}*")
+            else:
+                match.append(self.quote(" ".join(words)))
+
+        qn = connections[using].ops.quote_name
+        fts_table = qn(self.get_index_name())
+        return models.Q(pk__in=RawSQL(
+            f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s", [" ".join(match)]
+        ))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    vendor = "postgresql"
+    config = "simple"
+
+    def get_document_sql(self, connection, table_alias=None):
+        qn = connection.ops.quote_name
+        prefix = f"{qn(table_alias)}." if table_alias else ""
+        columns = " || ' ' || ".join(f"coalesce({prefix}{qn(c)}, '')" for c in self.get_columns())
+        return f"to_tsvector('{self.config}', {columns})"
+
+    def index_exists(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [self.get_index_name()])
+            return cursor.fetchone() is not None
+
+    def get_create_sql(self, connection, columns=None):
+        # Expression index: always in sync, queries must use the same expression
+        qn = connection.ops.quote_name
+        return [
+            f"CREATE INDEX IF NOT EXISTS {qn(self.get_index_name())} "
+            f"ON {qn(self.table)} USING GIN (({self.get_document_sql(connection)}))"
+        ]
+
+    def get_drop_sql(self, connection):
+        return [f"DROP INDEX IF EXISTS {connection.ops.quote_name(self.get_index_name())}"]
+
+    @staticmethod
+    def quote(word):
+        return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+
+    def match(self, terms, using):
+        query = []
+        for kind, words in terms:
+            if kind == PREFIX:
+                query.append(f"{self.quote(words[0])}:*")
+            elif kind == PHRASE:
+                query.append("(" + " <-> ".join(self.quote(w) for w in words) + ")")
+            else:
+                query.append(self.quote(words[0]))
+
+        document = self.get_document_sql(connections[using], self.table)
+        return models.Q(RawSQL(
+            f"{document} @@ to_tsquery('{self.config}', %s)", [" & ".join(query)],
+            output_field=models.BooleanField()
+        ))
+
+
+SEARCH_BACKENDS = {
+    backend.vendor: backend
+    for backend in (SQLiteFTS5SearchBackend, PostgresSearchBackend)
+}
+
+
+def get_search_backend(model, using):
+    backend_class = SEARCH_BACKENDS.get(connections[using].vendor)
+    if backend_class is None:
+        return None
+    backend = backend_class(model)
+    if not backend.get_columns() or not backend.supports_model() or not backend.is_available(using):
+        return None
+    return backend
+
+
+# -------------------------------------------------------
+# Migration operations for models with admin_full_text_search
+# -------------------------------------------------------
+def get_index_operation(model, connection):
+    # RunSQL creating a missing index, recreating one whose columns changed,
+    # or dropping the index of a model that turned admin_full_text_search off
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    if backend_class is None:
+        return None
+    backend = backend_class(model)
+    if not backend.supports_model():
+        return None
+    wanted = backend.get_columns() if getattr(model, "admin_full_text_search", False) else []
+    existing = backend.get_indexed_columns(connection) or []
+    if wanted == existing:
+        return None
+
+    drop_sql = backend.get_drop_sql(connection)
+    return migrations.RunSQL(
+        sql=drop_sql + (backend.get_create_sql(connection, wanted) if wanted else []),
+        reverse_sql=drop_sql + (backend.get_create_sql(connection, existing) if existing else []),
+    )
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from drofji_automatically_django_admin import history
+from drofji_automatically_django_admin.cache import render_cache
+
+
+# -------------------------------------------------------
+# Invalidate cached admin data of AutoAdminModel subclasses
+# -------------------------------------------------------
+def is_auto_admin_model(sender):
+    from drofji_automatically_django_admin.models import AutoAdminModel
+    return isinstance(sender, type) and issubclass(sender, AutoAdminModel)
+
+
+@receiver([post_save, post_delete], dispatch_uid="drofji_auto_admin_bump_model_version")
+def bump_model_version(sender, **kwargs):
+    if is_auto_admin_model(sender):
+        render_cache.bump_model_version(sender, bulk=False)
+
+
+# -------------------------------------------------------
+# Change history of models with admin_history = True
+# -------------------------------------------------------
+@receiver(post_save, dispatch_uid="drofji_auto_admin_history_saved")
+def record_saved(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    if not raw and is_auto_admin_model(sender) and history.is_history_enabled(sender):
+        history.record_saved(instance, created, update_fields, using)
+
+
+@receiver(post_delete, dispatch_uid="drofji_auto_admin_history_deleted")
+def record_deleted(sender, instance, using=None, **kwargs):
+    if is_auto_admin_model(sender) and history.is_history_enabled(sender):
+        history.record_deleted(instance, using)
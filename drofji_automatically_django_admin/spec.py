@@ -0,0 +1,55 @@
+import typing
+from dataclasses import dataclass
+
+
+# -------------------------------------------------------
+# Compiled admin configuration of one AutoAdmin model
+# -------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class AutoAdminSpec:
+    form_fields: tuple
+    list_display: tuple
+    # Columns edited in place on the changelist
+    list_editable: tuple
+    search_fields: tuple
+    list_filter: tuple
+    autocomplete_fields: tuple
+    # ((method_name, display_method), ...) for AutoAdminFunctionField columns
+    function_columns: tuple
+    # ((action_name, action_function), ...) for "set <field> to <value>" actions
+    field_actions: tuple
+    # ((annotation_name, expression), ...) for SQL-backed function fields
+    annotations: tuple
+    list_select_related: typing.Union[bool, tuple]
+    list_prefetch_related: tuple
+    # Columns loaded for changelist rows; None loads every column
+    list_only: typing.Optional[tuple]
+
+    def get_function_columns(self):
+        return dict(self.function_columns)
+
+    def get_field_actions(self):
+        return dict(self.field_actions)
+
+    def get_annotations(self):
+        return dict(self.annotations)
+
+
+# -------------------------------------------------------
+# Per-model cache
+# -------------------------------------------------------
+_specs = {}
+
+
+def get_admin_spec(model):
+    spec = _specs.get(model)
+    if spec is None:
+        spec = _specs[model] = model.build_admin_spec()
+    return spec
+
+
+def invalidate_admin_spec(model=None):
+    if model is None:
+        _specs.clear()
+    else:
+        _specs.pop(model, None)
@@ -7,7 +7,7 @@
         // Функция для Select2
         function activateSelect2() {
             // Фильтры
-            $('#changelist-filter select').each(function() {
+            $('#changelist-filter select').not('.auto-admin-distinct-picker').each(function() {
                 var $select = $(this);
                 if (!$select.hasClass('select2-hidden-accessible')) {
                     $select.select2({
@@ -32,6 +32,34 @@
             });
         }
 
+        // Фильтры с большим числом значений: поиск значений через AJAX
+        function activateDistinctPickers() {
+            $('#changelist-filter select.auto-admin-distinct-picker').each(function() {
+                var $select = $(this);
+                if ($select.hasClass('select2-hidden-accessible')) return;
+                $select.select2({
+                    width: 'calc(100% - 15px)',
+                    placeholder: $select.data('placeholder'),
+                    minimumInputLength: 0,
+                    containerCssClass: 'django-select2-container',
+                    ajax: {
+                        url: $select.data('url'),
+                        dataType: 'json',
+                        delay: 250,
+                        data: function(params) {
+                            return {term: params.term || ''};
+                        }
+                    }
+                });
+                $select.on('select2:select', function(e) {
+                    var queryString = $select.data('query-string') || '?';
+                    var separator = queryString === '?' ? '' : '&';
+                    window.location.search = queryString + separator
+                        + encodeURIComponent($select.data('lookup')) + '=' + encodeURIComponent(e.params.data.id);
+                });
+            });
+        }
+
         // Функция для кликабельности строк
         function activateRowClick() {
             $("#changelist-form table tbody tr").each(function() {
@@ -49,6 +77,7 @@
         }
 
         $(document).ready(function() {
+            activateDistinctPickers();
             activateSelect2();
             activateRowClick();
         });
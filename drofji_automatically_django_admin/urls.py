@@ -0,0 +1,12 @@
+from django.urls import path
+
+from drofji_automatically_django_admin.api import api_view
+
+# Read-only JSON API: path("api/", include("drofji_automatically_django_admin.urls"))
+app_name = "drofji_auto_admin_api"
+
+urlpatterns = [
+    path("", api_view, name="index"),
+    path("<str:app_label>/<str:model_name>/", api_view, name="list"),
+    path("<str:app_label>/<str:model_name>/<str:pk>/", api_view, name="detail"),
+]
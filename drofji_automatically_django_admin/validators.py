@@ -1,3 +1,4 @@
+import codecs
 import os
 import typing
 
@@ -27,6 +28,24 @@ class FileEncodingEnum(str, Enum):
     ASCII = "ascii"
 
 
+# Leading bytes of binary formats; text formats have no signature
+MAGIC_BYTES = {
+    FileExtensionEnum.PDF.value: (b"%PDF-",),
+    FileExtensionEnum.DOCX.value: (b"PK\x03\x04",),
+    FileExtensionEnum.JPG.value: (b"\xff\xd8\xff",),
+    FileExtensionEnum.PNG.value: (b"\x89PNG\r\n\x1a\n",),
+}
+
+TEXT_EXTENSIONS = {
+    FileExtensionEnum.TXT.value,
+    FileExtensionEnum.CSV.value,
+    FileExtensionEnum.JSON.value,
+}
+
+# Encodings decoding any byte sequence: nothing left to check once one is alive
+TOTAL_ENCODINGS = {"latin-1", "latin1", "iso-8859-1", "iso8859-1"}
+
+
 # --- Validators ---
 
 @deconstructible
@@ -36,6 +55,7 @@ class FileValidator:
             allowed_extensions: typing.List[typing.Union[FileExtensionEnum, str]] = None,
             allowed_encodings: typing.List[typing.Union[FileEncodingEnum, str]] = None,
             max_size_bytes: int = None,
+            chunk_size: int = 64 * 1024,
     ):
         self.allowed_extensions = [
             ext.value.lower() if isinstance(ext, FileExtensionEnum) else ext.lower()
@@ -48,10 +68,12 @@ class FileValidator:
         ] if allowed_encodings else None
 
         self.max_size_bytes = max_size_bytes
+        self.chunk_size = chunk_size
 
     def __call__(self, file):
+        ext = os.path.splitext(file.name)[1].lower().replace('.', '')
+
         if self.allowed_extensions:
-            ext = os.path.splitext(file.name)[1].lower().replace('.', '')
             if ext not in self.allowed_extensions:
                 raise ValidationError(
                     _("File extension '%(ext)s' is not allowed. Allowed: %(allowed)s"),
@@ -64,24 +86,93 @@ class FileValidator:
                 params={'size': file.size, 'max_size': self.max_size_bytes}
             )
 
-        if self.allowed_encodings:
-            try:
-                content = file.read(1024 * 1024)
-                file.seek(0)
-
-                is_valid = False
-                for enc in self.allowed_encodings:
-                    try:
-                        content.decode(enc)
-                        is_valid = True
-                        break
-                    except (UnicodeDecodeError, LookupError):
-                        continue
-
-                if not is_valid:
-                    raise ValidationError(
-                        _("Invalid encoding. Allowed: %(encodings)s"),
-                        params={'encodings': ", ".join(self.allowed_encodings)}
-                    )
-            except Exception:
-                raise ValidationError(_("Could not verify file encoding."))
+        try:
+            self.validate_content(file, ext)
+        except OSError:
+            raise ValidationError(_("Could not read file."))
+        finally:
+            if hasattr(file, "seek"):
+                try:
+                    file.seek(0)
+                except (OSError, ValueError):
+                    pass
+
+    def iter_chunks(self, file):
+        if hasattr(file, "chunks"):
+            yield from file.chunks(self.chunk_size)
+            return
+        while True:
+            chunk = file.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def check_magic_bytes(self, head, ext):
+        if ext in MAGIC_BYTES:
+            matches = head.startswith(MAGIC_BYTES[ext])
+        elif ext in TEXT_EXTENSIONS:
+            # Text extensions must not carry a binary format's content
+            matches = not any(head.startswith(signatures) for signatures in MAGIC_BYTES.values())
+        else:
+            return
+        if not matches:
+            raise ValidationError(
+                _("File content does not match the '%(ext)s' extension."),
+                params={'ext': ext}
+            )
+
+    def validate_content(self, file, ext):
+        # Binary formats are identified by signature, not by text encoding
+        check_encoding = self.allowed_encodings and ext not in MAGIC_BYTES
+
+        decoders = {}
+        if check_encoding:
+            for enc in self.allowed_encodings:
+                try:
+                    decoders[enc] = codecs.getincrementaldecoder(enc)(errors="strict")
+                except LookupError:
+                    continue
+
+        # Candidate decoders run side by side over fixed-size chunks; memory
+        # is bounded by the chunk size however large the file is
+        first_chunk = True
+        for chunk in self.iter_chunks(file):
+            if isinstance(chunk, str):
+                # Text-mode file objects are already decoded
+                return
+
+            if first_chunk:
+                first_chunk = False
+                self.check_magic_bytes(chunk, ext)
+                if not check_encoding:
+                    return
+
+            for enc, decoder in list(decoders.items()):
+                try:
+                    decoder.decode(chunk)
+                except UnicodeError:
+                    del decoders[enc]
+
+            # Stop as soon as the result is known
+            if not decoders:
+                self.raise_invalid_encoding()
+            if TOTAL_ENCODINGS.intersection(decoders):
+                return
+
+        if first_chunk:
+            self.check_magic_bytes(b"", ext)
+
+        if check_encoding:
+            for enc, decoder in list(decoders.items()):
+                try:
+                    decoder.decode(b"", final=True)
+                except UnicodeError:
+                    del decoders[enc]
+            if not decoders:
+                self.raise_invalid_encoding()
+
+    def raise_invalid_encoding(self):
+        raise ValidationError(
+            _("Invalid encoding. Allowed: %(encodings)s"),
+            params={'encodings': ", ".join(self.allowed_encodings)}
+        )
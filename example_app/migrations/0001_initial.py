@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+import django.db.models.deletion
+import drofji_automatically_django_admin.fields
+import drofji_automatically_django_admin.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', drofji_automatically_django_admin.fields.AutoAdminCharField(max_length=100, verbose_name='First Name')),
+                ('last_name', drofji_automatically_django_admin.fields.AutoAdminCharField(max_length=100, verbose_name='Last Name')),
+                ('origin', drofji_automatically_django_admin.fields.AutoAdminCharField(choices=[('status_a', 'Status A'), ('status_b', 'Status B'), ('status_c', 'Status C')], max_length=100, verbose_name='Origin')),
+                ('email', drofji_automatically_django_admin.fields.AutoAdminEmailField(max_length=200, verbose_name='Email')),
+                ('active', drofji_automatically_django_admin.fields.AutoAdminBooleanField(default=True, verbose_name='Is Active')),
+            ],
+            options={
+                'verbose_name': 'Customer',
+                'verbose_name_plural': 'Customers',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', drofji_automatically_django_admin.fields.AutoAdminCharField(max_length=200, verbose_name='Name')),
+                ('price', drofji_automatically_django_admin.fields.AutoAdminDecimalField(decimal_places=2, max_digits=10, verbose_name='Price')),
+                ('available', drofji_automatically_django_admin.fields.AutoAdminBooleanField(default=True, verbose_name='Available')),
+            ],
+            options={
+                'verbose_name': 'Product',
+                'verbose_name_plural': 'Products',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', drofji_automatically_django_admin.fields.AutoAdminDecimalField(decimal_places=2, max_digits=10, verbose_name='Total')),
+                ('config', drofji_automatically_django_admin.fields.AutoAdminFileField(allowed_encodings=[drofji_automatically_django_admin.validators.FileEncodingEnum['UTF8']], allowed_extensions=[drofji_automatically_django_admin.validators.FileExtensionEnum['JSON']], max_size_bytes=524288, upload_to='configs/', verbose_name='Configuration')),
+                ('customer', drofji_automatically_django_admin.fields.AutoAdminForeignKey(on_delete=django.db.models.deletion.PROTECT, to='example_app.customer', verbose_name='Customer')),
+            ],
+            options={
+                'verbose_name': 'Order',
+                'verbose_name_plural': 'Orders',
+            },
+        ),
+    ]
@@ -1,7 +1,11 @@
+from decimal import Decimal
+
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.db import models as django_models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Cast, Concat
 from drofji_automatically_django_admin import fields as drofji_fields, models as drofji_models
 from drofji_automatically_django_admin import validators
 
@@ -14,22 +18,38 @@ class Product(drofji_models.AutoAdminModel):
     full_info2 = drofji_fields.AutoAdminFunctionField(
         func=lambda obj: f"{obj.name} — {obj.price}$",
         verbose_name=_("Full Info1"),
-        show_in_list=True
+        show_in_list=True,
+        columns=["name", "price"]
     )
     price = drofji_fields.AutoAdminDecimalField(
         max_digits=10,
         decimal_places=2,
-        verbose_name=_("Price")
+        verbose_name=_("Price"),
+        editable_in_list=True
     )
     available = drofji_fields.AutoAdminBooleanField(
-        default=True, verbose_name=_("Available")
+        default=True, verbose_name=_("Available"), editable_in_list=True
     )
     full_info1 = drofji_fields.AutoAdminFunctionField(
-        func=lambda obj: f"{obj.name} — {obj.price}$",
+        expression=Concat(
+            "name", Value(" — "), Cast("price", django_models.CharField()), Value("$"),
+            output_field=django_models.CharField()
+        ),
         verbose_name=_("Full Info"),
-        show_in_list=True
+        show_in_list=True,
+        searchable=True
+    )
+    price_with_tax = drofji_fields.AutoAdminFunctionField(
+        expression=ExpressionWrapper(
+            F("price") * Decimal("1.2"), output_field=django_models.DecimalField(max_digits=12, decimal_places=2)
+        ),
+        verbose_name=_("Price with tax"),
+        filterable=True
     )
 
+    admin_history = True
+    admin_api_enabled = True
+
     class Meta:
         verbose_name = _("Product")
         verbose_name_plural = _("Products")
@@ -43,7 +63,8 @@ class Customer(drofji_models.AutoAdminModel):
     )
     last_name = drofji_fields.AutoAdminCharField(
         max_length=100,
-        verbose_name=_("Last Name")
+        verbose_name=_("Last Name"),
+        filterable=True
     )
     origin = drofji_fields.AutoAdminCharField(
         max_length=100,
@@ -54,7 +75,8 @@ class Customer(drofji_models.AutoAdminModel):
             ('status_c', 'Status C')
         ],
         show_in_list=False,
-        filterable=True
+        filterable=True,
+        bulk_actions=True
     )
     origin_display = drofji_fields.AutoAdminStatusBadgeField(
         field_name='origin',
@@ -88,9 +110,13 @@ class Customer(drofji_models.AutoAdminModel):
     )
     active = drofji_fields.AutoAdminBooleanField(
         default=True,
-        verbose_name=_("Is Active")
+        verbose_name=_("Is Active"),
+        bulk_actions=True
     )
 
+    admin_history = True
+    admin_api_enabled = True
+
     class Meta:
         verbose_name = _("Customer")
         verbose_name_plural = _("Customers")
@@ -1,3 +1,1313 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.admin.filters import AllValuesFieldListFilter, BooleanFieldListFilter, ChoicesFieldListFilter
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, migrations, models as django_models, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.html import format_html
+from django.utils.safestring import SafeString, mark_safe
+
+from drofji_automatically_django_admin import (
+    export, fields as drofji_fields, filters, generator, history, importer, indexes, instrumentation, registry, search,
+)
+from drofji_automatically_django_admin.management.commands import auto_admin_indexes
+from drofji_automatically_django_admin.autocomplete import AutoAdminAutocompleteJsonView, get_autocomplete_cache
+from drofji_automatically_django_admin.cache import render_cache
+from drofji_automatically_django_admin.paginators import EstimatedCountPaginator
+from drofji_automatically_django_admin.search import SQLiteFTS5SearchBackend
+from drofji_automatically_django_admin.validators import FileValidator
+
+from drofji_automatically_django_admin.models import AutoAdminModel
+
+from example_app.models import Customer, Order, Product
+
+
+def jsonl(*rows):
+    lines = [row if isinstance(row, str) else json.dumps(row) for row in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def customer_row(index, **values):
+    return {
+        "first_name": f"First {index}",
+        "last_name": f"Last {index}",
+        "origin": "status_a",
+        "email": f"customer{index}@example.com",
+        **values,
+    }
+
+
+class AdminTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+
+# -------------------------------------------------------
+# Query counts that do not grow with the number of rows
+# -------------------------------------------------------
+class QueryCountTestCase(AdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.customers = Customer.objects.bulk_create([Customer(**customer_row(index)) for index in range(3)])
+
+    def add_rows(self, count):
+        Order.objects.bulk_create([
+            Order(customer=self.customers[index % 3], total=Decimal(index), config="configs/order.json")
+            for index in range(count)
+        ])
+        Product.objects.bulk_create([Product(name=f"Product {index}", price=Decimal(index)) for index in range(count)])
+
+    def get_queries(self, url):
+        render_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return [query["sql"] for query in queries]
+
+    def assertConstantQueries(self, url):
+        self.add_rows(2)
+        # First request of the test: admin theme and content types are cached afterwards
+        self.get_queries(url)
+        few = self.get_queries(url)
+        self.add_rows(20)
+        many = self.get_queries(url)
+        self.assertEqual(len(few), len(many), "\n".join(many))
+
+
+class RelatedRowsQueryTests(QueryCountTestCase):
+
+    def test_changelist_joins_relations(self):
+        self.assertConstantQueries("/admin/example_app/order/")
+
+
+# -------------------------------------------------------
+# Columns loaded for the changelist rows
+# -------------------------------------------------------
+class ColumnProjectionTests(QueryCountTestCase):
+
+    def test_changelist_loads_only_list_columns(self):
+        self.add_rows(2)
+        queries = self.get_queries("/admin/example_app/order/")
+        rows_query = next(sql for sql in queries if 'JOIN "example_app_customer"' in sql)
+        self.assertIn('"example_app_order"."total"', rows_query)
+        self.assertNotIn('"example_app_order"."config"', rows_query)
+
+
+# -------------------------------------------------------
+# Streaming export of the list columns
+# -------------------------------------------------------
+class ExportTests(QueryCountTestCase):
+
+    def test_export(self):
+        self.assertConstantQueries("/admin/example_app/order/export/?_format=csv")
+        self.assertConstantQueries("/admin/example_app/product/export/?_format=jsonl")
+
+    def test_csv_follows_list_display_as_plain_text(self):
+        response = self.client.get("/admin/example_app/customer/export/", {"_format": "csv", "q": "First 1"})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        model_admin = admin.site._registry[Customer]
+        columns = export.get_export_columns(model_admin, response.wsgi_request)
+        self.assertEqual(lines[0], ",".join(column.label for column in columns))
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Status A", lines[1])
+        self.assertNotIn("<", lines[1])
+
+
+# -------------------------------------------------------
+# Admin spec built once per model until invalidated
+# -------------------------------------------------------
+class AdminSpecTests(TestCase):
+
+    def test_spec_is_built_once(self):
+        self.assertIs(Customer.get_admin_spec(), Customer.get_admin_spec())
+
+    def test_invalidation(self):
+        customer_spec = Customer.get_admin_spec()
+        product_spec = Product.get_admin_spec()
+        self.addCleanup(Customer.invalidate_admin_spec)
+
+        Customer._meta.get_field("email").show_in_list = True
+        self.addCleanup(setattr, Customer._meta.get_field("email"), "show_in_list", False)
+        self.assertIs(Customer.get_admin_spec(), customer_spec)
+
+        Customer.invalidate_admin_spec()
+        self.assertIsNot(Customer.get_admin_spec(), customer_spec)
+        self.assertIn("email", Customer.get_admin_spec().list_display)
+        self.assertIs(Product.get_admin_spec(), product_spec)
+
+
+# -------------------------------------------------------
+# Admin registration
+# -------------------------------------------------------
+class RegistrationTests(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        admin.site.unregister(Product)
+        self.addCleanup(lambda: admin.site.is_registered(Product) or Product.register_admin())
+
+    def test_eager_by_default(self):
+        AutoAdminModel.register_all_admins("example_app")
+        self.assertTrue(admin.site.is_registered(Product))
+
+    @override_settings(DROFJI_AUTO_ADMIN_LAZY_REGISTRATION=True)
+    def test_lazy_registration_waits_for_the_admin_urls(self):
+        AutoAdminModel.register_all_admins("example_app")
+        self.assertFalse(admin.site.is_registered(Product))
+        self.assertIn(Product, registry.get_lazy_registration().pending)
+
+        admin.site.get_urls()
+        self.assertTrue(admin.site.is_registered(Product))
+        self.assertEqual(registry.get_lazy_registration().pending, {})
+
+    def test_lazy_registration_completes_on_the_first_admin_page(self):
+        AutoAdminModel.register_all_admins("example_app", lazy=True)
+        self.assertFalse(admin.site.is_registered(Product))
+
+        admin.site.each_context(self.client.get("/").wsgi_request)
+        self.assertTrue(admin.site.is_registered(Product))
+
+
+# -------------------------------------------------------
+# Inline list editing: edited cells only, stale rows rejected
+# -------------------------------------------------------
+class ListEditableTests(AdminTestCase):
+    url = "/admin/example_app/product/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = Product.objects.bulk_create([
+            Product(name=f"Product {index}", price=Decimal(index)) for index in range(1, 6)
+        ])
+
+    def get_post_data(self):
+        formset = self.client.get(self.url).context["cl"].formset
+        data = {"_save": "Save", formset.snapshot_var: formset.get_snapshot()}
+        data.update({
+            formset.management_form.add_prefix(name): value
+            for name, value in formset.management_form.initial.items()
+        })
+        for form in formset.forms:
+            for name in form.fields:
+                value = form[name].value()
+                if value is True:
+                    data[form.add_prefix(name)] = "on"
+                elif value not in (None, False):
+                    data[form.add_prefix(name)] = value.pk if hasattr(value, "pk") else value
+        return formset, data
+
+    def set_price(self, formset, data, product, price):
+        form = next(form for form in formset.forms if form.instance.pk == product.pk)
+        data[form.add_prefix("price")] = price
+
+    def test_only_edited_cells_are_written(self):
+        formset, data = self.get_post_data()
+        self.set_price(formset, data, self.products[0], "11.00")
+        # Changed by someone else, not edited on the page: left alone
+        Product.objects.filter(pk=self.products[1].pk).update(price=Decimal("99.00"))
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        prices = dict(Product.objects.values_list("pk", "price"))
+        self.assertEqual(prices[self.products[0].pk], Decimal("11.00"))
+        self.assertEqual(prices[self.products[1].pk], Decimal("99.00"))
+
+    def test_conflicting_edit_is_rejected(self):
+        formset, data = self.get_post_data()
+        self.set_price(formset, data, self.products[0], "11.00")
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal("50.00"))
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "changed by someone else")
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).price, Decimal("50.00"))
+
+    def test_queries_do_not_grow_with_changed_rows(self):
+        def save(changed):
+            formset, data = self.get_post_data()
+            for product in self.products[:changed]:
+                self.set_price(formset, data, product, str(product.price + changed))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.post(self.url, data).status_code, 302)
+            return len(queries)
+
+        self.assertEqual(save(1), save(5))
+
+
+# -------------------------------------------------------
+# Autocomplete endpoint
+# -------------------------------------------------------
+class AutocompleteTests(AdminTestCase):
+    url = "/admin/example_app/order/autocomplete/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ada = Customer.objects.create(**customer_row(1, first_name="Ada", last_name="Lovelace"))
+        cls.alan = Customer.objects.create(**customer_row(2, first_name="Alan", last_name="Turing"))
+        Customer.objects.create(**customer_row(3, first_name="Grace", last_name="Hopper"))
+
+    def setUp(self):
+        super().setUp()
+        render_cache.clear()
+        get_autocomplete_cache().clear()
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, {
+            "app_label": "example_app", "model_name": "order", "field_name": "customer", "term": term, **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def result_ids(self, response):
+        return [int(result["id"]) for result in response.json()["results"]]
+
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(self.result_ids(self.search("a")), [self.ada.pk, self.alan.pk])
+        self.assertEqual(self.result_ids(self.search("ADA lov")), [self.ada.pk])
+        self.assertEqual(self.result_ids(self.search("da")), [])
+
+    def test_prefix_match_on_the_lowercased_column(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search("Ada")
+        rows_query = next(query["sql"] for query in queries if 'FROM "example_app_customer"' in query["sql"])
+        self.assertIn('LOWER("example_app_customer"."first_name") LIKE', rows_query)
+        self.assertNotIn("UPPER", rows_query)
+
+    @override_settings(DROFJI_AUTO_ADMIN_AUTOCOMPLETE={"PAGE_SIZE": 2})
+    def test_pages(self):
+        response = self.search("")
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertTrue(response.json()["pagination"]["more"])
+        self.assertFalse(self.search("", page=2).json()["pagination"]["more"])
+
+    def test_pages_are_cached_until_the_target_changes(self):
+        self.assertIn("miss", self.search("gr")["Server-Timing"])
+        self.assertIn("hit", self.search("gr")["Server-Timing"])
+
+        Customer.objects.filter(pk=self.alan.pk).update(first_name="Grete")
+        response = self.search("gr")
+        self.assertIn("miss", response["Server-Timing"])
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_targets_outside_auto_admin_are_kept_for_the_ttl(self):
+        self.assertEqual(AutoAdminAutocompleteJsonView.get_target_version(User), "ttl")
+        self.assertEqual(
+            AutoAdminAutocompleteJsonView.get_target_version(Customer), render_cache.get_model_version(Customer)
+        )
+
+    def test_permission(self):
+        staff = User.objects.create_user("staff", password="password", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(self.url, {
+            "app_label": "example_app", "model_name": "order", "field_name": "customer", "term": "a",
+        })
+        self.assertEqual(response.status_code, 403)
+
+
+# -------------------------------------------------------
+# Set-field actions: one UPDATE of the rows that change
+# -------------------------------------------------------
+class SetFieldActionTests(AdminTestCase):
+    url = "/admin/example_app/customer/"
+
+    def test_rows_holding_the_value_are_skipped(self):
+        customers = Customer.objects.bulk_create([
+            Customer(**customer_row(index, active=index % 2 == 0)) for index in range(6)
+        ])
+        action = next(
+            name for name, (_function, _name, description) in
+            admin.site._registry[Customer].get_actions(self.client.get(self.url).wsgi_request).items()
+            if name.startswith("set_active_") and "No" in str(description)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                "action": action, "_selected_action": [customer.pk for customer in customers],
+            }, follow=True)
+
+        self.assertContains(response, "on 3 Customers")
+        self.assertFalse(Customer.objects.filter(active=True).exists())
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        # Customer records history: the UPDATE names the changed rows only
+        self.assertIn(f"IN ({', '.join(str(customer.pk) for customer in customers if customer.active)})", updates[0])
+
+
+# -------------------------------------------------------
+# Admin options accepted by every field type
+# -------------------------------------------------------
+class FieldOptionTests(TestCase):
+
+    def test_every_field_type_takes_the_admin_options(self):
+        field_classes = [
+            field_class for field_class in vars(drofji_fields).values()
+            if isinstance(field_class, type) and issubclass(field_class, drofji_fields.AutoAdminField)
+            and field_class is not drofji_fields.AutoAdminField
+        ]
+        required = {
+            drofji_fields.AutoAdminCharField: {"max_length": 10},
+            drofji_fields.AutoAdminDecimalField: {"max_digits": 5, "decimal_places": 2},
+            drofji_fields.AutoAdminForeignKey: {"to": Customer, "on_delete": django_models.CASCADE},
+        }
+        for field_class in field_classes:
+            with self.subTest(field_class.__name__):
+                field = field_class(editable_in_list=True, bulk_actions=True, **required.get(field_class, {}))
+                self.assertTrue(field.editable_in_list)
+                self.assertTrue(field.bulk_actions)
+
+    def test_field_type_defaults(self):
+        self.assertTrue(drofji_fields.AutoAdminCharField(max_length=10).searchable)
+        self.assertFalse(drofji_fields.AutoAdminJSONField().show_in_list)
+        self.assertTrue(drofji_fields.AutoAdminDateField().filterable)
+        self.assertFalse(drofji_fields.AutoAdminDateField(auto_now=True).editable)
+        self.assertFalse(drofji_fields.AutoAdminIntegerField(filterable=False).filterable)
+
+    def test_file_field_reconstructs_with_one_file_validator(self):
+        field = Order._meta.get_field("config")
+        _name, _path, args, kwargs = field.deconstruct()
+        self.assertNotIn("validators", kwargs)
+
+        rebuilt = drofji_fields.AutoAdminFileField(*args, **kwargs)
+        self.assertEqual(len(rebuilt.validators), 1)
+        self.assertEqual(rebuilt.deconstruct()[3], kwargs)
+
+
+# -------------------------------------------------------
+# Status badges
+# -------------------------------------------------------
+class StatusBadgeTests(TestCase):
+
+    @staticmethod
+    def render_per_row(badge, obj):
+        # Rendering before the markup was precompiled: format_html on every row
+        field_value, field_display = badge.get_field_display(obj)
+        for choice in badge.choices:
+            if choice.status_string == field_value:
+                return format_html('<a style="{}">{}</a>', choice.get_style_string(badge.style_arguments), field_display)
+        return field_display
+
+    def test_precompiled_markup_matches_format_html(self):
+        badge = drofji_fields.AutoAdminStatusBadgeField(
+            field_name="status",
+            choices=[
+                drofji_fields.AutoAdminStatusBadgeFieldChoice("open", text_html_color='"><script>x</script>'),
+                drofji_fields.AutoAdminStatusBadgeFieldChoice("<b>", background_html_color="#FFF & co"),
+                drofji_fields.AutoAdminStatusBadgeFieldChoice(1),
+                drofji_fields.AutoAdminStatusBadgeFieldChoice("open", text_html_color="#000000"),
+            ],
+            style_arguments={"font-family": '"Serif" <x>'},
+        )
+        labels = [("open", "Open & <i>new</i>"), ("<b>", "<b>bold</b>"), (1, mark_safe("<em>one</em>"))]
+        for value in ("open", "<b>", 1, "unknown", None, ["unhashable"]):
+            label = next((label for key, label in labels if key == value), value)
+            obj = mock.Mock(status=value, get_status_display=lambda label=label: label)
+            with self.subTest(value=value):
+                expected = self.render_per_row(badge, obj)
+                rendered = badge.get_html_choice(obj)
+                self.assertEqual(rendered, expected)
+                self.assertEqual(isinstance(rendered, SafeString), isinstance(expected, SafeString))
+
+
+# -------------------------------------------------------
+# Uploaded file validation
+# -------------------------------------------------------
+class FileValidatorTests(TestCase):
+
+    def validate(self, name, content, chunk_size=4, **options):
+        upload = SimpleUploadedFile(name, content)
+        FileValidator(chunk_size=chunk_size, **options)(upload)
+        return upload
+
+    def assertInvalid(self, name, content, message, **options):
+        with self.assertRaisesMessage(ValidationError, message):
+            self.validate(name, content, **options)
+
+    def test_character_split_across_chunks(self):
+        content = "naïve café, 東京".encode()
+        for chunk_size in range(1, 6):
+            with self.subTest(chunk_size=chunk_size):
+                upload = self.validate("notes.txt", content, chunk_size, allowed_encodings=["utf-8"])
+                self.assertEqual(upload.tell(), 0)
+
+    def test_invalid_encoding(self):
+        self.assertInvalid("notes.txt", b"caf\xe9 au lait", "Invalid encoding", allowed_encodings=["utf-8"])
+        # A character cut off at the end of the file
+        self.assertInvalid("notes.txt", "café".encode()[:-1], "Invalid encoding", allowed_encodings=["utf-8"])
+        self.validate("notes.txt", b"caf\xe9 au lait", allowed_encodings=["utf-8", "cp1251"])
+
+    def test_content_must_match_the_extension(self):
+        self.assertInvalid("report.pdf", b"plain text", "does not match the 'pdf' extension")
+        self.assertInvalid("data.json", b"%PDF-1.7 ...", "does not match the 'json' extension")
+        self.validate("report.pdf", b"%PDF-1.7 ...", allowed_encodings=["utf-8"])
+
+    def test_empty_file(self):
+        self.validate("data.json", b"", allowed_encodings=["utf-8"])
+        self.assertInvalid("report.pdf", b"", "does not match the 'pdf' extension")
+
+    def test_size_limit(self):
+        self.validate("data.json", b"{}" * 8, max_size_bytes=16)
+        self.assertInvalid("data.json", b"{}" * 9, "Max allowed is 16 bytes", max_size_bytes=16)
+
+    def test_extension(self):
+        self.assertInvalid("data.csv", b"a,b", "'csv' is not allowed", allowed_extensions=["json"])
+
+
+# -------------------------------------------------------
+# Facet counts
+# -------------------------------------------------------
+class FacetCountTests(AdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Customer.objects.bulk_create([
+            Customer(**customer_row(
+                index, origin=f"status_{'abc'[index % 3]}", active=index % 4 != 0, last_name=f"Last {index % 5}",
+            ))
+            for index in range(30)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        render_cache.clear()
+        self.django_admin = admin.ModelAdmin(Customer, admin.site)
+        self.django_admin.list_filter = [
+            ("last_name", AllValuesFieldListFilter),
+            ("origin", ChoicesFieldListFilter),
+            ("active", BooleanFieldListFilter),
+        ]
+
+    def get_choices(self, model_admin, params):
+        request = RequestFactory().get("/admin/example_app/customer/", {"_facets": "1", **params})
+        request.user = self.user
+        cl = model_admin.get_changelist_instance(request)
+        with CaptureQueriesContext(connection) as queries:
+            choices = {
+                spec.field_path: [choice["display"] for choice in spec.choices(cl)]
+                for spec in cl.filter_specs
+            }
+        # The sidebar state the counting must leave alone
+        state = (
+            [spec.field_path for spec in cl.filter_specs], cl.has_active_filters, cl.clear_all_filters_qs,
+            sorted(obj.pk for obj in cl.result_list),
+        )
+        return choices, state, queries
+
+    def test_counts_match_django(self):
+        for params in ({}, {"active__exact": "1"}, {"origin__exact": "status_b", "last_name": "Last 2"}):
+            with self.subTest(params=params):
+                expected, expected_state, _queries = self.get_choices(self.django_admin, params)
+                choices, state, _queries = self.get_choices(admin.site._registry[Customer], params)
+                self.assertEqual(choices, expected)
+                self.assertEqual(state, expected_state)
+
+    def test_one_query_for_all_filters(self):
+        _choices, _state, queries = self.get_choices(admin.site._registry[Customer], {"active__exact": "0"})
+        self.assertEqual(len(queries), 1)
+        _choices, _state, queries = self.get_choices(admin.site._registry[Customer], {"active__exact": "0"})
+        self.assertEqual(len(queries), 0)
+
+
+# -------------------------------------------------------
+# Distinct-value filters
+# -------------------------------------------------------
+@override_settings(DROFJI_AUTO_ADMIN_FILTER_CACHE={"DISTINCT_LIMIT": 3})
+class DistinctValueFilterTests(AdminTestCase):
+    url = "/admin/example_app/customer/"
+
+    def setUp(self):
+        super().setUp()
+        render_cache.clear()
+
+    def add_customers(self, *last_names):
+        Customer.objects.bulk_create([
+            Customer(**customer_row(index, last_name=last_name)) for index, last_name in enumerate(last_names)
+        ])
+
+    def get_filter(self):
+        response = self.client.get(self.url)
+        return next(spec for spec in response.context["cl"].filter_specs if spec.field_path == "last_name")
+
+    def test_values_below_the_cap_are_listed(self):
+        self.add_customers("Ada", "Alan", "Ada")
+        spec = self.get_filter()
+        self.assertFalse(spec.is_truncated)
+        self.assertEqual(list(spec.lookup_choices), ["Ada", "Alan"])
+
+    def test_values_above_the_cap_use_the_picker(self):
+        self.add_customers("Ada", "Alan", "Grace", "Linus")
+        spec = self.get_filter()
+        self.assertTrue(spec.is_truncated)
+        self.assertEqual(spec.picker_url, "/admin/example_app/customer/distinct-values/last_name/")
+        self.assertEqual(spec.lookup_choices, [])
+
+    def test_values_are_cached_per_model_version(self):
+        self.add_customers("Ada")
+        queryset = Customer.objects.order_by("last_name").values_list("last_name", flat=True).distinct()
+        with self.assertNumQueries(1):
+            self.assertEqual(filters.get_distinct_values(queryset, "last_name", 3), (["Ada"], False))
+        with self.assertNumQueries(0):
+            self.assertEqual(filters.get_distinct_values(queryset, "last_name", 3), (["Ada"], False))
+
+        self.add_customers("Ada", "Alan")
+        self.assertEqual(filters.get_distinct_values(queryset, "last_name", 3), (["Ada", "Alan"], False))
+
+    def test_picker_view(self):
+        self.add_customers("Ada", "Alan", "Grace", "Linus", "Adele")
+        response = self.client.get(self.spec_url(), {"term": "ad"})
+        self.assertEqual([result["id"] for result in response.json()["results"]], ["Ada", "Adele"])
+
+        response = self.client.get(self.spec_url())
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_picker_view_permissions(self):
+        self.assertEqual(self.client.get("/admin/example_app/customer/distinct-values/email/").status_code, 404)
+
+        staff = User.objects.create_user("staff", password="password", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.spec_url()).status_code, 403)
+        staff.user_permissions.add(Permission.objects.get(codename="view_customer"))
+        self.assertEqual(self.client.get(self.spec_url()).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.spec_url()).status_code, 302)
+
+    def spec_url(self):
+        return "/admin/example_app/customer/distinct-values/last_name/"
+
+
+# -------------------------------------------------------
+# Range filter bounds and histograms
+# -------------------------------------------------------
+class RangeFilterTests(AdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        customer = Customer.objects.create(**customer_row(1))
+        Order.objects.bulk_create([
+            Order(customer=customer, total=Decimal(total), config="configs/order.json")
+            for total in (5, 10, 10, 40, 95)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        render_cache.clear()
+
+    def test_bounds_and_histogram(self):
+        stats = filters.get_range_stats(Order)["total"]
+        self.assertEqual((stats["min"], stats["max"]), (Decimal(5), Decimal(95)))
+        self.assertEqual(len(stats["histogram"]), 10)
+        self.assertEqual(sum(count for _lower, _upper, count in stats["histogram"]), 5)
+        # 5, 10 and 10 below the first edge at 14
+        self.assertEqual(stats["histogram"][0][2], 3)
+        self.assertEqual(stats["histogram"][-1][2], 1)
+
+    def test_stats_are_cached_per_model_version(self):
+        with self.assertNumQueries(2):
+            filters.get_range_stats(Order)
+        with self.assertNumQueries(0):
+            filters.get_range_stats(Order)
+
+        Order.objects.filter(total=95).update(total=200)
+        self.assertEqual(filters.get_range_stats(Order)["total"]["max"], Decimal(200))
+
+    def test_changelist_shows_the_bounds(self):
+        response = self.client.get("/admin/example_app/order/")
+        self.assertContains(response, "auto-admin-histogram")
+        self.assertContains(response, 'placeholder="5"')
+        self.assertContains(response, "Range: 5 – 95")
+
+
+# -------------------------------------------------------
+# Function fields computed by the database
+# -------------------------------------------------------
+class FunctionFieldQueryTests(QueryCountTestCase):
+
+    def test_changelist_with_function_fields(self):
+        self.assertConstantQueries("/admin/example_app/product/")
+
+
+class AnnotationFilterTests(AdminTestCase):
+    url = "/admin/example_app/product/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Product.objects.bulk_create([
+            Product(name=f"Product {price}", price=Decimal(price)) for price in (10, 20, 30, 40, 100)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        render_cache.clear()
+
+    def get_filter(self, response):
+        return next(
+            spec for spec in response.context["cl"].filter_specs
+            if getattr(spec, "parameter_name", None) == "price_with_tax"
+        )
+
+    def test_range_buckets_filter_the_annotation(self):
+        response = self.client.get(self.url)
+        lookups = self.get_filter(response).lookup_choices
+        # Ten buckets between the bounds 12 and 120; the last one is open-ended
+        self.assertEqual(len(lookups), 10)
+        self.assertEqual(Decimal(lookups[0][0].split("~")[0]), 12)
+        self.assertTrue(lookups[-1][0].endswith("~"))
+
+        response = self.client.get(self.url, {"price_with_tax": lookups[0][0]})
+        self.assertEqual([obj.price for obj in response.context["cl"].result_list], [10])
+        response = self.client.get(self.url, {"price_with_tax": lookups[-1][0]})
+        self.assertEqual([obj.price for obj in response.context["cl"].result_list], [100])
+
+    def test_invalid_value(self):
+        response = self.client.get(self.url, {"price_with_tax": "cheap~"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_url_lookup_on_annotation(self):
+        response = self.client.get(self.url, {"price_with_tax__gte": "40"})
+        self.assertEqual(sorted(obj.price for obj in response.context["cl"].result_list), [40, 100])
+
+
+# -------------------------------------------------------
+# Render cache versions bumped by every kind of write
+# -------------------------------------------------------
+@override_settings(DROFJI_AUTO_ADMIN_RENDER_CACHE={"ALIAS": "default"})
+class CacheVersionTests(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        render_cache._backend = None
+        render_cache.clear()
+        self.addCleanup(setattr, render_cache, "_backend", None)
+        self.customer = Customer.objects.create(**customer_row(1))
+
+    def assertBumps(self, write):
+        version = render_cache.get_model_version(Customer)
+        write()
+        self.assertNotEqual(render_cache.get_model_version(Customer), version)
+
+    def test_queryset_writes_bump_the_version(self):
+        self.assertBumps(lambda: Customer.objects.filter(pk=self.customer.pk).update(first_name="Updated"))
+        self.customer.last_name = "Bulk"
+        self.assertBumps(lambda: Customer.objects.bulk_update([self.customer], ["last_name"]))
+        self.assertBumps(lambda: Customer.objects.bulk_create([Customer(**customer_row(2))]))
+        self.assertBumps(lambda: Customer.objects.filter(pk=self.customer.pk).delete())
+
+    def test_cached_cell_is_rendered_again_after_update(self):
+        render = lambda: Customer.objects.get(pk=self.customer.pk).first_name
+        self.assertEqual(render_cache.get_or_render(self.customer, "name", render), "First 1")
+        Customer.objects.filter(pk=self.customer.pk).update(first_name="Updated")
+        self.assertEqual(render_cache.get_or_render(self.customer, "name", render), "Updated")
+
+    def test_version_field_rows_are_rendered_again_after_update(self):
+        self.addCleanup(setattr, Customer, "admin_render_cache_version_field", None)
+        Customer.admin_render_cache_version_field = "email"
+        render = lambda: Customer.objects.get(pk=self.customer.pk).first_name
+        self.assertEqual(render_cache.get_or_render(self.customer, "name", render), "First 1")
+
+        # save() leaves the version field alone: the cell stays cached
+        Customer.objects.get(pk=self.customer.pk).save()
+        self.assertEqual(render_cache.get_or_render(self.customer, "name", lambda: "Rendered"), "First 1")
+
+        Customer.objects.filter(pk=self.customer.pk).update(first_name="Updated")
+        self.assertEqual(render_cache.get_or_render(self.customer, "name", render), "Updated")
+
+
+# -------------------------------------------------------
+# JSON API: opt-in models, admin columns and filters, ETags
+# -------------------------------------------------------
+class ApiTests(AdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.customer = Customer.objects.create(**customer_row(1))
+        Product.objects.bulk_create([
+            Product(name=f"Product {price}", price=Decimal(price)) for price in (10, 20, 30, 40)
+        ])
+
+    def override_admin(self, model, **attrs):
+        model_admin = admin.site._registry[model]
+        for name, value in attrs.items():
+            setattr(model_admin, name, value)
+            self.addCleanup(delattr, model_admin, name)
+
+    def test_models_opt_in(self):
+        self.assertFalse(Order.admin_api_enabled)
+        self.assertEqual(self.client.get("/api/example_app/order/").status_code, 404)
+        models = self.client.get("/api/").json()["models"]
+        self.assertEqual(sorted(models), ["example_app.customer", "example_app.product"])
+
+    def test_function_field_filters(self):
+        url = "/api/example_app/product/"
+        self.assertIn("price_with_tax__gte", self.client.get("/api/").json()["models"]["example_app.product"]["filters"])
+        response = self.client.get(url, {"price_with_tax__gte": "30"})
+        self.assertEqual([Decimal(row["price_with_tax"]) for row in response.json()["results"]], [36, 48])
+
+        changelist = self.client.get("/admin/example_app/product/", {"price_with_tax__gte": "30"})
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]],
+            sorted(obj.pk for obj in changelist.context["cl"].result_list),
+        )
+
+    def test_columns_follow_admin_overrides(self):
+        self.override_admin(Customer, list_display=("first_name",), fields=("first_name", "last_name"))
+        url = f"/api/example_app/customer/{self.customer.pk}/"
+
+        rows = self.client.get("/api/example_app/customer/").json()["results"]
+        self.assertEqual(list(rows[0]), ["id", "first_name"])
+        self.assertEqual(sorted(self.client.get(url).json()), ["first_name", "id", "last_name"])
+        self.assertEqual(self.client.get(url, {"fields": "email"}).status_code, 400)
+
+    @override_settings(DROFJI_AUTO_ADMIN_RENDER_CACHE={"ALIAS": "default"})
+    def test_etag_changes_after_update(self):
+        render_cache._backend = None
+        self.addCleanup(setattr, render_cache, "_backend", None)
+        url = "/api/example_app/customer/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Customer.objects.filter(pk=self.customer.pk).update(first_name="Updated")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Updated")
+
+
+# -------------------------------------------------------
+# Estimated counts above the threshold
+# -------------------------------------------------------
+class EstimatedCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Customer.objects.bulk_create([Customer(**customer_row(index)) for index in range(120)])
+
+    def get_count(self, queryset, threshold):
+        paginator = EstimatedCountPaginator(queryset.order_by("pk"), 10)
+        paginator.estimate_threshold = threshold
+        return paginator.count
+
+    def test_exact_below_threshold(self):
+        count = self.get_count(Customer.objects.all(), 500)
+        self.assertEqual(count, 120)
+        self.assertEqual(str(count), "120")
+
+    def test_lower_bound_without_statistics(self):
+        count = self.get_count(Customer.objects.filter(active=True), 50)
+        self.assertEqual(str(count), "50+")
+        self.assertTrue(count.is_approximate)
+
+
+# -------------------------------------------------------
+# Keyset pagination: cursors instead of OFFSET and COUNT
+# -------------------------------------------------------
+class KeysetPaginationTests(AdminTestCase):
+    url = "/admin/example_app/customer/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Customer.objects.bulk_create([Customer(**customer_row(index)) for index in range(25)])
+
+    def setUp(self):
+        super().setUp()
+        model_admin = admin.site._registry[Customer]
+        for name, value in (
+            ("keyset_ordering", "-pk"),
+            ("list_per_page", 10),
+            ("change_list_template", "drofji_automatically_django_admin/keyset_change_list.html"),
+        ):
+            setattr(model_admin, name, value)
+            self.addCleanup(delattr, model_admin, name)
+        self.pks = list(Customer.objects.order_by("-pk").values_list("pk", flat=True))
+
+    def get_page(self, query_string=""):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url + query_string)
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"], queries
+
+    def page_pks(self, cl):
+        return [obj.pk for obj in cl.result_list]
+
+    def test_cursors_walk_forward_and_back(self):
+        cl, _queries = self.get_page()
+        self.assertEqual(self.page_pks(cl), self.pks[:10])
+        self.assertIsNone(cl.previous_cursor_url)
+
+        cl, _queries = self.get_page(cl.next_cursor_url)
+        self.assertEqual(self.page_pks(cl), self.pks[10:20])
+
+        last, _queries = self.get_page(cl.next_cursor_url)
+        self.assertEqual(self.page_pks(last), self.pks[20:])
+        self.assertIsNone(last.next_cursor_url)
+
+        cl, _queries = self.get_page(last.previous_cursor_url)
+        self.assertEqual(self.page_pks(cl), self.pks[10:20])
+
+    def test_cursor_keeps_filters(self):
+        Customer.objects.filter(pk__in=self.pks[::2]).update(active=False)
+        cl, _queries = self.get_page("?active__exact=1")
+        cl, _queries = self.get_page(cl.next_cursor_url)
+        self.assertIn("active__exact=1", cl.first_page_url)
+        self.assertEqual(self.page_pks(cl), self.pks[1::2][10:])
+
+    def test_no_exact_count(self):
+        cl, queries = self.get_page()
+        counts = [query["sql"] for query in queries if "COUNT(" in query["sql"]]
+        self.assertEqual(len(counts), 1)
+        # The bounded count of the estimated-count paginator
+        self.assertIn("LIMIT", counts[0])
+        self.assertEqual(cl.result_count, 25)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + "?_cursor=garbage")
+        self.assertEqual(response.status_code, 302)
+
+
+# -------------------------------------------------------
+# Index advisor: indexes for filtered, sorted and searched columns
+# -------------------------------------------------------
+class IndexAdvisorTests(TestCase):
+
+    def test_missing_indexes_become_add_index_operations(self):
+        suggestions = indexes.get_missing_indexes(Order, connection)
+        operations = auto_admin_indexes.Command.get_operations(suggestions)
+
+        self.assertTrue(operations)
+        self.assertTrue(all(isinstance(operation, migrations.AddIndex) for operation in operations))
+        by_fields = {tuple(operation.index.fields): operation.index for operation in operations}
+        self.assertIn(("customer", "-id"), by_fields)
+        self.assertIn(("total",), by_fields)
+        self.assertTrue(all(len(index.name) <= 30 for index in by_fields.values()))
+
+
+class FullTextIndexMigrationTests(TransactionTestCase):
+    # SQLite cannot roll back dropping an FTS5 table inside a test transaction
+
+    def run_sql(self, statements):
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def test_full_text_index_is_a_reversible_run_sql(self):
+        backend = SQLiteFTS5SearchBackend(Product)
+        self.addCleanup(self.run_sql, backend.get_drop_sql(connection))
+        with mock.patch.object(Product, "admin_full_text_search", True):
+            operation = search.get_index_operation(Product, connection)
+            self.assertIsInstance(operation, migrations.RunSQL)
+            self.run_sql(operation.sql)
+            self.assertTrue(backend.index_exists(connection))
+            self.assertIsNone(search.get_index_operation(Product, connection))
+
+        # Turned off: the next migration drops the index, its reverse recreates it
+        operation = search.get_index_operation(Product, connection)
+        self.run_sql(operation.sql)
+        self.assertFalse(backend.index_exists(connection))
+        self.run_sql(operation.reverse_sql)
+        self.assertEqual(backend.get_indexed_columns(connection), backend.get_columns())
+
+
+# -------------------------------------------------------
+# Full-text search through the FTS5 index, icontains outside it
+# -------------------------------------------------------
+class FullTextSearchTests(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        SQLiteFTS5SearchBackend._available.clear()
+        self.addCleanup(SQLiteFTS5SearchBackend._available.clear)
+        self.model_admin = admin.site._registry[Product]
+        self.model_admin.full_text_search = True
+        self.addCleanup(setattr, self.model_admin, "full_text_search", False)
+        self.backend = SQLiteFTS5SearchBackend(Product)
+        self.backend.ensure_index("default")
+        self.widget = Product.objects.create(name="Blue widget", price=Decimal("2.50"))
+        Product.objects.create(name="Red gadget", price=Decimal("7.00"))
+
+    def search(self, search_term):
+        request = self.client.get("/").wsgi_request
+        request.user = self.user
+        queryset, _may_have_duplicates = self.model_admin.get_search_results(
+            request, self.model_admin.get_queryset(request), search_term
+        )
+        return list(queryset)
+
+    def test_indexed_fields_use_the_index(self):
+        self.assertEqual(self.search("widget"), [self.widget])
+        self.assertEqual(self.search("wid*"), [self.widget])
+
+    def test_fields_outside_the_index_are_still_searched(self):
+        # full_info1 is an annotation: not indexed, searched with icontains
+        self.assertEqual(self.search("2.5$"), [self.widget])
+        self.assertEqual(self.search("blue 2.5$"), [self.widget])
+
+    def test_missing_index_is_checked_again(self):
+        Customer.objects.create(**customer_row(1))
+        backend = SQLiteFTS5SearchBackend(Customer)
+        self.assertFalse(backend.is_available("default"))
+        with connection.cursor():
+            backend.create_index(connection)
+        self.assertFalse(backend.is_available("default"))
+        backend.missing_index_ttl = 0
+        self.assertTrue(backend.is_available("default"))
+
+    def test_sqlite_index_needs_an_integer_pk(self):
+        self.assertTrue(SQLiteFTS5SearchBackend(Product).supports_model())
+        self.assertFalse(SQLiteFTS5SearchBackend(Session).supports_model())
+
+
+# -------------------------------------------------------
+# Import: per-row errors, chunked writes and upserts
+# -------------------------------------------------------
+class ImporterTests(TestCase):
+
+    def test_bad_jsonl_line_is_a_row_error(self):
+        rows = [customer_row(index) for index in range(1, 12)]
+        rows[5] = "{not json"
+        result = importer.AutoAdminImporter(Customer, batch_size=100).run_file(jsonl(*rows), importer.JSONL)
+
+        self.assertEqual(result.rows, 11)
+        self.assertEqual(result.created, 10)
+        self.assertEqual(result.error_count, 1)
+        self.assertEqual(result.errors[0][0], 6)
+        self.assertEqual(Customer.objects.count(), 10)
+
+    def test_non_object_lines_are_rejected(self):
+        result = importer.AutoAdminImporter(Customer).run_file(
+            jsonl("[1, 2]", customer_row(1), "3"), importer.JSONL
+        )
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row_number for row_number, _message in result.errors], [1, 3])
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_no_mapped_column_refuses_to_write(self):
+        with self.assertRaises(importer.ValidationError):
+            importer.AutoAdminImporter(Customer).run_file(jsonl({"unknown": 1}), importer.JSONL)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_validation_errors_are_reported_per_row(self):
+        csv_file = io.BytesIO(
+            b"first_name,last_name,origin,email\n"
+            b"Ada,Lovelace,status_a,ada@example.com\n"
+            b"Bad,Origin,status_x,bad@example.com\n"
+            b"Alan,Turing,status_b,alan@example.com\n"
+        )
+        result = importer.AutoAdminImporter(Customer).run_file(csv_file, importer.CSV)
+
+        self.assertEqual((result.created, result.error_count), (2, 1))
+        self.assertEqual(result.errors[0][0], 2)
+        self.assertIn("origin", result.errors[0][1])
+
+    def test_update_key_upserts(self):
+        existing = Customer.objects.create(**customer_row(1))
+        rows = [customer_row(1, first_name="Renamed"), customer_row(2)]
+        result = importer.AutoAdminImporter(Customer, update_key="email").run(rows)
+
+        self.assertEqual((result.created, result.updated), (1, 1))
+        existing.refresh_from_db()
+        self.assertEqual(existing.first_name, "Renamed")
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_jsonl_rows_update_the_keys_they_carry(self):
+        first = Customer.objects.create(**customer_row(1))
+        second = Customer.objects.create(**customer_row(2))
+        rows = [
+            {"email": first.email, "first_name": "Renamed"},
+            {"email": second.email, "Last Name": "Relast", "nickname": "x"},
+            {"nickname": "y"},
+            {"first_name": "No key"},
+        ]
+        result = importer.AutoAdminImporter(Customer, update_key="email").run_file(jsonl(*rows), importer.JSONL)
+
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(result.mapping, {"email": "email", "first_name": "first_name", "Last Name": "last_name"})
+        self.assertEqual(result.ignored_columns, ("nickname",))
+        self.assertEqual([row_number for row_number, _message in result.errors], [3, 4])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.first_name, first.last_name), ("Renamed", "Last 1"))
+        self.assertEqual((second.first_name, second.last_name), ("First 2", "Relast"))
+
+    def test_only_decode_errors_end_the_file(self):
+        # The decoder reads ahead, so only the chunks before the bad bytes are written
+        rows = [customer_row(index) for index in range(1, 301)]
+        data = jsonl(*rows).getvalue() + b'\n{"first_name": "\xff"}\n'
+        result = importer.AutoAdminImporter(Customer, batch_size=100).run_file(io.BytesIO(data), importer.JSONL)
+        self.assertEqual(result.error_count, 1)
+        self.assertEqual(result.errors[0][0], result.rows + 1)
+        self.assertGreater(result.created, 0)
+
+        rows_importer = importer.AutoAdminImporter(Customer)
+        with mock.patch.object(rows_importer, "to_python", side_effect=ValueError("conversion bug")):
+            with self.assertRaisesMessage(ValueError, "conversion bug"):
+                rows_importer.run_file(jsonl(customer_row(1)), importer.JSONL)
+
+    def test_failed_chunk_retries_new_rows_as_inserts(self):
+        product = Product.objects.create(name="Existing", price=Decimal("1.00"))
+        rows = [{"name": "New", "price": "2.00"}, {"name": "New too", "price": "3.00"}]
+        rows_importer = importer.AutoAdminImporter(Product)
+        # A failing update rolls back the rows bulk_create already inserted
+        rows_importer.split_updates = lambda items: (items, [(3, Product(pk=product.pk, name=None, price=1))])
+        result = rows_importer.run(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row_number for row_number, _message in result.errors], [3])
+        self.assertEqual(
+            sorted(Product.objects.values_list("name", flat=True)), ["Existing", "New", "New too"]
+        )
+
+
+# -------------------------------------------------------
+# Synthetic data
+# -------------------------------------------------------
+class GeneratorTests(TestCase):
+
+    def test_unique_values_follow_the_row_index(self):
+        options = generator.GeneratorOptions()
+        rng = random.Random(0)
+        for model_field in (
+            django_models.IntegerField(unique=True),
+            django_models.DateField(unique=True),
+            django_models.DecimalField(max_digits=8, decimal_places=2, unique=True),
+        ):
+            value = generator.make_value(model_field, options)
+            self.assertEqual(len({value(index, rng) for index in range(1000)}), 1000)
+
+    def test_parent_keys_are_loaded_in_chunks(self):
+        customers = Customer.objects.bulk_create([Customer(**customer_row(index)) for index in range(30)])
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+
+        with override_settings(MEDIA_ROOT=media_root.name), \
+                mock.patch.object(generator.ParentSample, "chunk_size", 10), \
+                CaptureQueriesContext(connection) as queries:
+            generator.generate(Order, 25, generator.GeneratorOptions(batch_size=10), "default")
+
+        parent_queries = [
+            query["sql"] for query in queries
+            if 'FROM "example_app_customer"' in query["sql"] and "COUNT(" not in query["sql"]
+        ]
+        self.assertTrue(parent_queries)
+        self.assertTrue(all("LIMIT" in sql for sql in parent_queries))
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertLessEqual(
+            set(Order.objects.values_list("customer_id", flat=True)), {customer.pk for customer in customers}
+        )
+
+
+# -------------------------------------------------------
+# Change history
+# -------------------------------------------------------
+@override_settings(DROFJI_AUTO_ADMIN_HISTORY={"ASYNC": False})
+class HistoryTests(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        history.history_queue.entries.clear()
+        self.addCleanup(history.history_queue.entries.clear)
+
+    def get_entries(self, obj=None):
+        entries = history.get_history_model()._default_manager.order_by("id")
+        if obj is not None:
+            entries = entries.filter(object_id=str(obj.pk))
+        return list(entries)
+
+    def create_customer(self, index=1, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Customer.objects.create(**customer_row(index, **values))
+
+    def test_save_records_changed_fields_only(self):
+        customer = self.create_customer()
+        customer = Customer.objects.get(pk=customer.pk)
+        customer.first_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.save()
+
+        created, changed = self.get_entries(customer)
+        self.assertEqual(created.action, history.CREATE)
+        self.assertEqual(created.changes["first_name"], [None, "First 1"])
+        self.assertEqual(changed.action, history.UPDATE)
+        self.assertEqual(changed.changes, {"first_name": ["First 1", "Renamed"]})
+
+    def test_delete(self):
+        customer = self.create_customer()
+        pk = customer.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.delete()
+        self.assertEqual(self.get_entries()[-1].action, history.DELETE)
+        self.assertEqual(self.get_entries()[-1].object_id, str(pk))
+
+    def test_queryset_update(self):
+        customers = [self.create_customer(index, active=index % 2 == 0) for index in range(5)]
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = Customer.objects.filter(active=True).update(active=False)
+
+        self.assertEqual(updated, 3)
+        entries = [entry for entry in self.get_entries() if entry.action == history.UPDATE]
+        self.assertEqual(
+            sorted(int(entry.object_id) for entry in entries),
+            [customer.pk for customer in customers if customer.active],
+        )
+        self.assertTrue(all(entry.changes == {"active": [True, False]} for entry in entries))
+
+    def test_queryset_update_walks_chunks(self):
+        for index in range(5):
+            self.create_customer(index)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                updated = history.update_tracked(Customer.objects.all(), {"last_name": "Same"}, chunk_size=2)
+
+        self.assertEqual(updated, 5)
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(len([entry for entry in self.get_entries() if entry.action == history.UPDATE]), 5)
+
+    def test_bulk_update_and_bulk_create(self):
+        customer = self.create_customer()
+        customer = Customer.objects.get(pk=customer.pk)
+        customer.last_name = "Bulk"
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.bulk_update([customer], ["last_name"])
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Customer.objects.bulk_create([Customer(**customer_row(2))])
+
+        self.assertEqual(self.get_entries(customer)[-1].changes, {"last_name": ["Last 1", "Bulk"]})
+        self.assertEqual(self.get_entries(created[0])[0].action, history.CREATE)
+
+    def test_acting_user(self):
+        with history.acting_user(self.user):
+            customer = self.create_customer()
+        self.create_customer(2)
+        self.assertEqual(self.get_entries(customer)[0].user, self.user)
+        self.assertIsNone(self.get_entries()[-1].user)
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                Customer.objects.create(**customer_row(1))
+                raise ValueError
+        self.assertEqual(self.get_entries(), [])
+
+    def test_entries_wait_for_the_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Customer.objects.create(**customer_row(1))
+            self.assertEqual(self.get_entries(), [])
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(len(self.get_entries()), 1)
+
+    @override_settings(DROFJI_AUTO_ADMIN_HISTORY={"ASYNC": True, "MAX_QUEUE_SIZE": 3})
+    def test_failed_write_is_queued_again(self):
+        entry = history.make_entry(Customer, 1, history.CREATE, {})
+        history.history_queue.entries.extend([entry, entry])
+        history_manager = history.get_history_model()._default_manager
+        with mock.patch.object(type(history_manager), "bulk_create", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                history.history_queue.flush()
+            self.assertEqual(len(history.history_queue.entries), 2)
+
+            history.history_queue.entries.extend([entry, entry])
+            with self.assertRaises(DatabaseError):
+                history.history_queue.flush()
+            # Bounded by MAX_QUEUE_SIZE
+            self.assertEqual(len(history.history_queue.entries), 3)
+
+        self.assertEqual(history.history_queue.flush(), 3)
+        self.assertEqual(history.history_queue.entries, [])
+        self.assertEqual(len(self.get_entries()), 3)
+
+    def test_history_view(self):
+        customer = self.create_customer()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/admin/example_app/customer/{customer.pk}/change/",
+                {**customer_row(1, first_name="Renamed"), "active": "on"},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_entries(customer)[-1].user, self.user)
+
+        response = self.client.get(f"/admin/example_app/customer/{customer.pk}/history/")
+        self.assertEqual(len(response.context["action_list"]), 2)
+        self.assertContains(response, "Renamed")
+        self.assertContains(response, "admin")
+
+
+# -------------------------------------------------------
+# Page instrumentation
+# -------------------------------------------------------
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.customers = [Customer.objects.create(**customer_row(index)) for index in range(3)]
+        self.reports = []
+        self.view = instrumentation.instrument_view(self.page, "test_page")
+
+    def page(self, request):
+        Customer.objects.count()
+        for customer in self.customers:
+            Customer.objects.get(pk=customer.pk)
+        return HttpResponse("<html><body>page</body></html>")
+
+    def get(self, user=None, debug=True, hook=None):
+        request = RequestFactory().get("/admin/test/")
+        request.user = user or User(username="staff", is_staff=True)
+        options = {"ENABLED": True, "METRICS_HOOK": hook or self.reports.append}
+        with self.settings(DEBUG=debug, DROFJI_AUTO_ADMIN_INSTRUMENTATION=options):
+            return self.view(request)
+
+    def test_queries_are_counted_and_grouped_by_call_site(self):
+        self.get()
+        report = self.reports[0]
+
+        self.assertEqual((report["view"], report["status"], report["query_count"]), ("test_page", 200, 4))
+        self.assertEqual(len(report["duplicates"]), 1)
+        duplicate = report["duplicates"][0]
+        self.assertEqual(duplicate["count"], 3)
+        self.assertIn("example_app/tests.py", duplicate["call_site"])
+        self.assertTrue(duplicate["call_site"].endswith(" in page"))
+
+    def test_panel_is_shown_to_staff_while_debug_is_on(self):
+        marker = 'id="auto-admin-instrumentation"'
+        self.assertContains(self.get(), marker)
+        self.assertNotContains(self.get(user=AnonymousUser()), marker)
+        self.assertNotContains(self.get(debug=False), marker)
+
+    def test_failing_metrics_hook_does_not_break_the_page(self):
+        hook = mock.Mock(side_effect=RuntimeError("metrics backend down"))
+        with self.assertLogs("drofji_automatically_django_admin.instrumentation", "ERROR") as logs:
+            response = self.get(hook=hook)
+
+        self.assertEqual(response.status_code, 200)
+        hook.assert_called_once()
+        self.assertIn("metrics hook failed", logs.output[0])
 
-# Create your tests here.